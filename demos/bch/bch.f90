@@ -0,0 +1,73 @@
+!----------------------------------------------------------------------
+!----------------------------------------------------------------------
+!   bch :    A chain of diffusively coupled Brusselator cells
+!----------------------------------------------------------------------
+!----------------------------------------------------------------------
+
+SUBROUTINE FUNC(NDIM,U,ICP,PAR,IJAC,F,DFDU,DFDP)
+!--------- ----
+
+! Every equation depends on at most four of the NDIM state variables,
+! so with JAC=2 only a few groups of columns of the Jacobian need to be
+! differenced.
+
+  IMPLICIT NONE
+  INTEGER, INTENT(IN) :: NDIM, IJAC, ICP(*)
+  DOUBLE PRECISION, INTENT(IN) :: U(NDIM), PAR(*)
+  DOUBLE PRECISION, INTENT(OUT) :: F(NDIM)
+  DOUBLE PRECISION, INTENT(INOUT) :: DFDU(NDIM,*), DFDP(NDIM,*)
+
+  INTEGER I, N
+  DOUBLE PRECISION A, B, DX, DY, X(0:NDIM/2+1), Y(0:NDIM/2+1)
+
+  A  = PAR(1)
+  B  = PAR(2)
+  DX = PAR(3)
+  DY = PAR(4)
+  N  = NDIM/2
+
+  X(1:N) = U(1:NDIM:2)
+  Y(1:N) = U(2:NDIM:2)
+! no flux at both ends of the chain
+  X(0) = X(1)
+  Y(0) = Y(1)
+  X(N+1) = X(N)
+  Y(N+1) = Y(N)
+
+  DO I=1,N
+     F(2*I-1) = A - (B+1)*X(I) + X(I)**2*Y(I) + DX*(X(I-1)-2*X(I)+X(I+1))
+     F(2*I)   = B*X(I) - X(I)**2*Y(I) + DY*(Y(I-1)-2*Y(I)+Y(I+1))
+  ENDDO
+
+END SUBROUTINE FUNC
+!----------------------------------------------------------------------
+
+SUBROUTINE STPNT(NDIM,U,PAR,T)
+!--------- -----
+
+  IMPLICIT NONE
+  INTEGER, INTENT(IN) :: NDIM
+  DOUBLE PRECISION, INTENT(INOUT) :: U(NDIM), PAR(*)
+  DOUBLE PRECISION, INTENT(IN) :: T
+
+  PAR(1:4) = (/ 2.0d0, 4.0d0, 0.1d0, 0.2d0 /)
+
+! the homogeneous stationary state
+  U(1:NDIM:2) = PAR(1)
+  U(2:NDIM:2) = PAR(2)/PAR(1)
+
+END SUBROUTINE STPNT
+!----------------------------------------------------------------------
+
+SUBROUTINE BCND
+END SUBROUTINE BCND
+
+SUBROUTINE ICND
+END SUBROUTINE ICND
+
+SUBROUTINE FOPT
+END SUBROUTINE FOPT
+
+SUBROUTINE PVLS
+END SUBROUTINE PVLS
+!----------------------------------------------------------------------
@@ -11,6 +11,8 @@ from auto import parseS
 from auto import parseBandS
 from auto import parseH
 from auto import bifDiag
+from auto import parseSweep
+from auto import symbolic
 import os
 from auto import AUTOutil
 import sys
@@ -444,6 +446,9 @@ def append(name1,name2=None,templates=None):
             n2 = n1
             n1 = "fort."+str(i)
         i = i+1
+        if s == "solution":
+            # the index and cache of n2 no longer describe it
+            parseS.removecache(n2)
         try:
             f1 = open(n1,"rb")
             f2 = open(n2,"ab")
@@ -600,6 +605,7 @@ def delete(name,templates=None):
     if os.path.exists(n1s):
         os.remove(n1s)
         info("Deleting %s ... done\n"%n1s)
+    parseS.removecache(n1s)
     if os.path.exists(n1d):
         os.remove(n1d)
         info("Deleting %s ... done\n"%n1d)
@@ -826,6 +832,9 @@ def move(name1,name2,name3=None,name4=None,templates=None):
         if os.path.exists(n1):
             if os.path.exists(n2):
                 os.remove(n2)
+            if s == "solution":
+                parseS.removecache(n1)
+                parseS.removecache(n2)
             os.rename(n1,n2)
             info("Renaming %s as %s ... done\n"%(n1,n2))
             done = True
@@ -1536,7 +1545,8 @@ def hch(entry=None,value=None,runner=None,**kw):
 commandRunnerConfigFort12 = command(hch,SIMPLE,"changeConstantsHomCont")
     
 
-def run(data=None,sv=None,ap=None,runner=None,templates=None,**kw):
+def run(data=None,sv=None,ap=None,runner=None,templates=None,async_=False,
+        stopif=None,**kw):
     """Run AUTO.
 
     Type r=FUNC([data],[options]) to run AUTO from solution data with the given
@@ -1577,12 +1587,24 @@ def run(data=None,sv=None,ap=None,runner=None,templates=None,**kw):
     FUNC(bd('BP1'),ISW=-1,STOP='HB1',sv='hb',ap='all')
     saves to the files b.hb, s.hb and d.hb, and appends to b.all,
     s.all, and d.all.
+
+    The special keyword argument 'stopif' is a function, or a list of
+    functions, that is called with every new point of the bifurcation
+    diagram while AUTO runs (see ``arun'' for its fields; x["U(3)"] or
+    x["PAR(1)"] give the value of a column by name). AUTO stops as soon
+    as one of them returns True, e.g.
+    FUNC(bd('HB1'),IPS=2,ICP=[1,11],stopif=lambda x: x["PERIOD"] > 100)
+
+    With async_=True, FUNC returns at once with an asynchronous run, as
+    ``arun'' does.
     """
     runner = withrunner(runner)
+    if async_:
+        return arun(data,sv,ap,runner,templates,stopif=stopif,**kw)
     if sv is not None:
         kw['sv'] = sv
     load(data,runner,templates,info=lambda msg:None,**kw)
-    res = runner.run()
+    res = runner.run(stopif)
     sv = runner.options["constants"].get("sv")
     runner.options["constants"]['sv'] = None
     if sv is not None and sv != '':
@@ -1599,6 +1621,195 @@ def run(data=None,sv=None,ap=None,runner=None,templates=None,**kw):
 commandRun = command(run,SIMPLE,"run",alias=['r','rn'])
 
 
+def arun(data=None,sv=None,ap=None,runner=None,templates=None,interval=0.2,
+         stopif=None,**kw):
+    """Run AUTO asynchronously, with asyncio.
+
+    Type r=FUNC([data],[options]) in a coroutine to start running AUTO
+    from solution data with the given AUTO constants or file keyword
+    options, as for ``run''. FUNC returns at once; then
+
+    async for x in r:
+
+    goes through the points of the bifurcation diagram (with x.BR,
+    x.PT, x.TY, x.LAB and the numbers x.data) and the solutions at
+    labeled points while AUTO computes them, and
+
+    bd = await r
+
+    waits for the end of the run and gives its bifurcation diagram.
+    Every run uses its own scratch directory, so several runs can be
+    awaited at the same time, e.g. with asyncio.gather.
+    The output files are checked every 'interval' seconds; 'sv', 'ap'
+    and 'stopif' save and append the result, and stop AUTO, as for
+    ``run''.
+    """
+    from auto import runAsync
+    runner = withrunner(runner)
+    solution = load(data,runner,templates,info=lambda msg:None,**kw)
+    def done(res):
+        if sv is not None and sv != '':
+            save(res,sv,templates)
+        if ap is not None:
+            append(res,ap,templates)
+    return runAsync.AsyncRun(runner,solution,done,interval,stopif)
+commandArun = command(arun,SIMPLE,"arun",alias=[])
+
+
+def runmany(data,processes=None,sv=None,ap=None,runner=None,templates=None,
+            **kw):
+    """Run AUTO from several starting points at the same time.
+
+    Type r=FUNC(list,[options]) to run AUTO from every element of list
+    with the given AUTO constants or file keyword options, using as many
+    AUTO processes at the same time as there are CPUs.
+
+    Each element of list can be any data accepted by ``run'', for
+    instance a solution, or a dictionary of options for that element
+    only, or a pair (data, dictionary). The result is a bifurcation
+    diagram r with the branches of all runs, in the order of list, with
+    the labels of all runs relabelled sequentially starting at 1, as
+    by ``rl''.
+
+    Example: given a bifurcation diagram bd, switch branches at all
+    branch points at once:
+    r = FUNC(bd('BP'),ISW=-1)
+    or start from labels 2 and 5, with different step sizes:
+    r = FUNC([{'IRS':2,'DS':0.1},{'IRS':5,'DS':-0.1}])
+
+    The special keyword argument 'processes' limits the number of AUTO
+    processes that run at the same time; 'sv' and 'ap' save and append
+    the result as for ``run''.
+    """
+    runner = withrunner(runner)
+    solutions = []
+    for item in data:
+        options = kw.copy()
+        if isinstance(item, dict):
+            options.update(item)
+            item = None
+        elif isinstance(item, tuple):
+            item, itemoptions = item
+            options.update(itemoptions)
+        solutions.append(load(item,runner,templates,info=lambda msg:None,
+                              **options))
+    # every run numbers its labels from 1
+    res = runner.runMany(solutions,processes).relabel()
+    if sv is not None and sv != '':
+        save(res,sv,templates)
+    if ap is not None:
+        append(res,ap,templates)
+    return res
+commandRunMany = command(runmany,SIMPLE,"runmany",alias=[])
+
+
+def sweep(data=None,grid=None,processes=None,sv=None,runner=None,
+          templates=None,**kw):
+    """Run AUTO for a grid of fixed parameter values.
+
+    Type r=FUNC([data],grid,[options]) to run AUTO from solution data
+    with the given AUTO constants or file keyword options, for every
+    combination of the parameter values in grid, which is a dictionary
+    that maps parameter indices or names to lists of values, or for
+    every point of a list of such dictionaries with one value each.
+
+    The runs use as many AUTO processes at the same time as there are
+    CPUs, or at most 'processes'. The result r has a row for every
+    parameter point with the bifurcation diagram r[i] and a summary of
+    the run in the columns r.columns['branches'], r.columns['points'],
+    r.columns['special'] (type names and labels) and r.columns['error']
+    (failed runs), besides the parameter values in, e.g.,
+    r.columns['PAR(3)']. r({3: 0.5, 4: 1}) returns the bifurcation
+    diagram for PAR(3)=0.5, PAR(4)=1, and ``print r'' lists all rows.
+
+    With sv='xxx', the result for the i-th point is saved to b.xxx_i,
+    s.xxx_i and d.xxx_i as soon as it is done, and the summary to
+    sw.xxx. Running FUNC again with the same grid and sv='xxx' resumes
+    an interrupted sweep, skipping the points that are already done and
+    running the points whose run failed again.
+
+    Example: follow the branch of a starting point for 10 values of
+    PAR(3) and 2 values of PAR(4):
+    r = FUNC('ab', {3: [0.1*i for i in range(10)], 4: [1, 2]}, sv='sw')
+    """
+    runner = withrunner(runner)
+    if isinstance(grid, dict):
+        keys = sorted(grid, key=str)
+        points = [[]]
+        for key in keys:
+            points = [point + [value] for point in points
+                      for value in grid[key]]
+    else:
+        keys = sorted(grid[0], key=str)
+        points = [[point[key] for key in keys] for point in grid]
+    filename = None
+    if sv is not None and sv != '':
+        filename = "sw.%s"%sv
+    res = parseSweep.parseSweep(keys, points, filename)
+    todo = res.todo()
+    solutions = []
+    for i in todo:
+        options = kw.copy()
+        par = {}
+        if isinstance(options.get("PAR"), dict):
+            par.update(options["PAR"])
+        for key, value in zip(keys, points[i]):
+            par[key] = value
+        options["PAR"] = par
+        solutions.append(load(data,runner,templates,info=lambda msg:None,
+                              **options))
+    def done(i, result):
+        index = todo[i]
+        files = None
+        if filename is not None and not isinstance(result, Exception):
+            name = filenameTemplate("%s_%d"%(sv, index+1), templates)
+            files = [name["bifurcationDiagram"], name["solution"],
+                     name["diagnostics"]]
+            result.writeFilename(*files)
+        res.setRow(index, result, files)
+    runner.runMany(solutions,processes,done)
+    info("Sweep of %d points done\n"%len(todo))
+    return res
+commandSweep = command(sweep,SIMPLE,"sweep",alias=[])
+
+
+def model(name,rhs,unames,parnames=None,U=None,PAR=None,runner=None,
+          templates=None,**kw):
+    """Write an equation file for equations given symbolically.
+
+    Type s=FUNC(name,rhs,unames,[parnames],[U],[PAR],[options]) to write
+    the equation file name.f90 for the right hand sides rhs, given as
+    Python expressions in terms of the names of the state variables
+    unames and parameters parnames, and to load it with the given
+    AUTO constants. rhs is a list in the order of unames or a dictionary
+    that maps the names of the state variables to expressions.
+    unames and parnames are lists of names, for U(1), U(2), ... and
+    PAR(1), PAR(2), ..., or dictionaries that map indices to names. The
+    expressions can use +, -, *, /, **, pi, and the functions sin, cos,
+    tan, exp, log, sqrt, sinh, cosh, tanh, asin, acos, atan and abs.
+    The starting values in U and PAR are given as dictionaries that map
+    names or indices to values; all others are 0.
+
+    The equation file also computes the Jacobian with respect to the
+    state variables and parameters, by differentiating the expressions,
+    so the solution s is loaded with JAC=1, together with NDIM, unames
+    and parnames.
+
+    Example: the Lorenz equations
+    s = FUNC('lrz', {'x': 'sigma*(y-x)', 'y': 'rho*x - y - x*z',
+                  'z': 'x*y - beta*z'}, ['x', 'y', 'z'],
+          ['rho', 'beta', 'sigma'], PAR={'beta': 8/3., 'sigma': 10})
+    r = run(s, ICP=['rho'], UZSTOP={'rho': 30})
+    """
+    runner = withrunner(runner)
+    m = symbolic.Model(rhs,unames,parnames,U,PAR)
+    m.writeFilename(name+".f90")
+    options = m.constants()
+    options.update(kw)
+    return load(e=name,runner=runner,templates=templates,**options)
+commandModel = command(model,SIMPLE,"model",alias=[])
+
+
 def rundemo(demo,equation="all",runner=None):
     runner = withrunner(runner)
     runner.config(equation=equation)
@@ -2128,5 +2339,275 @@ def test():
     constants()
     changeup()
 
+    print("Testing runmany")
+    import tempfile
+    tmpdir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        for name in ["ab.f90", "c.ab.1"]:
+            shutil.copy(os.path.join(os.environ["AUTO_DIR"],"demos","ab",name),
+                        tmpdir)
+        os.chdir(tmpdir)
+        runner.config(dir=tmpdir, log=f)
+        try:
+            r = runmany([{'PAR':{3:0.2}}, {'PAR':{3:0.3}}], runner=runner,
+                        e='ab', c='ab.1', NMX=20)
+        finally:
+            runner.config(dir=cwd, log=None)
+        labels = list(range(1, len(r.getLabels())+1))
+        if (len(r) != 2 or len(r[0].getLabels()) < 2 or
+            r.getLabels() != labels or r().getLabels() != labels or
+            [solution["LAB"] for solution in r()] != labels):
+            raise AUTOExceptions.AUTORegressionError("runmany labels incorrect")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmpdir)
+
+    print("Testing stopif")
+    tmpdir = tempfile.mkdtemp()
+    stoprunner = runAUTO.runAUTO()
+    try:
+        for name in ["ab.f90", "c.ab.1"]:
+            shutil.copy(os.path.join(os.environ["AUTO_DIR"],"demos","ab",name),
+                        tmpdir)
+        os.chdir(tmpdir)
+        f.truncate(0)
+        f.seek(0)
+        stoprunner.config(dir=tmpdir, log=f)
+        try:
+            full = run(e='ab', c='ab.1', runner=stoprunner)
+            uz = full("UZ1")
+            r = run(e='ab', c='ab.1', runner=stoprunner,
+                    stopif=lambda x: x.TY == "UZ")
+        finally:
+            stoprunner.config(log=None)
+            os.chdir(cwd)
+        branch = r[0]
+        # AUTO is stopped at the first user-defined point, which keeps its
+        # label and solution
+        if (len(branch) != abs(uz["PT"]) or len(branch) >= len(full[0]) or
+            branch.getLabels() != full[0].getLabels()[:2] or
+            branch[-1]["TY name"] != "UZ" or branch[-1]["LAB"] != uz["LAB"] or
+            r().getLabels() != branch.getLabels()):
+            raise AUTOExceptions.AUTORegressionError("stopif incorrect")
+        if "Stopped at branch 1, point %d"%abs(uz["PT"]) not in f.getvalue():
+            raise AUTOExceptions.AUTORegressionError("stopif output not logged")
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print("Testing the build cache")
+    tmpdir = tempfile.mkdtemp()
+    build_cache = runAUTO.build_cache
+    runAUTO.build_cache = os.path.join(tmpdir, "cache")
+    cacherunner = runAUTO.runAUTO()
+    try:
+        for d in ["first", "second"]:
+            os.mkdir(os.path.join(tmpdir, d))
+            for name in ["ab.f90", "c.ab.1"]:
+                shutil.copy(os.path.join(os.environ["AUTO_DIR"],"demos","ab",
+                                         name), os.path.join(tmpdir, d))
+            os.chdir(os.path.join(tmpdir, d))
+            cacherunner.config(dir=os.path.join(tmpdir, d), log=f)
+            try:
+                run(e='ab', c='ab.1', NMX=5, runner=cacherunner)
+            finally:
+                cacherunner.config(log=None)
+                os.chdir(cwd)
+        # the second directory gets the executable without compiling
+        if (len(glob.glob(os.path.join(runAUTO.build_cache, "*.exe"))) != 1 or
+            not os.path.exists(os.path.join(tmpdir, "second", "ab.exe")) or
+            os.path.exists(os.path.join(tmpdir, "second", "ab.o"))):
+            raise AUTOExceptions.AUTORegressionError("build cache not used")
+    finally:
+        runAUTO.build_cache = build_cache
+        shutil.rmtree(tmpdir)
+
+    print("Testing model")
+    # the Lorenz equations with exact Jacobians, also of x**0 at x=0,
+    # against the lrz demo with difference Jacobians
+    tmpdir = tempfile.mkdtemp()
+    modelrunner = runAUTO.runAUTO()
+    try:
+        for name in ["lrz.f90", "c.lrz"]:
+            shutil.copy(os.path.join(os.environ["AUTO_DIR"],"demos","lrz",name),
+                        tmpdir)
+        os.chdir(tmpdir)
+        modelrunner.config(dir=tmpdir, log=f)
+        try:
+            lrz = run(e='lrz', c='lrz', runner=modelrunner)
+            hb = run(lrz('HB1'), IPS=2, ICP=['rho','PERIOD'], NMX=10,
+                     runner=modelrunner)
+            s = model('lrzmodel', {'x': 'sigma*(y-x)*z**0',
+                                   'y': 'rho*x - y - x*z',
+                                   'z': 'x*y - beta*z'}, ['x', 'y', 'z'],
+                      ['rho', 'beta', 'sigma'], PAR={'beta': 8/3.,
+                                                     'sigma': 10},
+                      runner=modelrunner)
+            mlrz = run(s, c='lrz', JAC=1, runner=modelrunner)
+            mhb = run(mlrz('HB1'), IPS=2, ICP=['rho','PERIOD'], NMX=10,
+                      runner=modelrunner)
+        finally:
+            modelrunner.config(log=None)
+            os.chdir(cwd)
+        for b1, b2 in [(lrz, mlrz), (hb, mhb)]:
+            if (len(b1) != len(b2) or
+                [len(b) for b in b1] != [len(b) for b in b2] or
+                [b1(l)["TY name"] for l in b1.getLabels()] !=
+                [b2(l)["TY name"] for l in b2.getLabels()] or
+                max([abs(p1["rho"] - p2["rho"])
+                     for br1, br2 in zip(b1, b2)
+                     for p1, p2 in zip(br1, br2)]) > 1e-5):
+                raise AUTOExceptions.AUTORegressionError("model incorrect")
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print("Testing binary start solutions")
+    # the periodic orbits from the Hopf point of lrz, and a restart from
+    # one of them, with start solutions passed in binary and as text;
+    # the input of AUTO is kept in stdin.txt
+    from auto import Points
+    from io import BytesIO
+    tmpdir = tempfile.mkdtemp()
+    binaryrunner = runAUTO.runAUTO()
+    size = runAUTO.binary_solution_size
+    prefix = os.environ.get("AUTO_COMMAND_PREFIX")
+    def binaryrun(start, size, **kw):
+        runAUTO.binary_solution_size = size
+        r = run(start, runner=binaryrunner, **kw)
+        stdin = open("stdin.txt")
+        binary = parseS.BINARY_SOLUTION in stdin.read()
+        stdin.close()
+        return binary, r
+    try:
+        for name in ["lrz.f90", "c.lrz"]:
+            shutil.copy(os.path.join(os.environ["AUTO_DIR"],"demos","lrz",name),
+                        tmpdir)
+        os.chdir(tmpdir)
+        binaryrunner.config(dir=tmpdir, log=f)
+        os.environ["AUTO_COMMAND_PREFIX"] = "sh -c 'tee stdin.txt | \"$0\"'"
+        try:
+            lrz = run(e='lrz', c='lrz', runner=binaryrunner)
+            hb = [binaryrun(lrz('HB1'), hbsize, IPS=2, ICP=['rho','PERIOD'],
+                            NMX=10) for hbsize in [0, size]]
+            orbit = hb[1][1](hb[1][1].getLabels()[-1])
+            # the number of numbers comes from the header, without parsing
+            n = orbit._numfloats()
+            text = BytesIO()
+            orbit.write(text)
+            if len(b" ".join(text.getvalue().splitlines()[1:]).split()) != n:
+                raise AUTOExceptions.AUTORegressionError(
+                    "Size of start solution incorrect")
+            po = [binaryrun(orbit, posize, NMX=5, DS='-')
+                  for posize in [n, n + 1]]
+        finally:
+            if prefix is None:
+                del os.environ["AUTO_COMMAND_PREFIX"]
+            else:
+                os.environ["AUTO_COMMAND_PREFIX"] = prefix
+            runAUTO.binary_solution_size = size
+            binaryrunner.config(log=None)
+            os.chdir(cwd)
+        binary = Points.fromstring is not None
+        if ([hb[0][0], hb[1][0], po[0][0], po[1][0]] !=
+            [binary, False, binary, False]):
+            raise AUTOExceptions.AUTORegressionError(
+                "Binary start solutions not used")
+        for (b1, r1), (b2, r2) in [hb, po]:
+            branches1, branches2 = StringIO(), StringIO()
+            solutions1, solutions2 = BytesIO(), BytesIO()
+            r1.write(branches1)
+            r2.write(branches2)
+            r1().write(solutions1)
+            r2().write(solutions2)
+            if (branches1.getvalue() != branches2.getvalue() or
+                solutions1.getvalue() != solutions2.getvalue()):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Binary and text start solutions give different results")
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print("Testing persistent workers")
+    # the same runs of ab, with a restart, in a new process every time and
+    # in a persistent worker process
+    tmpdir = tempfile.mkdtemp()
+    persistent_worker = runAUTO.persistent_worker
+    def abruns(runner):
+        start = run(e='ab', c='ab.1', runner=runner)
+        stationary = run(start, c='ab.2', IRS=2, runner=runner)
+        periodic = run(stationary('HB1'), c='ab.3', NMX=20, runner=runner)
+        return [start, stationary, periodic]
+    def output(results):
+        branches, solutions = StringIO(), BytesIO()
+        for r in results:
+            r.write(branches)
+            r().write(solutions)
+        return branches.getvalue(), solutions.getvalue()
+    def workers(runner):
+        return [obj for obj, mtime in runner._runAUTO__workers.values()]
+    try:
+        for name in ["ab.f90", "c.ab.1", "c.ab.2", "c.ab.3"]:
+            shutil.copy(os.path.join(os.environ["AUTO_DIR"],"demos","ab",name),
+                        tmpdir)
+        os.chdir(tmpdir)
+        plainrunner = runAUTO.runAUTO()
+        workerrunner = runAUTO.runAUTO()
+        plainrunner.config(dir=tmpdir, log=f)
+        workerrunner.config(dir=tmpdir, log=f)
+        try:
+            runAUTO.persistent_worker = False
+            expected = abruns(plainrunner)
+            runAUTO.persistent_worker = True
+            results = abruns(workerrunner)
+            first = workers(workerrunner)
+            if (output(results) != output(expected) or len(first) != 1 or
+                first[0].poll() is not None):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Runs in a worker process differ")
+            results = abruns(workerrunner)
+            if (output(results) != output(expected) or
+                workers(workerrunner) != first):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Worker process not used again")
+            # a rebuilt executable gets a new worker process
+            mtime = os.path.getmtime("ab.exe") + 10
+            os.utime("ab.f90", (mtime, mtime))
+            results = abruns(workerrunner)
+            second = workers(workerrunner)
+            if (output(results) != output(expected) or len(second) != 1 or
+                second == first or first[0].poll() is None):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Worker process not restarted after a rebuild")
+            # after an error the worker process stops, and the next run
+            # starts a new one
+            try:
+                run(e='ab', c='ab.1', IPS=99, runner=workerrunner)
+            except AUTOExceptions.AUTORuntimeError:
+                pass
+            else:
+                raise AUTOExceptions.AUTORegressionError(
+                    "Error in a worker process not found")
+            if workers(workerrunner) != [] or second[0].poll() is None:
+                raise AUTOExceptions.AUTORegressionError(
+                    "Worker process not stopped after an error")
+            results = abruns(workerrunner)
+            third = workers(workerrunner)
+            if (output(results) != output(expected) or len(third) != 1 or
+                third == second):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Worker process not restarted after an error")
+            workerrunner.closeWorkers()
+            if workers(workerrunner) != [] or third[0].poll() != 0:
+                raise AUTOExceptions.AUTORegressionError(
+                    "Worker processes not closed")
+        finally:
+            runAUTO.persistent_worker = persistent_worker
+            workerrunner.closeWorkers()
+            # in reverse order: workerrunner saved plainrunner's log
+            workerrunner.config(log=None)
+            plainrunner.config(log=None)
+            os.chdir(cwd)
+    finally:
+        shutil.rmtree(tmpdir)
+
 if __name__ == "__main__":
     test()
@@ -4,6 +4,7 @@ try:
 except ImportError: # Python 3
     from configparser import ConfigParser
 import os
+import re
 import array
 import gzip
 import sys
@@ -157,6 +158,23 @@ def format19_10E3(x):
         s = s[1:-2] + '0' + s[-2:]
     return s
 
+# a number formatted with %19.10E that has a two digit exponent
+_exponent2 = re.compile(r" (-?[0-9]\.[0-9]{10}E[-+])([0-9][0-9])(?![0-9])")
+# a three digit exponent
+_exponent3 = re.compile(r"E[-+][0-9]{3}")
+
+def format19_10E3list(template, values):
+    """Format the sequence values using template, which contains %d and
+    %19.10E fields, writing all numbers in the %19.10E fields as
+    format19_10E3 does"""
+    # usually all exponents have two digits: then formatting with one
+    # character less and inserting a zero in the exponents is fastest
+    s = template.replace("%19.10E", "%18.10E") % tuple(values)
+    if "N" not in s and "F" not in s and _exponent3.search(s) is None:
+        # no NAN, INF or three digit exponents
+        return s.replace("E+", "E+0").replace("E-", "E-0")
+    return _exponent2.sub(r"\g<1>0\2", template % tuple(values))
+
 try:
     import __builtin__
 except ImportError:
@@ -14,6 +14,7 @@ from __future__ import division
 
 from auto import AUTOutil
 from copy import copy, deepcopy
+from bisect import bisect_left, bisect_right, insort
 import sys
 
 numpyimported = False
@@ -247,6 +248,60 @@ class DefaultDict(dict):
         return self.setdefault(key, deepcopy(self.default))
 
 
+class IndexDict(DefaultDict):
+    """DefaultDict with integer keys that also keeps its keys in a sorted
+    list, so that ranges of keys can be found by bisection."""
+    def __init__(self, default):
+        DefaultDict.__init__(self, default)
+        self.sortedkeys = []
+
+    def __reduce__(self):
+        return (self.__class__, (self.default,), None, None,
+                iter(self.items()))
+
+    def __add(self, key):
+        if key not in self:
+            keys = self.sortedkeys
+            if keys == [] or key > keys[-1]:
+                keys.append(key)
+            else:
+                insort(keys, key)
+
+    def __setitem__(self, key, value):
+        self.__add(key)
+        dict.__setitem__(self, key, value)
+
+    def setdefault(self, key, value=None):
+        self.__add(key)
+        return dict.setdefault(self, key, value)
+
+    def update(self, other=(), **kw):
+        if hasattr(other, "keys"):
+            other = [(key, other[key]) for key in other.keys()]
+        for key, value in list(other) + list(kw.items()):
+            self[key] = value
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        del self.sortedkeys[bisect_left(self.sortedkeys, key)]
+
+    def pop(self, key, *default):
+        if key in self:
+            value = dict.__getitem__(self, key)
+            del self[key]
+            return value
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        del self.sortedkeys[bisect_left(self.sortedkeys, key)]
+        return key, value
+
+    def clear(self):
+        dict.clear(self)
+        self.sortedkeys = []
+
+
 def isUniqueSeq(objlist):
     """Check that list contains items only once"""
     for obj in objlist:
@@ -1894,6 +1949,20 @@ class Pointset(Point):
             return self.coordarray
 
 
+    def columns(self, coords):
+        """Return the values of the coordinates coords (a list of names)
+        at all points as one 2D array with a row per point, without
+        creating a Point for every point. With numpy the result is a view
+        of the data if the coordinates are adjacent and in order."""
+        ixlist = self._map_names_to_ixs(list(coords))
+        if (fromstring is not None and ixlist != [] and
+            ixlist == list(range(ixlist[0], ixlist[0] + len(ixlist)))):
+            ca = self.coordarray[ixlist[0]:ixlist[-1]+1]
+        else:
+            ca = take(self.coordarray, ixlist, axis=0)
+        return N.transpose(ca)
+
+
     def todict(self, aslist=False):
         """Convert Pointset to a dictionary of arrays (or of lists with aslist=True)."""
         if aslist:
@@ -2097,19 +2166,20 @@ class PointInfo(object):
 
     Do not use a PointInfo object as an iterator, as it is 'infinite' in size!
     (It uses DefaultDicts as its internal storage, which return {} for
-    undefined labels.)"""
+    undefined labels.) The indices are also kept in sorted order, so that
+    looking up ranges of indices does not need to go through all of them."""
 
     def __init__(self, ptlabels=None):
         if ptlabels is None:
             self.by_label = DefaultDict({})
-            self.by_index = DefaultDict({})
+            self.by_index = IndexDict({})
         elif isinstance(ptlabels, PointInfo):
             self.by_label = ptlabels.by_label
             self.by_index = ptlabels.by_index
         elif isinstance(ptlabels, dict):
             # always expect the dictionary to be based on index
             self.by_label = DefaultDict({})
-            self.by_index = DefaultDict({})
+            self.by_index = IndexDict({})
             for k, v in ptlabels.items():
                 if not isinstance(k, _int_types):
                     raise TypeError("Initialization dictionary must be keyed "
@@ -2136,14 +2206,14 @@ class PointInfo(object):
     def mapNames(self, themap):
         """Map labels, using a symbol map of class symbolMapClass."""
         self.by_label = mapNames(themap, self.by_label)
-        new_by_index = {}
+        new_by_index = IndexDict({})
         for ix, labdict in self.by_index.items():
             new_by_index[ix] = mapNames(themap, labdict)
         self.by_index = new_by_index
 
 
     def sortByIndex(self):
-        ixkeys = sortedDictKeys(self.by_index)
+        ixkeys = self.getIndices()
         return zip(ixkeys,[self.by_index[ix] for ix in ixkeys])
 
 
@@ -2153,7 +2223,7 @@ class PointInfo(object):
 
 
     def getIndices(self):
-        return sortedDictKeys(self.by_index)
+        return self.by_index.sortedkeys[:]
 
 
     def getLabels(self):
@@ -2174,25 +2244,36 @@ class PointInfo(object):
         else:
             if isinstance(key, (slice, list, ndarray)):
                 if isinstance(key, slice):
-                    self_ixs = self.getIndices()
+                    self_ixs = self.by_index.sortedkeys
                     if len(self_ixs) == 0:
                         max_ixs = 0
                     else:
-                        max_ixs = max(self_ixs)
+                        max_ixs = self_ixs[-1]
                     try:
                         s1, s2, s3 = key.indices(max_ixs+1)
-                        ixs = range(s1, s2, s3)
-                        key = intersect(ixs, self_ixs)
                     except TypeError:
-                        key = self_ixs
+                        key = self_ixs[:]
+                    else:
+                        # the indices in range(s1, s2, s3), in that order
+                        if s3 > 0:
+                            key = self_ixs[bisect_left(self_ixs, s1):
+                                           bisect_left(self_ixs, s2)]
+                            if s3 > 1:
+                                key = [i for i in key if (i-s1) % s3 == 0]
+                        else:
+                            key = self_ixs[bisect_right(self_ixs, s2):
+                                           bisect_right(self_ixs, s1)]
+                            key.reverse()
+                            if s3 < -1:
+                                key = [i for i in key if (s1-i) % s3 == 0]
                 else:
                     if all([isinstance(k, str) for k in key]):
-                        keylabels = intersect(key, self.getLabels())
+                        keylabels = [k for k in key if k in self.by_label]
                         key = []
                         for l in keylabels:
                             key.extend(self.by_label[l].keys())
                     elif all([isinstance(k, _int_types) for k in key]):
-                        key = intersect(key, self.getIndices())
+                        key = [k for k in key if k in self.by_index]
                     else:
                         raise TypeError("Invalid key type for PointInfo")
                 return PointInfo(dict(zip(key,[self.by_index[i] for i in key])))
@@ -9,11 +9,161 @@ from auto import parseS
 from auto import parseD
 from auto import Points
 from auto import AUTOExceptions
+from auto.AUTOutil import format19_10E3list
+try:
+    from cStringIO import StringIO
+except ImportError: # Python 3
+    from io import StringIO
+import bisect
 import gzip
 import types
 import sys
 import struct
 
+# Binary bifurcation diagram files are numpy .npz archives with the header
+# lines, the BR, PT, TY and LAB columns, and the data columns of all
+# branches, the headers and numbers of all solutions, and the constants
+# and diagnostics of a bifurcation diagram, which are much faster to write
+# and read than the b.xxx, s.xxx and d.xxx text files.
+BINARY_MAGIC = "AUTO-07p bifurcation diagram\n"
+BINARY_VERSION = 1
+
+def _text(s):
+    # convert between strings and arrays of bytes for binary storage
+    N = Points.N
+    if isinstance(s, str):
+        return N.frombuffer(s.encode("latin-1"), N.uint8)
+    return s.tobytes().decode("latin-1")
+
+def _loadbinary(inputfile):
+    # the arrays of a binary bifurcation diagram file (a file name or a
+    # file object) written by writeBinary()
+    if not Points.numpyimported:
+        Points.importnumpy()
+    if Points.fromstring is None:
+        raise AUTOExceptions.AUTORuntimeError(
+            "Binary bifurcation diagrams need numpy.")
+    try:
+        container = Points.N.load(inputfile)
+    except (IOError, ValueError):
+        container = None
+    if (not hasattr(container, "files") or
+        "format" not in container.files or
+        _text(container["format"]) != BINARY_MAGIC):
+        raise AUTOExceptions.AUTORuntimeError(
+            "Not a binary bifurcation diagram file.")
+    if container["version"][0] != BINARY_VERSION:
+        raise AUTOExceptions.AUTORuntimeError(
+            "Unsupported binary bifurcation diagram version %d."%
+            container["version"][0])
+    return container
+
+def _binarybranches(container):
+    # the branches of the arrays of a binary bifurcation diagram file,
+    # which are only parsed when used
+    branches = parseB.parseBR()
+    if len(container["branches"]) > 0:
+        branches.read(binaryB(container["branches"],
+                              _text(container["headers"]),
+                              container["points"], container["data"]))
+    return branches
+
+def columnarbinary(inputfile):
+    """Read the branches of a binary bifurcation diagram file written by
+    writeBinary(), given by name or as a file object, as a list of
+    ColumnarBranch objects, without reading its solutions. Their data
+    columns are taken straight from the file."""
+    container = _loadbinary(inputfile)
+    return [parseB.ColumnarBranch(branch)
+            for branch in _binarybranches(container)]
+
+# the branches of a binary bifurcation diagram file: AUTOBranch reads
+# these through the same interface as a bulk read fort.7 file
+class binaryB(parseB.fileB):
+    def __init__(self, branches, headers, points, data):
+        self.name = None
+        self.branches = []
+        self.__headers = {}
+        self.__rows = []
+        self.__starts = []
+        self.__points = points
+        self.__data = data
+        line = row = offset = pos = 0
+        for headerlen, nrows, ncolumns in branches.tolist():
+            header = line
+            for l in headers[pos:pos+headerlen].splitlines(True):
+                self.__headers[line] = l
+                line = line + 1
+            pos = pos + headerlen
+            self.branches.append([header, line, line + nrows])
+            # first line, first row and offset of the data of the branch
+            self.__rows.append((line, row, offset, ncolumns))
+            self.__starts.append(line)
+            line = line + nrows
+            row = row + nrows
+            offset = offset + nrows * ncolumns
+
+    def __branch(self, line):
+        # the row and data offset of a data line, and its number of columns
+        first, row, offset, ncolumns = self.__rows[
+            bisect.bisect_right(self.__starts, line) - 1]
+        return row + line - first, offset + (line - first) * ncolumns, ncolumns
+
+    def slice(self, start, end):
+        """Return a binaryB with a copy of the data lines start:end of a
+        branch only, numbered from 0"""
+        N = Points.N
+        row, offset, ncolumns = self.__branch(start)
+        nrows = end - start
+        return binaryB(N.array([[0, nrows, ncolumns]]), "",
+                       self.__points[row:row+nrows].copy(),
+                       self.__data[offset:offset+nrows*ncolumns].copy())
+
+    def readlines(self, start, end):
+        """Return lines start:end as a list of strings"""
+        lines = []
+        i = start
+        while i < end:
+            if i in self.__headers:
+                lines.append(self.__headers[i])
+                i = i + 1
+                continue
+            # format all data lines of the branch in the range at once
+            row, offset, ncolumns = self.__branch(i)
+            nrows = min(end, self.branches[
+                bisect.bisect_right(self.__starts, i) - 1][2]) - i
+            points = self.__points[row:row+nrows].tolist()
+            data = self.__data[offset:offset+nrows*ncolumns].tolist()
+            values = []
+            for j in range(nrows):
+                values.extend(points[j])
+                values.extend(data[j*ncolumns:(j+1)*ncolumns])
+            lines.extend(format19_10E3list(
+                ("%4d%6d%4d%5d" + "%19.10E"*ncolumns + "\n") * nrows,
+                values).splitlines(True))
+            i = i + nrows
+        return lines
+
+    def readlabels(self, start, end):
+        """Return a dictionary mapping indices of lines start:end to
+        their TY and LAB values, for lines with nonzero TY"""
+        N = Points.N
+        row = self.__branch(start)[0]
+        points = self.__points[row:row + end - start]
+        indices = N.flatnonzero(points[:,2])
+        return dict(zip(indices.tolist(), zip(points[indices,2].tolist(),
+                                              points[indices,3].tolist())))
+
+    def readdata(self, start, end, ncolumns):
+        """Return the point numbers and the data columns of lines
+        start:end"""
+        row, offset, n = self.__branch(start)
+        if n != ncolumns - 4:
+            return None, None
+        nrows = end - start
+        return (self.__points[row:row+nrows,1],
+                self.__data[offset:offset+nrows*n].reshape(nrows, n))
+
 class bifDiag(parseB.parseBR):
 
     # some constants must not be preserved from run to run. These are:
@@ -129,9 +279,20 @@ class bifDiag(parseB.parseBR):
         return "<_=%s instance at %#010x>"%(self.__class__.__name__,result)
 
     def getLabel(self,label):
-        sols = parseS.parseS()
         #adjust maximum label/branch
         mbr = max([abs(d["BR"]) for d in self] or [None])
+        if (isinstance(label, int) or (isinstance(label, str) and
+            len(label) > 2 and label[-1].isdigit())):
+            # look up a single label with the label index, unless some
+            # labeled points do not have solutions
+            entry = self._findlabel(label)
+            labels, types, complete, mlab = self._labelindex()
+            if complete:
+                if entry is None:
+                    raise KeyError("Label %s not found"%label)
+                section, d, idx = entry
+                return d._solution(idx,mbr,mlab)
+        sols = parseS.parseS()
         mlab = max(self.getLabels() or [None])
         for d in self:
             sols.extend(d.getLabel(None,mbr=mbr,mlab=mlab))
@@ -191,6 +352,108 @@ class bifDiag(parseB.parseBR):
             # for now just attach diagnostics information to the first branch
             self[0].diagnostics = parseD.parseD(fort9_filename)
 
+    def readBinary(self,inputfile):
+        """Read a bifurcation diagram from a binary file object
+        written by writeBinary()"""
+        container = _loadbinary(inputfile)
+        N = Points.N
+        branches = None
+        if len(container["branches"]) > 0:
+            branches = _binarybranches(container).data
+        input = parseS.fileS(inputfile, scan=False)
+        fdata = container["solutiondata"]
+        offset = 0
+        for entry in container["solutions"].tolist():
+            header = entry[1:1+entry[0]]
+            total = parseS.numfloats(header)
+            input.solutions.append({'header': header,
+                                    'data': fdata[offset:offset+total]})
+            offset = offset + total
+        solutions = [parseS.AUTOSolution(input, i, input.name)
+                     for i in range(len(input.solutions))]
+        constants = None
+        text = _text(container["constants"])
+        if branches is None and text != "":
+            # otherwise the branch headers contain the constants
+            constants = parseC.parseC()
+            constants.read(StringIO(text))
+        self.__realinit(branches,solutions,None,constants)
+        text = _text(container["diagnostics"])
+        if text != "" and len(self) > 0:
+            # for now just attach diagnostics information to the first branch
+            self[0].diagnostics = parseD.parseD()
+            self[0].diagnostics.read(StringIO(text))
+
+    def writeBinary(self,output,compress=False):
+        """Write the bifurcation diagram, with its solutions and diagnostics,
+        to the binary file object output (as a numpy .npz archive).
+        With compress=True the archive is compressed."""
+        if not Points.numpyimported:
+            Points.importnumpy()
+        if Points.fromstring is None:
+            raise AUTOExceptions.AUTORuntimeError(
+                "Binary bifurcation diagrams need numpy.")
+        N = Points.N
+        branches = []
+        headers = []
+        points = [N.zeros((0, 4), N.int32)]
+        data = [N.zeros(0)]
+        solutions = []
+        fdata = [N.zeros(0)]
+        constants = ""
+        diagnostics = []
+        for d in self:
+            if len(d) > 0:
+                headerlist, columns, values = d._binarydata()
+                header = "".join(headerlist)
+                branches.append([len(header), len(values), len(values[0])])
+                headers.append(header)
+                points.append(columns)
+                data.append(N.ravel(values))
+            for idx in d.labels.getIndices():
+                x = d._gettypelabel(idx)[1]
+                if "solution" not in x:
+                    continue
+                solution = x["solution"]
+                binarydata = solution._binarydata()
+                if binarydata is None:
+                    continue
+                header, numbers = binarydata
+                solutions.append([len(header)] + header +
+                                 (16-len(header))*[0])
+                fdata.append(numbers)
+                if constants == "" and solution.c is not None:
+                    constants = str(solution.c)
+            if hasattr(d,"diagnostics"):
+                diagnostics.append(str(d.diagnostics))
+        if compress:
+            save = N.savez_compressed
+        else:
+            save = N.savez
+        save(output, format=_text(BINARY_MAGIC),
+             version=N.array([BINARY_VERSION], N.int64),
+             branches=N.array(branches, N.int64).reshape(-1, 3),
+             headers=_text("".join(headers)),
+             points=N.concatenate(points), data=N.concatenate(data),
+             solutions=N.array(solutions, N.int64).reshape(-1, 17),
+             solutiondata=N.concatenate(fdata),
+             constants=_text(constants),
+             diagnostics=_text("".join(diagnostics)))
+
+    def readBinaryFilename(self,filename):
+        inputfile = open(filename,"rb")
+        try:
+            self.readBinary(inputfile)
+        finally:
+            inputfile.close()
+
+    def writeBinaryFilename(self,filename,compress=False):
+        output = open(filename,"wb")
+        try:
+            self.writeBinary(output,compress)
+        finally:
+            output.close()
+
     def writeFilename(self,fort7_filename,fort8_filename=None,fort9_filename=None,append=False):
         #if only one filename is given, then just save the solutions file
         if fort8_filename is None:
@@ -228,23 +491,31 @@ class bifDiagBranch(parseB.AUTOBranch):
             raise AttributeError
         return super(bifDiagBranch, self).__getattr__(attr)
 
+    def _solution(self,idx,mbr=None,mlab=None):
+        # the solution at point index idx, with its branch and point
+        # number, label and type taken from the branch, or None
+        x = self._gettypelabel(idx)[1]
+        if "solution" not in x:
+            return None
+        br = abs(self["BR"])
+        pt = idx%9999 + 1
+        lab = x["LAB"]
+        ty = x["TY number"]
+        sol = x["solution"]
+        if (sol._mlab != mlab or sol._mbr != mbr or
+            br != sol["BR"] or pt != sol["PT"] or
+            ty != sol["TY number"] or lab != sol["LAB"]):
+            sol = sol.__class__(sol, BR=br, PT=pt,
+                                LAB=lab, TY=ty)
+            sol._mlab = mlab
+            sol._mbr = mbr
+        return sol
+
     def getLabel(self,label,mbr=None,mlab=None):
         sols = []
         for idx in self.labels.getIndices():
-            x = self._gettypelabel(idx)[1]
-            if "solution" in x:
-                br = abs(self["BR"])
-                pt = idx%9999 + 1
-                lab = x["LAB"]
-                ty = x["TY number"]
-                sol = x["solution"]
-                if (sol._mlab != mlab or sol._mbr != mbr or
-                    br != sol["BR"] or pt != sol["PT"] or
-                    ty != sol["TY number"] or lab != sol["LAB"]):
-                    sol = sol.__class__(sol, BR=br, PT=pt,
-                                        LAB=lab, TY=ty)
-                    sol._mlab = mlab
-                    sol._mbr = mbr
+            sol = self._solution(idx,mbr,mlab)
+            if sol is not None:
                 sols.append(sol)
         return parseS.parseS(sols)(label)
 
@@ -288,6 +559,7 @@ class bifDiagBranch(parseB.AUTOBranch):
                 x = new._gettypelabel(idx)[1]
                 if x["LAB"] ==0 and "solution" in x:
                     del x["solution"]
+                    new.labelchanges = new.labelchanges + 1
         if copy:
             if hasattr(self,"diagnostics"):
                 new.diagnostics = self.diagnostics
@@ -347,6 +619,35 @@ def test():
     if len(foo.getLabels()) != 5:
         raise AUTOExceptions.AUTORegressionError("Incorrect number of labels")
 
+    print("Looking up labels")
+    def lookups(bd):
+        sols = bd()
+        names = ["RG%d"%i for i in range(1,6)] + ["EP1", "EP2"]
+        result = []
+        for label in sols.getLabels() + [99] + names:
+            try:
+                a, b = bd(label), sols(label)
+            except KeyError:
+                result.append(label)
+                continue
+            if [a[k] for k in ["BR","PT","LAB","TY"]] + [a._mlab] != (
+                [b[k] for k in ["BR","PT","LAB","TY"]] + [b._mlab]):
+                raise AUTOExceptions.AUTORegressionError("Label incorrect")
+        return result
+    bar = bifDiag("test_data/fort.7","test_data/fort.8")
+    if lookups(bar) != [99, "RG5", "EP2"]:
+        raise AUTOExceptions.AUTORegressionError("Label lookup incorrect")
+    bar[0].relabel(10, 99)
+    bar.relabel(6, 11)
+    if (lookups(bar) != ["RG5", "EP2"] or bar(99)["TY"] != "EP" or
+        bar(11)["LAB"] != 11):
+        raise AUTOExceptions.AUTORegressionError("Label lookup incorrect")
+    bar.append(bifDiag("test_data/fort.7","test_data/fort.8")[0])
+    bar.deleteLabel(7)
+    if (lookups(bar) != [] or bar("RG4")["LAB"] != 6 or
+        bar("RG5")["LAB"] != 8 or bar("EP2")["LAB"] != 10):
+        raise AUTOExceptions.AUTORegressionError("Label lookup incorrect")
+
     print("Deleting labels")
     foo.deleteLabel(range(6,9))
     
@@ -375,6 +676,65 @@ def test():
     if foo().getIndex(0)["Label"] != 1:
         raise AUTOExceptions.AUTORegressionError("Incorrect label")
 
+    if Points.fromstring is not None:
+        print("Testing binary bifurcation diagram files")
+        import tempfile, shutil, os
+        from io import BytesIO
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, "bd.npz")
+            foo.writeBinaryFilename(filename)
+            bar = bifDiag()
+            bar.readBinaryFilename(filename)
+            output1, output2 = StringIO(), StringIO()
+            foo.write(output1)
+            bar.write(output2)
+            solutions1, solutions2 = BytesIO(), BytesIO()
+            foo().write(solutions1)
+            bar().write(solutions2)
+            if (output1.getvalue() != output2.getvalue() or
+                solutions1.getvalue() != solutions2.getvalue() or
+                bar.getLabels() != foo.getLabels() or
+                bar[0].stability() != foo[0].stability() or
+                bar[0].c != foo[0].c):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Binary file incorrect")
+            # only the branches, as columns
+            columnar = columnarbinary(filename)
+            if len(columnar) != len(foo):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Columnar branches incorrect")
+            for col, branch in zip(columnar, foo):
+                if (col.getLabels() != branch.getLabels() or
+                    col.stability() != branch.stability() or
+                    col.coordnames != branch.coordnames or
+                    (col.coordarray != branch.coordarray).any()):
+                    raise AUTOExceptions.AUTORegressionError(
+                        "Columnar branches incorrect")
+            # the text lines of the branches
+            container = _loadbinary(filename)
+            lines = binaryB(container["branches"],
+                            _text(container["headers"]),
+                            container["points"], container["data"])
+            text = output1.getvalue().splitlines(True)
+            if (lines.readlines(0, len(text)) != text or
+                lines.readlines(3, 6) != text[3:6]):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Binary file lines incorrect")
+            # from a file object without a name
+            data = BytesIO()
+            foo.writeBinary(data)
+            data.seek(0)
+            bar = bifDiag()
+            bar.readBinary(data)
+            solutions2 = BytesIO()
+            bar().write(solutions2)
+            if solutions1.getvalue() != solutions2.getvalue():
+                raise AUTOExceptions.AUTORegressionError(
+                    "Binary file object incorrect")
+        finally:
+            shutil.rmtree(tmpdir)
+
     print("bifDiag passed all tests")
 
 if __name__ == '__main__' :
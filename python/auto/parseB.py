@@ -28,6 +28,14 @@ except ImportError: # Python 3
     from collections import UserList
 from auto import Points
 
+# Lazy branches: when a bifurcation diagram file is read in bulk, only the
+# headers and labels of its branches are decoded up front; every branch
+# keeps the raw contents of its own lines, and only decodes them into
+# lines and numerical data when it is accessed. Set the environment
+# variable AUTO_LAZY_BRANCHES to 0 or parseB.lazy_branches = False to keep
+# the lines of all branches in memory from the start.
+lazy_branches = os.environ.get("AUTO_LAZY_BRANCHES", "1") not in ["", "0"]
+
 try:
     next
 except NameError: #Python < 3
@@ -280,8 +288,279 @@ class BDPoint(Points.Point):
 
     __repr__ = __str__
 
+# The fileB class reads a complete fort.7 or b.xxx file into memory and
+# finds the header lines, branch boundaries and labels of all lines at once,
+# using the fixed column widths of BR, PT, TY and LAB that AUTO writes.
+# Only the file contents are kept, and every branch takes a slice() with its
+# own lines: the lines and floating point columns of a branch are decoded
+# in bulk when the branch is used. If the file is not in
+# this fixed format, branches is None and the lines are split up front, to
+# be read one at a time instead.
+class fileB(object):
+    def __init__(self, inputfile):
+        text = inputfile.read()
+        if not isinstance(text, str):
+            text = text.decode("ascii")
+        self.name = getattr(inputfile, "name", None)
+        self.branches = None
+        if not Points.numpyimported:
+            Points.importnumpy()
+        if Points.fromstring is not None:
+            try:
+                self.__scan(text.encode("latin-1"))
+            except (UnicodeError, ValueError):
+                self.branches = None
+        if self.branches is None:
+            self.lines = text.splitlines(True)
+
+    def __columns(self, rows, start, end):
+        # the characters in columns start:end of the given lines
+        N = Points.N
+        buf = self.__buf
+        window = N.lib.stride_tricks.as_strided(
+            buf[start:], (len(buf) - end + 1, end - start), (1, 1))
+        return window[self.__starts[rows]]
+
+    def __equal(self, columns, s):
+        # which rows of columns contain the right-aligned string s
+        N = Points.N
+        s = s.rjust(columns.shape[1]).encode("ascii")
+        return (columns == N.frombuffer(s, N.uint8)).all(axis=1)
+
+    def __int(self, i, column):
+        # decode one integer column of line i
+        ends = self.__ends
+        start = 0
+        if column > 0:
+            start = ends[column - 1]
+        return int(self.readlines(i, i + 1)[0][start:ends[column]])
+
+    def __scan(self, buf):
+        N = Points.N
+        buf = N.frombuffer(buf, N.uint8)
+        self.__buf = buf
+        # only "\n" may end lines, as for file iteration
+        special = (buf < ord(" ")) & (buf != ord("\n")) & (buf != ord("\t"))
+        if special.any() or (buf == 0x85).any():
+            return
+        newlines = N.flatnonzero(buf == ord("\n"))
+        if len(buf) > 0 and buf[-1] != ord("\n"):
+            newlines = N.concatenate((newlines, [len(buf)]))
+        n = len(newlines)
+        if n == 0:
+            self.branches = []
+            return
+        self.__starts = starts = N.concatenate(([0], newlines[:-1] + 1))
+        self.__lengths = lengths = newlines - starts
+        self.__patches = {}
+
+        # the widths of the integer columns are (4,6,4,5) in current files,
+        # and (4,6,4,4) in older files: take them from the first data line
+        for i in range(n):
+            line = self.readlines(i, i + 1)[0]
+            columns = line.split(None, 4)
+            if columns[0] != '0':
+                break
+        if len(columns) < 5:
+            return
+        self.__ends = ends = []
+        end = 0
+        for column in columns[:4]:
+            end = line.index(column, end) + len(column)
+            ends.append(end)
+        width = ends[-1]
+
+        # header lines have BR=0
+        if (lengths < ends[0]).any():
+            return
+        isdata = ~self.__equal(self.__columns(N.arange(n), 0, ends[0]), "0")
+        if not isdata[-1]:
+            return
+        data = N.flatnonzero(isdata)
+        if (lengths[data] < width).any():
+            return
+        heads = self.__columns(data, 0, width)
+        # every integer column must end in a digit
+        last = heads[:, [end - 1 for end in ends]]
+        if ((last < ord("0")) | (last > ord("9"))).any():
+            return
+        pt = heads[:, ends[0]:ends[1]]
+        restarts = data[self.__equal(pt, "1") | self.__equal(pt, "-1")]
+        labelled = data[~self.__equal(heads[:, ends[1]:ends[2]], "0")]
+        self.__labelled = labelled
+        self.__labels = [(self.__int(i, 2), self.__int(i, 3))
+                         for i in labelled.tolist()]
+
+        # split into branches: a branch consists of header lines
+        # followed by data lines, and a new branch starts at a point
+        # number 1 or -1, unless the point numbers rotate
+        runstarts = N.flatnonzero(isdata[1:] != isdata[:-1]) + 1
+        datastarts = [i for i in [0] + runstarts.tolist() if isdata[i]]
+        starts = set(datastarts)
+        for i in restarts.tolist():
+            if i in starts:
+                continue
+            prevpt = self.__int(i-1, 1)
+            if prevpt not in [9999,-9999,9997,-9997,0]:
+                starts.add(i)
+            elif prevpt in [-9997,9997]:
+                self.__patches[i] = -9998
+            elif prevpt == 0:
+                self.__patches[i-1] = -9999
+        ends = N.concatenate((N.flatnonzero(~isdata), [n]))
+        branches = []
+        for start in sorted(starts):
+            end = int(ends[N.searchsorted(ends, start)])
+            if branches != [] and branches[-1][2] > start:
+                branches[-1][2] = start
+            header = start
+            if start in datastarts:
+                while header > 0 and not isdata[header-1]:
+                    header = header - 1
+            branches.append([header, start, end])
+        # check the fixed width columns against the first line of a branch
+        for header, start, end in branches:
+            columns = self.readlines(start, start + 1)[0].split(None, 4)
+            if (len(columns) < 5 or list(map(int, columns[:4])) !=
+                [self.__int(start, i) for i in range(4)]):
+                return
+        self.branches = branches
+
+    def readlines(self, start, end):
+        """Return lines start:end as a list of strings"""
+        buf = self.__buf
+        first = self.__starts[start]
+        last = len(buf)
+        if end < len(self.__starts):
+            last = self.__starts[end]
+        lines = buf[first:last].tobytes().decode("latin-1").splitlines(True)
+        for i, pt in self.__patches.items():
+            if start <= i < end:
+                # corrected point numbers
+                ends = self.__ends
+                line = lines[i - start]
+                lines[i - start] = (line[:ends[0]] +
+                                    "%*d"%(ends[1] - ends[0], pt) +
+                                    line[ends[1]:])
+        return lines
+
+    def slice(self, start, end):
+        """Return a fileB with a copy of lines start:end only, numbered
+        from 0, so that a branch can be read later without keeping the
+        contents of the whole file"""
+        N = Points.N
+        part = object.__new__(fileB)
+        part.name = self.name
+        part.branches = [[0, 0, end - start]]
+        first = int(self.__starts[start])
+        last = len(self.__buf)
+        if end < len(self.__starts):
+            last = int(self.__starts[end])
+        part.__buf = self.__buf[first:last].copy()
+        part.__starts = self.__starts[start:end] - first
+        part.__lengths = self.__lengths[start:end].copy()
+        part.__ends = self.__ends
+        part.__patches = dict([(i - start, pt) for i, pt in
+                               self.__patches.items() if start <= i < end])
+        lo, hi = N.searchsorted(self.__labelled, [start, end])
+        part.__labelled = self.__labelled[lo:hi] - start
+        part.__labels = self.__labels[lo:hi]
+        return part
+
+    def readlabels(self, start, end):
+        """Return a dictionary mapping indices of lines start:end to
+        their TY and LAB values, for lines with nonzero TY"""
+        N = Points.N
+        first, last = N.searchsorted(self.__labelled, [start, end])
+        return dict(zip((self.__labelled[first:last] - start).tolist(),
+                        self.__labels[first:last]))
+
+    def readdata(self, start, end, ncolumns):
+        """Decode data lines start:end with ncolumns columns, including
+        the BR, PT, TY and LAB columns. Returns the point numbers and a
+        two-dimensional array with the remaining columns, or None, None
+        if the lines do not have fixed width columns."""
+        N = Points.N
+        nrows = end - start
+        ends = self.__ends
+        width = ends[-1]
+        lengths = self.__lengths[start:end]
+        linelen = int(lengths[0])
+        if ncolumns <= 4 or (linelen - width) % (ncolumns - 4) != 0:
+            return None, None
+        columnlen = (linelen - width) // (ncolumns - 4)
+        if columnlen == 0 or (lengths != linelen).any():
+            return None, None
+        rows = N.ndarray((nrows, linelen), N.uint8, self.__buf,
+                         int(self.__starts[start]), (linelen + 1, 1))
+        points = N.array(rows[:, ends[0]:ends[1]])
+        points = points.view("S%d"%(ends[1] - ends[0]))[:, 0].astype(N.int64)
+        for i, pt in self.__patches.items():
+            if start <= i < end:
+                points[i - start] = pt
+        fields = N.array(rows[:, width:]).reshape(nrows,ncolumns-4,columnlen)
+        try:
+            return points, self.__decode(fields)
+        except ValueError:
+            return None, None
+
+    def __decode(self, fields):
+        # decode fixed width floating point fields, handling Fortran
+        # specialities if needed: D exponents, exponents without E, such as
+        # -2.05071-106, and a trailing E without exponent
+        N = Points.N
+        columnlen = fields.shape[-1]
+        try:
+            return fields.view("S%d"%columnlen)[:, :, 0].astype(N.float64)
+        except ValueError:
+            pass
+        fields[(fields == ord("D")) | (fields == ord("d"))] = ord("E")
+        last = fields[:, :, -1]
+        last[last == ord("E")] = ord(" ")
+        signs = (fields[:, :, 1:] == ord("-")) | (fields[:, :, 1:] == ord("+"))
+        digits = (fields[:, :, :-1] >= ord("0")) & (fields[:, :, :-1] <= ord("9"))
+        fused = signs & digits
+        nofused = ~fused.any(axis=2)
+        if nofused.all():
+            return fields.view("S%d"%columnlen)[:, :, 0].astype(N.float64)
+        # insert an E before the sign of the exponent in a wider field
+        rows, columns = N.nonzero(~nofused)
+        odd = fields[rows, columns]
+        sign = N.argmax(fused[rows, columns], axis=1) + 1
+        wide = N.empty((len(sign), columnlen + 1), N.uint8)
+        wide[:, :-1] = odd
+        j = N.arange(columnlen)
+        shift = j[N.newaxis, :] >= sign[:, N.newaxis]
+        wide[:, 1:][shift] = odd[shift]
+        wide[N.arange(len(sign)), sign] = ord("E")
+        fields[rows, columns] = ord(" ")
+        fields[rows, columns, -1] = ord("0")
+        values = fields.view("S%d"%columnlen)[:, :, 0].astype(N.float64)
+        values[rows, columns] = wide.view("S%d"%(columnlen + 1))[:, 0].astype(
+            N.float64)
+        return values
+
+def _pointnumbers(stable):
+    # the point numbers 1, 2, ... of points as in fort.7 (modulo 9999),
+    # negative for the points where the array stable is true
+    N = Points.N
+    pt = N.arange(len(stable)) % 9999 + 1
+    return N.where(stable, -pt, pt).astype(N.int32)
+
+def _renameduplicates(names):
+    # sometimes the columns names are the same: add spaces to those
+    for i in range(len(names)):
+        name = names[i]
+        if names.count(name) > 1:
+            for j in range(i+1,len(names)):
+                if names[j] == name:
+                    names[j] = name + ' '
+
 # a branch within the parseB class
 class AUTOBranch(parseBMixin, Points.Pointset):
+    # the number of times that the labels were changed in place
+    labelchanges = 0
+
     def __init__(self,input=None,prevline=None,coordnames=[]):
         self.__fullyParsed = True
         if isinstance(input,AUTOBranch):
@@ -294,9 +573,29 @@ class AUTOBranch(parseBMixin, Points.Pointset):
     def __getattr__(self,attr):
         if self.__fullyParsed or attr == "__del__":
             raise AttributeError
+        if attr == "_AUTOBranch__datalist":
+            # branch read lazily from a fileB: fetch its lines on demand
+            inputfile, start, end = self.__bulk
+            self.__datalist = inputfile.readlines(start, end)
+            return self.__datalist
         self.__parse()
         return super(AUTOBranch, self).__getattribute__(attr)
 
+    def __loaded(self):
+        # are the lines of an unparsed branch in memory?
+        return self.__bulk is None or "_AUTOBranch__datalist" in self.__dict__
+
+    def __line(self,index):
+        # return one line of an unparsed branch without loading all lines
+        if self.__loaded():
+            return self.__datalist[index]
+        inputfile, start, end = self.__bulk
+        if index < 0:
+            index = index + end - start
+        if index < 0 or index >= end - start:
+            raise IndexError("list index out of range")
+        return inputfile.readlines(start + index, start + index + 1)[0]
+
     def _gettypelabel(self,idx):
         for k,v in self.labels[idx].items():
             if "LAB" in v:
@@ -309,36 +608,55 @@ class AUTOBranch(parseBMixin, Points.Pointset):
         global N
         if not Points.numpyimported:
             Points.importnumpy()
-        self.__fullyParsed = True
         fromstring = Points.fromstring
         N = Points.N
-        datalist = self.__datalist
-        del self.__datalist
-        line0 = datalist[0].split()
+        nrows = len(self)
+        line0 = self.__line(0).split()
+        datalist = None
+        if self.__loaded():
+            datalist = self.__datalist
+            del self.__datalist
+        bulk = self.__bulk
+        self.__bulk = None
+        self.__fullyParsed = True
         self.BR = int(line0[0])
         ncolumns = len(line0)
-        nrows = len(datalist)
-        datalist = "".join(datalist)
-        if fromstring: #numpy
+        points = None
+        if bulk is not None:
+            inputfile, start, end = bulk
+            points, data = inputfile.readdata(start, end, ncolumns)
+            if points is None and datalist is None:
+                datalist = inputfile.readlines(start, end)
+        if points is not None:
+            pass
+        elif fromstring: #numpy
+            datalist = "".join(datalist)
             data = []
             if "D" not in datalist:
-                data = fromstring(datalist, dtype=float, sep=' ')
+                try:
+                    data = fromstring(datalist, dtype=float, sep=' ')
+                except ValueError:
+                    # newer numpy versions do not stop at the first
+                    # invalid number
+                    data = []
             if len(data) != nrows * ncolumns:
-                data = N.array(map(AUTOatof,datalist.split()), 'd')
+                data = N.array(list(map(AUTOatof,datalist.split())), 'd')
             else:
                 #make sure the last element is correct
                 #(fromstring may not do this correctly for a
                 #string like -2.05071-106)
                 data[-1] = AUTOatof(datalist[datalist.rfind(' ')+1:].strip())
         else: #array
-            datalist = datalist.split()
+            datalist = "".join(datalist).split()
             try:
-                data = N.array(map(float, datalist), 'd')
+                data = N.array(list(map(float, datalist)), 'd')
             except ValueError:
-                data = N.array(map(AUTOatof, datalist), 'd')
-        data.shape = (-1,ncolumns)
-        coordarray = N.transpose(data[:,4:]).copy()
-        points = data[:,1]
+                data = N.array(list(map(AUTOatof, datalist)), 'd')
+        if points is None:
+            data.shape = (-1,ncolumns)
+            points = data[:,1]
+            data = data[:,4:]
+        coordarray = N.transpose(data).copy()
         if hasattr(N,"concatenate"):
             stability = self.__parsenumpy(points)
         else:
@@ -351,13 +669,7 @@ class AUTOBranch(parseBMixin, Points.Pointset):
             else:
                 stab = "U"
             self.labels.update(abs(i)-1, branchtype, {"stab": stab})
-        # sometimes the columns names are the same: add spaces to those
-        for i in range(len(self.coordnames)):
-            name = self.coordnames[i]
-            if self.coordnames.count(name) > 1:
-                for j in range(i+1,len(self.coordnames)):
-                    if self.coordnames[j] == name:
-                        self.coordnames[j] = name + ' '
+        _renameduplicates(self.coordnames)
         Points.Pointset.__init__(self,{
             "coordarray": coordarray,
             "coordnames": self.coordnames,
@@ -403,6 +715,7 @@ class AUTOBranch(parseBMixin, Points.Pointset):
                 if item == "TY":
                     value = reverse_type_translation(value)
                 self.TY = value
+                self.labelchanges = self.labelchanges + 1
                 # sync solution TYs
                 for k,x in map(self._gettypelabel, self.labels.getIndices()):
                     v = x["TY number"]
@@ -416,11 +729,52 @@ class AUTOBranch(parseBMixin, Points.Pointset):
 
     def __len__(self):
         if not self.__fullyParsed:
+            if self.__bulk is not None:
+                inputfile, start, end = self.__bulk
+                return end - start
             return len(self.__datalist)
         if len(self.coordarray) == 0:
             return 0
         return Points.Pointset.__len__(self)
 
+    def _extend(self,other):
+        # append the points of the unparsed branch other, which continues
+        # this branch, in place (for stream.DiagramTail)
+        n = len(self)
+        if self.__fullyParsed:
+            N = Points.N
+            coordarray = other.coordarray
+            # if the stability of the last part of this branch continues
+            # in other, that part no longer ends at the last point
+            stab = None
+            for idx in other.labels.getIndices():
+                for info in other.labels[idx].values():
+                    stab = stab or info.get("stab")
+                if stab is not None:
+                    break
+            if n > 0 and n - 1 in self.labels:
+                for key, info in list(self.labels[n-1].items()):
+                    if info.get("stab") is not None and info["stab"] == stab:
+                        del info["stab"]
+                        if info == {}:
+                            self.labels.remove(n-1, key)
+            if n == 0:
+                self.coordarray = coordarray
+            elif hasattr(N, "concatenate"):
+                self.coordarray = N.concatenate((self.coordarray, coordarray),
+                                                1)
+            else:
+                self.coordarray = N.array([list(a) + list(b) for a, b in
+                                           zip(self.coordarray, coordarray)])
+        else:
+            datalist = self.__datalist
+            self.__bulk = None
+            datalist.extend(other.__datalist)
+        self.labelchanges = self.labelchanges + 1
+        for idx in other.labels.getIndices():
+            for key, info in other.labels[idx].items():
+                self.labels.update(idx + n, key, info)
+
     def deleteLabel(self,label=None,keepTY=0,keep=0,copy=0):
         """Removes solutions with the given labels or type names"""
         if label is None:
@@ -431,10 +785,11 @@ class AUTOBranch(parseBMixin, Points.Pointset):
         if copy:
             new = self.__class__(self)
             new.labels = Points.PointInfo(self.labels.by_index.copy())
-            if not self.__fullyParsed:
+            if not self.__fullyParsed and self.__loaded():
                 new.__datalist = self.__datalist[:]
         else:
             new = self
+            self.labelchanges = self.labelchanges + 1
         for idx in new.labels.getIndices():
             ty_name,v = new._gettypelabel(idx)
             if "LAB" not in v:
@@ -461,7 +816,7 @@ class AUTOBranch(parseBMixin, Points.Pointset):
             label = old_label
             new = self.__class__(self)
             labels = {}
-            if not self.__fullyParsed:
+            if not self.__fullyParsed and self.__loaded():
                 new.__datalist = self.__datalist[:]
             for index in self.labels.getIndices():
                 labels[index] = self.labels[index].copy()
@@ -475,6 +830,7 @@ class AUTOBranch(parseBMixin, Points.Pointset):
             new.labels = Points.PointInfo(labels)
             return new
         labels = self.labels
+        self.labelchanges = self.labelchanges + 1
         if isinstance(old_label, int):
             old_label = [old_label]
             new_label = [new_label]
@@ -490,6 +846,7 @@ class AUTOBranch(parseBMixin, Points.Pointset):
 
     def uniquelyLabel(self,label=1):
         """Make all labels in the file unique and sequential"""
+        self.labelchanges = self.labelchanges + 1
         for index in self.labels.getIndices():
             v = self._gettypelabel(index)[1]
             if v.get("LAB",0) != 0:
@@ -553,13 +910,13 @@ class AUTOBranch(parseBMixin, Points.Pointset):
             i, j = index
             if isinstance(j, str):
                 j = self.coordnames.index(j)
-            return AUTOatof(self.__datalist[i].split()[4+j])
+            return AUTOatof(self.__line(i).split()[4+j])
         if index in ("BR", "TY", "TY number") and index not in self.coordnames:
             if index == "BR":
                 if self.__fullyParsed:
                     return self.BR
                 else:
-                    return int(self.__datalist[0].split(None,1)[0])
+                    return int(self.__line(0).split(None,1)[0])
             elif index == "TY":
                 return type_translation(self.TY)["short name"]
             else: #"TY number"
@@ -603,7 +960,7 @@ class AUTOBranch(parseBMixin, Points.Pointset):
         else:
             labels = self.labels[index]
             coordnames = self.coordnames
-            coordarray = self.__datalist[index].split()
+            coordarray = self.__line(index).split()
             pt = int(coordarray[1])
             coordarray = list(map(AUTOatof, coordarray[4:]))
         label = None
@@ -619,7 +976,7 @@ class AUTOBranch(parseBMixin, Points.Pointset):
                 labels["No Label"] = label
         return BDPoint({'coordarray': coordarray,
                         'coordnames': coordnames,
-                        'labels': labels},self,index)
+                        'labels': labels},self,index,pt)
 
     def getLabels(self):
         """Get all the labels from the solution"""
@@ -722,7 +1079,96 @@ class AUTOBranch(parseBMixin, Points.Pointset):
     def writeRaw(self,output):
         data = self.toArray()
         output.write("\n".join(["".join(["%24.15E"%v for v in d]) for d in data])+"\n")
-                
+
+    def _binarydata(self):
+        # the header lines, the BR, PT, TY and LAB columns, and the data
+        # columns of the branch, as write() would write them, for binary
+        # storage
+        data = self.coordarray
+        N = Points.N
+        headerlist = [l for l in self.headerlist if " PT " not in l]
+        if self.headernames != []:
+            headerlist.append("".join(["   0    PT  TY  LAB "] +
+                ["%-19s"%name for name in self.headernames]) + "\n")
+        n = len(data[0])
+        columns = N.zeros((n, 4), N.int32)
+        columns[:,0] = self.BR
+        pt = N.arange(1, n + 1)
+        start = 0
+        for end in self.stability():
+            if end < 0:
+                pt[start:-end] = -pt[start:-end]
+            start = abs(end)
+        columns[:,1] = N.where(pt < 0, -((-pt-1) % 9999) - 1, (pt-1) % 9999 + 1)
+        for i in self.labels.getIndices():
+            for k,label in self.labels[i].items():
+                if "LAB" in label:
+                    columns[i,2] = label["TY number"]
+                    columns[i,3] = label["LAB"]
+                    break
+        return headerlist, columns, N.transpose(data)
+
+    def _columnardata(self):
+        # the PT, TY and LAB columns, the data columns and their names for
+        # ColumnarBranch; a branch that was not parsed yet is decoded
+        # straight from its file, without creating its points
+        N = Points.N
+        points = None
+        if not self.__fullyParsed and self.__bulk is not None:
+            inputfile, start, end = self.__bulk
+            points, data = inputfile.readdata(start, end,
+                                              len(self.__line(0).split()))
+        if points is None:
+            headerlist, columns, data = self._binarydata()
+            return (columns[:,1].copy(), columns[:,2].copy(),
+                    columns[:,3].copy(), self.coordarray, self.coordnames)
+        n = len(points)
+        types = N.zeros(n, N.int32)
+        lab = N.zeros(n, N.int32)
+        for i in self.labels.getIndices():
+            for k,label in self.labels[i].items():
+                if "LAB" in label:
+                    types[i] = label["TY number"]
+                    lab[i] = label["LAB"]
+                    break
+        names = list(self.coordnames)
+        _renameduplicates(names)
+        return (_pointnumbers(points < 0), types, lab, N.transpose(data),
+                names)
+
+    def points_array(self):
+        """Return all points as a numpy record array with the fields BR,
+        PT, TY number, TY name and LAB followed by one field per column,
+        without creating a point object for every point."""
+        if not Points.numpyimported:
+            Points.importnumpy()
+        if Points.fromstring is None:
+            raise AUTOExceptions.AUTORuntimeError(
+                "points_array() needs numpy.")
+        N = Points.N
+        headerlist, columns, data = self._binarydata()
+        dtype = ([("BR", N.int32), ("PT", N.int32), ("TY number", N.int32),
+                  ("TY name", "U12"), ("LAB", N.int32)] +
+                 [(name, N.float64) for name in self.coordnames])
+        points = N.zeros(len(data), dtype)
+        for i, name in enumerate(["BR", "PT", "TY number"]):
+            points[name] = columns[:,i]
+        points["LAB"] = columns[:,3]
+        points["TY name"] = "No Label"
+        for i in self.labels.getIndices():
+            name = self._gettypelabel(i)[0]
+            if name != "No Label":
+                points["TY name"][i] = name
+        for i, name in enumerate(self.coordnames):
+            points[name] = data[:,i]
+        return points.view(N.recarray)
+
+    def columnar(self):
+        """Return the branch as a ColumnarBranch, which shares its data
+        if the branch was parsed, and otherwise decodes it straight from
+        its file"""
+        return ColumnarBranch(self)
+
     def write(self, output, columnlen=19):
         if columnlen == 19 and not self.__fullyParsed:
             output.writelines(self.headerlist)
@@ -743,6 +1189,12 @@ class AUTOBranch(parseBMixin, Points.Pointset):
         data = self.coordarray
         istab = 0
         format = "%"+str(columnlen)+"."+str(columnlen-9)+"E"
+        if columnlen == 19:
+            format = "%19.10E"
+        # format the lines in blocks of rows at once
+        template = "%4d%6d%4d%5d" + format*len(data) + "\n"
+        rows = Points.N.transpose(data).tolist()
+        values = []
         stability = self.stability()
         for i in range(len(data[0])):
             pt = i+1
@@ -762,14 +1214,16 @@ class AUTOBranch(parseBMixin, Points.Pointset):
                 pt = -((-pt-1) % 9999) - 1
             else:
                 pt = ((pt-1) % 9999) + 1
-            output_line = "%4d%6d%4d%5d"%(br,pt,tynumber,lab)
-            if columnlen == 19:
-                for j in range(len(data)):
-                    output_line = output_line + format19_10E3(data[j,i])
-            else:
-                for j in range(len(data)):
-                    output_line = output_line + format%data[j,i]
-            output.write(output_line+"\n")
+            values.extend((br,pt,tynumber,lab))
+            values.extend(rows[i])
+            if (i + 1) % 1000 == 0 or i + 1 == len(rows):
+                nrows = (i % 1000) + 1
+                if columnlen == 19:
+                    output.write(AUTOutil.format19_10E3list(template*nrows,
+                                                            values))
+                else:
+                    output.write(template*nrows % tuple(values))
+                values = []
 
     def writeShort(self):
         self.write(sys.stdout, columnlen=14)
@@ -802,7 +1256,7 @@ class AUTOBranch(parseBMixin, Points.Pointset):
                                              ty_name,label["LAB"])]+
                             ["%14.5E"%d[index] for d in data])
             else:
-                linedata = self.__datalist[index].split()
+                linedata = self.__line(index).split()
                 linelist = (
                     ["%4d%6d%4s%5d"%(abs(int(linedata[0])),abs(int(linedata[1])),
                                      ty_name,label["LAB"])] +
@@ -854,6 +1308,10 @@ class AUTOBranch(parseBMixin, Points.Pointset):
         # Another way for a section to start is with a point number
         # equal to 1.
         self._lastline = None
+        self.__bulk = None
+        if isinstance(inputfile, fileB):
+            self.__readbulk(inputfile, prevline or 0)
+            return
         if hasattr(str,"split"):
             split = str.split
         else:
@@ -912,7 +1370,29 @@ class AUTOBranch(parseBMixin, Points.Pointset):
         self.__datalist = datalist
         self.c = self.parseHeader(headerlist)
 
-    def parseHeader(self,headerlist):
+    def __readbulk(self,inputfile,i):
+        # read branch i from a fileB; the index of the next branch
+        # takes the place of the next line
+        if i >= len(inputfile.branches):
+            self.labels = None
+            return
+        header, start, end = inputfile.branches[i]
+        if i + 1 < len(inputfile.branches):
+            self._lastline = i + 1
+        labels = {}
+        for j, (ty, lab) in inputfile.readlabels(start, end).items():
+            key = type_translation(ty)["short name"]
+            labels[j] = {key: {"LAB":lab,"TY number":ty}}
+        self.labels = Points.PointInfo(labels)
+        self.c = self.parseHeader(inputfile.readlines(header, start),
+                                  inputfile.readlines(start, start + 1)[0])
+        # keep only the lines of this branch, so that the contents of the
+        # whole file can be freed
+        self.__bulk = inputfile.slice(start, end), 0, end - start
+        if not lazy_branches:
+            self.__datalist = self.__bulk[0].readlines(0, end - start)
+
+    def parseHeader(self,headerlist,line0=None):
         from auto import parseC
         self.headerlist = headerlist
         if hasattr(str,"split"):
@@ -923,12 +1403,14 @@ class AUTOBranch(parseBMixin, Points.Pointset):
         line = ""
         if headerlist != []:
             line = headerlist[-1]
-        ncolumns = len(split(self.__datalist[0])) - 4
+        if line0 is None:
+            line0 = self.__datalist[0]
+        ncolumns = len(split(line0)) - 4
         self.headernames = []
         self.coordnames = []
         self.TY = 0
         if " PT " in line:
-            linelen = len(self.__datalist[0])
+            linelen = len(line0)
             columnlen = (linelen - 19) // ncolumns
             n = linelen - columnlen * ncolumns
             for i in range(ncolumns):
@@ -982,14 +1464,251 @@ class AUTOBranch(parseBMixin, Points.Pointset):
             dict.parseline(" ".join(words[1:]),userspec)
         return dict
 
+# A ColumnarBranch holds a branch by column only: the data columns, and
+# numpy arrays with the point number, type number and label of every point,
+# as written to fort.7, instead of label dictionaries. It is read-only and
+# has no attributes other than its slots, so that a long branch takes not
+# much more memory than its numbers. It keeps the methods of AUTOBranch to
+# look up columns, labels and stability.
+
+class ColumnarBranch(object):
+    __slots__ = ("BR", "TY", "c", "coordnames", "coordarray",
+                 "PT", "types", "LAB")
+
+    def __init__(self,branch):
+        """Make a columnar copy of the AUTOBranch branch; the data
+        columns are shared with it if it was parsed, and otherwise
+        decoded straight from its file without parsing it"""
+        if not Points.numpyimported:
+            Points.importnumpy()
+        if Points.fromstring is None:
+            raise AUTOExceptions.AUTORuntimeError(
+                "ColumnarBranch needs numpy.")
+        if isinstance(branch, ColumnarBranch):
+            for attr in self.__slots__:
+                setattr(self, attr, getattr(branch, attr))
+            return
+        (self.PT, self.types, self.LAB, self.coordarray,
+         self.coordnames) = branch._columnardata()
+        self.BR = branch["BR"]
+        self.TY = branch.TY
+        self.c = branch.c
+
+    def __len__(self):
+        return len(self.PT)
+
+    def __getitem__(self,index):
+        if index in ("BR", "TY", "TY number") and index not in self.coordnames:
+            if index == "BR":
+                return self.BR
+            elif index == "TY":
+                return type_translation(self.TY)["short name"]
+            return self.TY
+        if isinstance(index, str):
+            return self.coordarray[self.coordnames.index(index)]
+        return self.getIndex(index)
+
+    def __call__(self,label=None):
+        return self.getLabel(label)
+
+    def __str__(self):
+        return "Columnar branch %d: %d points, labels %s"%(
+            self.BR, len(self), self.getLabels())
+
+    def getIndex(self,index):
+        """Return the point with index index, or a branch with the points
+        of the slice index"""
+        if isinstance(index, slice):
+            new = self.__class__(self)
+            # the points are numbered again, as for AUTOBranch
+            new.PT = _pointnumbers(self.PT[index] < 0)
+            new.types = self.types[index]
+            new.LAB = self.LAB[index]
+            new.coordarray = self.coordarray[:,index]
+            return new
+        if index < 0:
+            index = index + len(self)
+        ty = int(self.types[index])
+        labels = {type_translation(ty)["short name"]:
+                  {"TY number": ty, "LAB": int(self.LAB[index])}}
+        if ty == 0:
+            labels = {"No Label": labels.popitem()[1]}
+        return BDPoint({"coordarray": list(self.coordarray[:,index]),
+                        "coordnames": self.coordnames,
+                        "labels": labels}, self, index, int(self.PT[index]))
+
+    def __names(self):
+        # the type names of all points
+        N = Points.N
+        names = N.zeros(len(self), "U12")
+        for ty in N.unique(self.types):
+            names[self.types == ty] = type_translation(int(ty))["short name"]
+        return names
+
+    def getLabels(self):
+        """Get all the labels of the branch"""
+        return [int(lab) for lab in self.LAB[self.LAB != 0]]
+
+    def __find(self,label,names):
+        # the index of the labeled point 'HB3' as a list of at most one
+        j = 2
+        if not label[2].isdigit():
+            j = 3
+        number = int(label[j:])
+        if number < 1:
+            return []
+        indices = Points.N.flatnonzero((names == label[:j]) & (self.LAB != 0))
+        return indices[number-1:number]
+
+    def getLabel(self,label):
+        """Given a label number, or a type name with a number such as
+        'HB3', return the point; given type names and/or label numbers,
+        return a branch with only those labels"""
+        N = Points.N
+        if label is None:
+            return self
+        if isinstance(label, int):
+            indices = N.flatnonzero(self.LAB == label)
+        elif (isinstance(label, str) and len(label) > 2 and
+              label[-1].isdigit()):
+            indices = self.__find(label, self.__names())
+        else:
+            if not AUTOutil.isiterable(label):
+                label = [label]
+            names = self.__names()
+            keep = N.zeros(len(self), bool)
+            for lab in label:
+                if isinstance(lab, str) and len(lab) > 2 and lab[-1].isdigit():
+                    keep[self.__find(lab, names)] = True
+                elif isinstance(lab, str):
+                    keep |= (names == lab) & (self.LAB != 0)
+                else:
+                    keep |= self.LAB == lab
+            new = self.__class__(self)
+            new.types = N.where(keep, self.types, 0)
+            new.LAB = N.where(keep, self.LAB, 0)
+            return new
+        if len(indices) == 0:
+            raise KeyError("Label %s not found"%label)
+        return self.getIndex(int(indices[0]))
+
+    def stability(self):
+        """Returns a list of point numbers where the stability
+        changes: the end point of each part is stored."""
+        N = Points.N
+        pt = self.PT
+        if len(pt) == 0:
+            return []
+        stab = N.concatenate((N.flatnonzero(pt[:-1]*pt[1:] < 0),
+                              [len(pt)-1])) + 1
+        return [int(p) for p in N.where(N.take(pt, stab-1) < 0, -stab, stab)]
+
+def columnarbranches(inputfile):
+    """Read the branches of a fort.7 or b.xxx file, given by name or as an
+    open file, as a list of ColumnarBranch objects. Their data columns are
+    decoded straight from the file, without parsing the points first."""
+    branches = parseBR()
+    if isinstance(inputfile, str):
+        branches.readFilename(inputfile)
+    else:
+        branches.read(inputfile)
+    return [ColumnarBranch(branch) for branch in branches]
+
+# The label index of a parseBR maps every label number to the first labeled
+# point with that label, and every type name to the list of its labeled
+# points, in order, as (branch number, branch, point index) triples; it
+# also keeps the index of the first point of every branch in the whole
+# diagram. It is built on the first lookup of a label, and built again once
+# branches were added, removed, replaced or changed in length, or their
+# labels were changed by the methods of AUTOBranch, which count their
+# changes in labelchanges. Entries are also checked when they are used,
+# and the index is built again if an entry no longer matches or a label is
+# not found, e.g. after label information of a point was changed directly.
+
 class parseBR(parseBMixin, UserList):
     def __init__(self,filename=None):
+        self.__index = None
         if isinstance(filename, str):
             UserList.__init__(self)
             self.readFilename(filename)
         else:
             UserList.__init__(self,filename)
 
+    def _labelindex(self):
+        """Return the label index (labels, types, complete, maxlabel):
+        labels maps label numbers and types maps type names to (branch
+        number, branch, point index) triples; complete tells if all
+        labeled points have solutions, and maxlabel is the highest label
+        number, or None"""
+        index = self.__dict__.get("_parseBR__index")
+        if index is not None:
+            # are the branches and their labels unchanged?
+            changes = index[4]
+            if (len(changes) != len(self.data) or
+                [1 for (d, n, l), e in zip(changes, self.data)
+                 if d is not e or d.labelchanges != n or len(d) != l]):
+                index = None
+        if index is None:
+            labels = {}
+            types = {}
+            complete = True
+            for i, d in enumerate(self.data):
+                for idx in d.labels.getIndices():
+                    ty_name, x = d._gettypelabel(idx)
+                    if x.get("LAB",0) == 0:
+                        continue
+                    entry = (i, d, idx)
+                    if x["LAB"] not in labels:
+                        labels[x["LAB"]] = entry
+                    types.setdefault(ty_name, []).append(entry)
+                    complete = complete and "solution" in x
+            changes = [(d, d.labelchanges, len(d)) for d in self.data]
+            offsets = [0]
+            for d, n, l in changes:
+                offsets.append(offsets[-1] + l)
+            index = (labels, types, complete, max(labels or [None]),
+                     changes, offsets)
+            self.__index = index
+        return index[:4]
+
+    def _branchoffset(self,section):
+        """Return the index in the whole diagram of the first point of
+        branch number section, using the label index"""
+        self._labelindex()
+        return self.__index[5][section]
+
+    def _findlabel(self,label):
+        """Return the (branch number, branch, point index) of the label
+        number or label name such as 'HB3' label using the label index,
+        or None if it is not found"""
+        if isinstance(label, int):
+            name, number = None, None
+        else:
+            j = 2
+            if not label[2].isdigit():
+                j = 3
+            name, number = label[:j], int(label[j:])
+        for rebuild in [False, True]:
+            if rebuild:
+                self.__index = None
+            labels, types, complete, maxlabel = self._labelindex()
+            if name is None:
+                entry = labels.get(label)
+            elif 0 < number <= len(types.get(name, [])):
+                entry = types[name][number-1]
+            else:
+                entry = None
+            if entry is None:
+                continue
+            i, d, idx = entry
+            if (i < len(self.data) and self.data[i] is d and
+                idx in d.labels):
+                ty_name, x = d._gettypelabel(idx)
+                if (x.get("LAB",0) != 0 and
+                    (x["LAB"] == label or ty_name == name)):
+                    return entry
+        return None
+
     # Removes solutions with the given labels or type names
     def deleteLabel(self,label=None,keepTY=0,keep=0,copy=0):
         if copy:
@@ -1030,31 +1749,20 @@ class parseBR(parseBMixin, UserList):
     # Given a label, return the correct solution
     def getLabel(self,label):
         if isinstance(label, int):
-            i = 0
-            section = 0
-            for d in self.data:
-                l = len(d.coordarray[0])
-                try:
-                    item = d.getLabel(label)
-                    item["index"] = item["index"] + i
-                    item["section"] = section
-                    return item
-                except (KeyError, IndexError):
-                    pass
-                i = i + l
-                section = section + 1
-            raise KeyError("Label %s not found"%label)
+            entry = self._findlabel(label)
+            if entry is None:
+                raise KeyError("Label %s not found"%label)
+            section, d, idx = entry
+            item = d.getIndex(idx)
+            item["index"] = idx + self._branchoffset(section)
+            item["section"] = section
+            return item
         elif isinstance(label, str) and len(label) > 2 and label[-1].isdigit():
-            j = 2
-            if not label[2].isdigit():
-                j = 3
-            number = int(label[j:])
-            for d in self.data:
-                l = len(d.getLabel(label[:j]).getLabels())
-                if number <= l:
-                    return d.getLabel(label[:j]+str(number))
-                number -= l
-            raise KeyError("Label %s not found"%label)
+            entry = self._findlabel(label)
+            if entry is None:
+                raise KeyError("Label %s not found"%label)
+            section, d, idx = entry
+            return d.getIndex(idx)
         new = []
         label = label[:]
         for d in self.data:
@@ -1199,6 +1907,10 @@ class parseBR(parseBMixin, UserList):
 
     def read(self,inputfile):
         # We now go through the file and read the branches.
+        if not isinstance(inputfile, fileB) and hasattr(inputfile, "read"):
+            inputfile = fileB(inputfile)
+        if isinstance(inputfile, fileB) and inputfile.branches is None:
+            inputfile = iter(inputfile.lines)
         prevline = None
         coordnames = []
         lastc = None
@@ -1315,6 +2027,7 @@ def pointtest(a,b):
         raise AUTOExceptions.AUTORegressionError("Data sections have different lengths")
 
 def test():
+    import weakref
     print("Testing reading from a filename")
     foo = parseB()
     foo.readFilename("test_data/fort.7")    
@@ -1331,6 +2044,182 @@ def test():
     pointtest(foo.getIndex(0),foo.getIndex(57))
 
 
+    print("Testing the bulk reader with Fortran number formats")
+    try:
+        from cStringIO import StringIO
+    except ImportError: # Python 3
+        from io import StringIO
+    fp = open("test_data/fort.7","r")
+    lines = fp.readlines()
+    fp.close()
+    lines[14] = lines[14].replace("E-01", "D-01")
+    lines[15] = lines[15].replace("  1.308642E-01", "  1.308642-101")
+    lines[16] = lines[16].replace("  1.307954E-01", "     1.307954E")
+    bulk = parseBR()
+    bulk.read(StringIO("".join(lines)))
+    bar = parseBR()
+    bar.read(iter(lines))
+    if (len(bulk) != 1 or len(bulk[0]) != len(bar[0]) or
+        bulk[0].stability() != bar[0].stability() or
+        bulk.getLabels() != bar.getLabels()):
+        raise AUTOExceptions.AUTORegressionError("Bulk reader incorrect")
+    for a, b in zip(bulk[0].coordarray, bar[0].coordarray):
+        if list(a) != list(b):
+            raise AUTOExceptions.AUTORegressionError("Bulk reader incorrect")
+    if bulk[0].coordarray[0][3] != 1.308642e-101:
+        raise AUTOExceptions.AUTORegressionError("Exponent incorrect")
+
+    print("Testing writing numbers in bulk")
+    for values in [[0.0, -1.5, 2.25e-7, -1234.5],
+                   [1.308642e-101, -3.5e150, float("inf"), float("nan")]]:
+        template = ("%4d" + "%19.10E"*len(values) + "\n")*2
+        expected = 2*("%4d" % 1 + "".join(map(format19_10E3, values)) + "\n")
+        if AUTOutil.format19_10E3list(template, 2*([1]+values)) != expected:
+            raise AUTOExceptions.AUTORegressionError("Bulk writing incorrect")
+
+    print("Testing the CHORD constant in the header")
+    chordlines = lines[:8] + ["   0   CHORD= 5.0000E-01\n"] + lines[8:]
+    for i in range(2):
+        chord = parseBR()
+        chord.read(StringIO("".join(chordlines)))
+        if chord[0].c["CHORD"] != 0.5 or chord[0].c["NWTN"] != 3:
+            raise AUTOExceptions.AUTORegressionError("CHORD header incorrect")
+        out = StringIO()
+        chord[0].write(out)
+        chordlines = out.getvalue().splitlines(True)
+
+    print("Testing lazy loading of branches")
+    lazy = parseBR()
+    lazy.read(StringIO("".join(lines)))
+    branch = lazy[0]
+    if (branch.getLabels() != bar.getLabels() or len(branch) != len(bar[0])
+        or branch[10, 1] != bar[0].coordarray[1][10] or
+        branch["BR"] != bar[0].BR):
+        raise AUTOExceptions.AUTORegressionError("Lazy branch incorrect")
+    if (lazy_branches and Points.fromstring is not None and
+        ("coordarray" in branch.__dict__ or
+         "_AUTOBranch__datalist" in branch.__dict__)):
+        raise AUTOExceptions.AUTORegressionError("Branch loaded too early")
+    if list(branch.coordarray[0]) != list(bulk[0].coordarray[0]):
+        raise AUTOExceptions.AUTORegressionError("Lazy branch incorrect")
+    inputfile = fileB(StringIO("".join(lines)))
+    ref = weakref.ref(inputfile)
+    lazy = parseBR()
+    lazy.read(inputfile)
+    del inputfile
+    if ref() is not None:
+        raise AUTOExceptions.AUTORegressionError(
+            "Lazy branches keep the whole file")
+    if [lazy[i].getLabels() for i in range(len(lazy))] != [
+        bar[i].getLabels() for i in range(len(bar))]:
+        raise AUTOExceptions.AUTORegressionError("Lazy branch incorrect")
+    for i in range(len(lazy)):
+        if list(lazy[i].coordarray[-1]) != list(bar[i].coordarray[-1]):
+            raise AUTOExceptions.AUTORegressionError("Lazy branch incorrect")
+
+    print("Testing columns and points_array")
+    branch = bar[0]
+    names = [branch.coordnames[2], branch.coordnames[0]]
+    columns = branch.columns(names)
+    if (len(columns) != len(branch) or
+        list(columns[10]) != [branch[10][names[0]], branch[10][names[1]]] or
+        list(branch.columns(branch.coordnames[1:3])[5]) !=
+        list(branch.coordarray[1:3,5])):
+        raise AUTOExceptions.AUTORegressionError("Columns incorrect")
+    if Points.fromstring is not None:
+        points = branch.points_array()
+        for i in [0, 10, len(branch)-1]:
+            p = branch[i]
+            if ((points["BR"][i], points["PT"][i], points["TY number"][i],
+                 points["TY name"][i], points["LAB"][i],
+                 points[names[0]][i]) !=
+                (p["BR"], p["PT"], p["TY number"], p["TY name"], p["LAB"],
+                 p[names[0]])):
+                raise AUTOExceptions.AUTORegressionError(
+                    "points_array incorrect")
+        if list(points[points.LAB != 0].LAB) != branch.getLabels():
+            raise AUTOExceptions.AUTORegressionError("points_array incorrect")
+
+        print("Testing columnar branches")
+        col = branch.columnar()
+        lab = branch.getLabels()[1]
+        name = branch.getLabel(lab)["TY name"]
+        if (len(col) != len(branch) or col.getLabels() != branch.getLabels() or
+            col.stability() != branch.stability() or
+            list(col[names[0]]) != list(branch[names[0]]) or
+            col["BR"] != branch["BR"] or col["TY"] != branch["TY"] or
+            hasattr(col, "__dict__")):
+            raise AUTOExceptions.AUTORegressionError("Columnar branch incorrect")
+        for key in [lab, name+"1", -1, 10]:
+            if isinstance(key, int) and key in [-1, 10]:
+                p, q = col[key], branch[key]
+            else:
+                p, q = col(key), branch(key)
+            if ((p["PT"], p["TY name"], p["LAB"], p[names[0]]) !=
+                (q["PT"], q["TY name"], q["LAB"], q[names[0]])):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Columnar branch incorrect")
+        if (col.getLabel([name, "EP1"]).getLabels() !=
+            branch.getLabel([name, "EP1"]).getLabels()):
+            raise AUTOExceptions.AUTORegressionError("Columnar branch incorrect")
+        for key in [slice(10, 40), slice(-5, None), slice(None, 30, 4)]:
+            p, q = col[key], branch[key]
+            if (len(p) != len(q) or p.getLabels() != q.getLabels() or
+                p.stability() != q.stability() or
+                list(p[names[0]]) != list(q[names[0]]) or
+                p[-1]["PT"] != q[-1]["PT"]):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Columnar slice incorrect")
+
+        print("Testing columnar branches straight from files")
+        lazy = parseBR("test_data/fort.7")
+        branches = parseBR("test_data/fort.7")
+        for i, col in enumerate([lazy[0].columnar()] +
+                                columnarbranches("test_data/fort.7")):
+            branch = branches[i % len(branches)]
+            if (len(col) != len(branch) or col.getLabels() !=
+                branch.getLabels() or col.stability() != branch.stability()
+                or col.coordnames != branch.coordnames or
+                col["BR"] != branch["BR"] or col.c != branch.c or
+                list(col.PT) != [p["PT"] for p in branch] or
+                (col.coordarray != branch.coordarray).any()):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Columnar branch from file incorrect")
+        if lazy_branches and "coordarray" in lazy[0].__dict__:
+            raise AUTOExceptions.AUTORegressionError("Branch parsed")
+        branch = bar[0]
+
+    print("Testing slicing labels")
+    for key in [slice(10, 40), slice(3, None, 7), slice(-5, None),
+                slice(40, 10, -3)]:
+        expected = [i for i in range(len(branch))[key]
+                    if i in branch.labels.getIndices()]
+        if list(branch.labels[key].by_index) != expected:
+            raise AUTOExceptions.AUTORegressionError("Label slice incorrect")
+    part = branch[10:40]
+    if (len(part) != 30 or part.getLabels() !=
+        [branch._gettypelabel(i)[1]["LAB"] for i in branch.labels.getIndices()
+         if 10 <= i < 40 and branch._gettypelabel(i)[1].get("LAB", 0) != 0]):
+        raise AUTOExceptions.AUTORegressionError("Branch slice incorrect")
+
+    print("Testing looking up labels")
+    br = parseBR("test_data/fort.7")
+    br.append(parseBR("test_data/fort.7")[0])
+    br = br.relabel()
+    for step in range(2):
+        # the labels of the second branch first, which depend on the
+        # length of the first branch
+        for lab in reversed(br.getLabels()):
+            try:
+                point = br.getIndex(br.getLabel(lab)["index"])
+            except IndexError:
+                point = None
+            if point is None or point["LAB"] != lab:
+                raise AUTOExceptions.AUTORegressionError(
+                    "Label index incorrect")
+        # the index follows a change in the length of a branch
+        br[0].remove(len(br[0]) - 2)
+
     print("Testing label manipulation")
     labels = foo.getLabels()
     foo.relabel(labels[0],57)
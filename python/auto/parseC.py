@@ -64,7 +64,7 @@ class parseC(dict):
         for key in ['NPR', 'EPSS', 'ITMX', 'EPSU', 'ITNW', 'NBC',
             'IADS', 'IPS', 'IID', 'IIS', 'A1', 'DS', 'NMX', 'NTST',
             'NINT', 'NWTN', 'A0', 'EPSL', 'ISP', 'DSMIN', 'MXBF',
-            'RL0', 'RL1', 'IPLT', 'ILP', 'NCOL',
+            'RL0', 'RL1', 'IPLT', 'ILP', 'NCOL', 'CHORD',
             'DSMAX', 'ISW', 'IRS', 'IAD', 'JAC', 'NDIM', 'NPAR',
             'IBR', 'LAB', 'TY',
             'NUNSTAB', 'NSTAB', 'IEQUIB', 'ITWIST', 'ISTART',
@@ -385,7 +385,7 @@ class parseC(dict):
                 ["ICP"],
                 ["NTST", "NCOL", "IAD", "ISP", "ISW", "IPLT", "NBC", "NINT"],
                 ["NMX", "NPR", "MXBF", "IID", "ITMX", "ITNW", "NWTN", "JAC"],
-                ["EPSL", "EPSU", "EPSS"],
+                ["EPSL", "EPSU", "EPSS", "CHORD"],
                 ["DS", "DSMIN", "DSMAX", "IADS"],
                 ["NPAR", "THL", "THU"],
                 ["IIS", "IBR", "LAB", "TY"],
@@ -427,7 +427,7 @@ class parseC(dict):
                         s = "%5s" % value
                     else:
                         s = "%4s" % value
-                elif key[0] in ["A", "D", "E", "R"]:
+                elif key[0] in ["A", "C", "D", "E", "R"]:
                     value = self.__compactstr(value)
                     s = "%6s" % value
                 elif pos > 4:
@@ -519,6 +519,20 @@ def test():
     foo.read(fp)    
     pointtest(foo)
 
+    print("Testing writing and reading CHORD")
+    try:
+        from cStringIO import StringIO
+    except ImportError: # Python 3
+        from io import StringIO
+    foo["CHORD"] = 0.5
+    out = StringIO()
+    foo.write(out, new=True)
+    bar = parseC()
+    bar.read(StringIO(out.getvalue()))
+    pointtest(bar)
+    if bar["CHORD"] != 0.5 or "CHORD=   0.5" not in out.getvalue():
+        raise AUTOExceptions.AUTORegressionError("CHORD incorrect")
+
     print("parseC passed all tests")
 
 if __name__ == '__main__' :
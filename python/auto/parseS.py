@@ -20,6 +20,7 @@
 import os
 import sys
 import struct
+import mmap
 try:
     from UserDict import UserDict
     from UserList import UserList
@@ -51,24 +52,152 @@ class IncorrectHeaderLength(Exception):
 # the header line is this number
 NPAR = 20
 
+# Binary index files: the headers of all solutions in a solution file s.xxx
+# (with branch, type and label), and their byte offsets in s.xxx, can be
+# kept in .s.xxx.index in the same directory, so that opening a large
+# solution file does not need to scan it first. The index is only used if
+# the size and modification time of s.xxx match those recorded in the
+# index. Indexing is enabled by setting the environment variable
+# AUTO_SOLUTION_INDEX to a nonzero value or by setting
+# parseS.solution_index = True. If an index or cache file cannot be
+# written, e.g. in a read-only directory, the solution file is just read
+# without it.
+solution_index = os.environ.get("AUTO_SOLUTION_INDEX", "0") not in ["", "0"]
+INDEX_MAGIC = "AUTO-07p solution index\n".encode("ascii")
+INDEX_VERSION = 1
+# every solution has an index entry consisting of the number of header
+# entries, 16 header entries, and the start and end offsets of the data in
+# the solution file
+INDEX_LEN = 19
+
+# Binary cache files: the parsed contents of a solution file s.xxx can be
+# kept in .s.xxx.cache in the same directory, so that reloading large files
+# does not need to scan and convert the text again. The cache is only used if
+# the size and modification time of s.xxx match those recorded in the cache.
+# Caching is enabled by setting the environment variable AUTO_SOLUTION_CACHE
+# to a nonzero value or by setting parseS.solution_cache = True.
+solution_cache = os.environ.get("AUTO_SOLUTION_CACHE", "0") not in ["", "0"]
+CACHE_MAGIC = "AUTO-07p solution cache\n".encode("ascii")
+CACHE_VERSION = 1
+# Binary start solutions: AUTOSolution.write(output, binary=filename) writes
+# the line BINARY_SOLUTION followed by the base name of filename, and the
+# header of the solution to output, and BINARY_SOLUTION_MAGIC followed by
+# the numbers of the solution, in the order of a solution file, as native
+# float64 values to filename (see READSOLBIN in io.f90), so that AUTO does
+# not need to convert the numbers of large start solutions from text.
+BINARY_SOLUTION = "#AUTO binary solution"
+BINARY_SOLUTION_MAGIC = "AUTOSOL1".encode("ascii")
+
+# cache index entries are index entries followed by the offset of the
+# floats of the solution in the data part of the cache
+CACHE_INDEXLEN = INDEX_LEN + 1
+
+def cachefilename(filename):
+    """Return the name of the binary cache file belonging to filename"""
+    dirname, basename = os.path.split(filename)
+    return os.path.join(dirname, "." + basename + ".cache")
+
+def indexfilename(filename):
+    """Return the name of the binary index file belonging to filename"""
+    dirname, basename = os.path.split(filename)
+    return os.path.join(dirname, "." + basename + ".index")
+
+def removecache(filename):
+    """Remove the binary cache and index files belonging to filename,
+    if they exist"""
+    for name in [cachefilename(filename), indexfilename(filename)]:
+        if os.path.exists(name):
+            os.remove(name)
+
+def numfloats(header):
+    """Return the number of floating point numbers in a solution with the
+    given header"""
+    n = header[7]
+    nrows = header[6]
+    total = n * nrows + header[11]
+    nlinessmall = ((n-1)//7+1) * nrows + (header[11]+6)//7
+    if header[9] != 0 and header[8] > nlinessmall:
+        total += 2 * header[4] + (n-1) * nrows
+    return total
+
+def _valuetemplate(n):
+    """Return a format string for n numbers in a solution file: seven per
+    line, each line indented by four spaces"""
+    lines = ["    " + "%19.10E"*min(7, n-i) for i in range(0, n, 7)]
+    return os.linesep.join(lines or ["    "]) + os.linesep
+
+def _istext(data):
+    # solution data is the text of the numbers, their offsets in the file
+    # (a tuple) or, once parsed, an array of the numbers
+    return isinstance(data, tuple) or hasattr(data, "decode")
+
+def _readonly(data):
+    # mark a numpy array read-only
+    if hasattr(data, "flags"):
+        data.flags.writeable = False
+    return data
+
 class fileS(object):
-    def __init__(self, filename):
+    def __init__(self, filename, scan=True):
         if isinstance(filename, str):
             inputfile = AUTOutil.openFilename(filename,"rb")
         else:
             inputfile = filename
         self.inputfile = inputfile
-        self.name = inputfile.name
+        # file objects such as BytesIO, or those of some archives, have no name
+        self.name = getattr(inputfile, "name", None)
         self.solutions = []
+        self.cachefile = None
+        self.cachemap = None
+        self.shared = False
 
-        # We now go through the file and read the solutions.
-        prev = None
         # for fort.8 we need to read everything into memory; otherwise load the
         # data on demand from disk when we really need it
         # on Windows always load everything because deleting open files is
         # impossible there
-        inmemory = (os.path.basename(inputfile.name) == 'fort.8' or
+        inmemory = ((self.name is not None and
+                     os.path.basename(self.name) == 'fort.8') or
                     sys.platform in ['cygwin', 'win32'])
+        self.inmemory = inmemory
+        if not scan:
+            # the caller goes through the solutions using entries()
+            return
+        # index and cache files only describe complete solution files
+        usefiles = (not inmemory and
+                    not isinstance(inputfile, gzip.GzipFile) and
+                    hasattr(inputfile, "fileno") and
+                    self.name is not None and
+                    os.path.isfile(self.name) and
+                    inputfile.tell() == 0)
+        useindex = usefiles and solution_index
+        usecache = usefiles and solution_cache
+        if useindex or usecache:
+            if not Points.numpyimported:
+                Points.importnumpy()
+            if Points.fromstring is None:
+                useindex = usecache = False
+        if useindex or usecache:
+            stat = os.fstat(inputfile.fileno())
+            if usecache and self.__readcache(stat):
+                return
+            if useindex and self.__readindex(stat):
+                if usecache:
+                    self.__writecache(stat)
+                return
+
+        # We now go through the file and read the solutions.
+        self.solutions.extend(self.entries())
+        if useindex:
+            self.__writeindex(stat)
+        if usecache:
+            self.__writecache(stat)
+
+    def entries(self):
+        """Go through the solution file from the current position and
+        generate the header and data (or data offsets) of each solution"""
+        inputfile = self.inputfile
+        inmemory = self.inmemory
+        prev = None
         while len(inputfile.read(1)) > 0:
             line = inputfile.readline()
             if not line: raise PrematureEndofData
@@ -129,10 +258,150 @@ class fileS(object):
                 inputfile.seek(end)
             if data is None:
                 data = (start_of_data, end)
-            self.solutions.append({'header': header, 'data': data})
+            yield {'header': header, 'data': data}
+            # the solution may have been read in the meantime
+            inputfile.seek(end)
             prev = start_of_data
             prevheader = header
 
+    def view(self, solution):
+        """Return a fileS for the single solution solution (as generated by
+        entries()) that shares the open file with this one"""
+        view = copy.copy(self)
+        view.solutions = [solution]
+        view.shared = True
+        return view
+
+    def __indexentries(self):
+        # index entries for all solutions, without cache offsets
+        entries = []
+        for solution in self.solutions:
+            header = solution['header']
+            data = solution['data']
+            entries.append([len(header)] + header + (16-len(header))*[0] +
+                           [data[0], data[1]])
+        return entries
+
+    def __readbinary(self, filename, magic, version, stat, entrylen):
+        # read the index entries of an index or cache file, provided that
+        # it belongs to the current solution file;
+        # returns the entries and the offset of the data after them
+        N = Points.N
+        try:
+            f = open(filename, "rb")
+        except IOError:
+            return None
+        try:
+            if f.read(len(magic)) != magic:
+                return None
+            info = N.fromfile(f, N.int64, 4)
+            mtime = N.fromfile(f, N.float64, 1)
+            if (len(info) != 4 or len(mtime) != 1 or
+                info[0] != version or info[1] != stat.st_size or
+                mtime[0] != stat.st_mtime):
+                return None
+            nsolutions = int(info[2])
+            entries = N.fromfile(f, N.int64, nsolutions * entrylen)
+            if len(entries) != nsolutions * entrylen:
+                return None
+            return entries.reshape(-1, entrylen).tolist(), f.tell()
+        finally:
+            f.close()
+
+    def __writebinary(self, filename, magic, version, stat, entries,
+                      total=0, writedata=None):
+        # write an index or cache file through a temporary file so that
+        # other processes never see an incomplete file;
+        # returns the offset of the data after the entries, or None
+        N = Points.N
+        tmpfile = "%s.%d"%(filename, os.getpid())
+        try:
+            f = open(tmpfile, "wb")
+        except IOError:
+            return None
+        try:
+            try:
+                f.write(magic)
+                N.array([version, stat.st_size, len(entries), total],
+                        N.int64).tofile(f)
+                N.array([stat.st_mtime], N.float64).tofile(f)
+                N.array(entries, N.int64).reshape(-1).tofile(f)
+                datastart = f.tell()
+                if writedata is not None:
+                    writedata(f)
+                f.close()
+                if os.path.exists(filename):
+                    os.remove(filename)
+                os.rename(tmpfile, filename)
+            except (IOError, OSError, PrematureEndofData):
+                f.close()
+                os.remove(tmpfile)
+                return None
+        except (IOError, OSError):
+            return None
+        return datastart
+
+    def __readindex(self, stat):
+        # use the index file if it exists and matches the solution file
+        result = self.__readbinary(indexfilename(self.name), INDEX_MAGIC,
+                                   INDEX_VERSION, stat, INDEX_LEN)
+        if result is None:
+            return False
+        self.solutions = []
+        for entry in result[0]:
+            self.solutions.append({'header': entry[1:1+entry[0]],
+                                   'data': (entry[17], entry[18])})
+        return True
+
+    def __writeindex(self, stat):
+        self.__writebinary(indexfilename(self.name), INDEX_MAGIC,
+                           INDEX_VERSION, stat, self.__indexentries())
+
+    def __readcache(self, stat):
+        # use the cache file if it exists and matches the solution file
+        cachefile = cachefilename(self.name)
+        result = self.__readbinary(cachefile, CACHE_MAGIC, CACHE_VERSION,
+                                   stat, CACHE_INDEXLEN)
+        if result is None:
+            return False
+        entries, datastart = result
+        self.solutions = []
+        for entry in entries:
+            self.solutions.append({'header': entry[1:1+entry[0]],
+                                   'data': (entry[17], entry[18]),
+                                   'cache': datastart + 8 * entry[19]})
+        self.cachefile = cachefile
+        return True
+
+    def __writecache(self, stat):
+        # write all solutions, converted to binary, to the cache file, and
+        # switch to reading from the cache
+        N = Points.N
+        cachefile = cachefilename(self.name)
+        entries = self.__indexentries()
+        offset = 0
+        for entry, solution in zip(entries, self.solutions):
+            entry.append(offset)
+            offset += numfloats(solution['header'])
+        def writedata(f):
+            for solution in self.solutions:
+                self.inputfile.seek(solution['data'][0])
+                data = self.inputfile.read(solution['data'][1] -
+                                           solution['data'][0])
+                total = numfloats(solution['header'])
+                self.__parsefloats(data, total).astype(N.float64).tofile(f)
+        datastart = self.__writebinary(cachefile, CACHE_MAGIC, CACHE_VERSION,
+                                       stat, entries, offset, writedata)
+        if datastart is None:
+            return
+        for entry, solution in zip(entries, self.solutions):
+            solution['cache'] = datastart + 8 * entry[19]
+        self.cachefile = cachefile
+
+    def hastext(self, i):
+        """Is the text of solution i available (and not just its numbers)?"""
+        return _istext(self.solutions[i]['data'])
+
     def readstr(self, i):
         solution = self.solutions[i]
         data = solution['data']
@@ -145,20 +414,62 @@ class fileS(object):
         return solution['data']
 
     def readfloats(self, i, total):
+        # the numbers of solution i, which all solution objects for it
+        # share: with numpy they are read-only, and every solution object
+        # copies them when it reads them (see AUTOSolution.__readAll)
         if not Points.numpyimported:
             Points.importnumpy()       
         N = Points.N
+        solution = self.solutions[i]
+        if 'cache' in solution:
+            cachemap = self.__mapcache()
+            if cachemap is not None:
+                if solution['cache'] + 8 * total > len(cachemap):
+                    raise PrematureEndofData
+                return _readonly(N.frombuffer(cachemap, N.float64, total,
+                                              solution['cache']))
+            f = open(self.cachefile, "rb")
+            f.seek(solution['cache'])
+            fdata = N.fromfile(f, N.float64, total)
+            f.close()
+            if total != len(fdata):
+                raise PrematureEndofData
+            return _readonly(fdata)
         data = self.readstr(i)
-        if hasattr(N, "ndarray") and isinstance(data, N.ndarray):
+        if not _istext(data):
+            # already parsed, e.g. through another solution object
             return data
+        fdata = _readonly(self.__parsefloats(data, total))
+        del self.solutions[i]['data']
+        self.solutions[i]['data'] = fdata
+        return fdata
+
+    def __mapcache(self):
+        # map the cache file into memory once; copy-on-write so that
+        # changes to solution arrays are never written back to the cache
+        if self.cachemap is None:
+            f = open(self.cachefile, "rb")
+            try:
+                try:
+                    self.cachemap = mmap.mmap(f.fileno(), 0,
+                                              access=mmap.ACCESS_COPY)
+                except (EnvironmentError, ValueError, OverflowError):
+                    # e.g. not enough address space: read using fromfile
+                    self.cachemap = False
+            finally:
+                f.close()
+        return self.cachemap or None
+
+    def __parsefloats(self, data, total):
+        N = Points.N
         fromstring = Points.fromstring
         if fromstring:
             fdata = []
             if "D".encode("ascii") not in data:
                 fdata = fromstring(data, dtype=float, sep=' ')
-            if fdata == [] or len(fdata) != total:
-                fdata = N.array(map(parseB.AUTOatof,
-                                    data.split()), 'd')
+            if len(fdata) != total:
+                fdata = N.array(list(map(parseB.AUTOatof,
+                                         data.split())), 'd')
             else:
                 #make sure the last element is correct
                 #(fromstring may not do this correctly for a
@@ -168,17 +479,17 @@ class fileS(object):
         else:
             data = data.split()
             try:
-                fdata = N.array(map(float, data), 'd')
+                fdata = N.array(list(map(float, data)), 'd')
             except ValueError:
-                fdata = N.array(map(parseB.AUTOatof, data), 'd')
+                fdata = N.array(list(map(parseB.AUTOatof, data)), 'd')
         if total != len(fdata):
             raise PrematureEndofData
-        del self.solutions[i]['data']
-        self.solutions[i]['data'] = fdata
         return fdata
 
     def conditionalclose(self):
         # if everything is in memory, close the file
+        if self.shared:
+            return
         for s in self.solutions:
             if isinstance(s['data'], tuple):
                 return
@@ -200,6 +511,7 @@ class fileS(object):
 
 class parseS(list):
     def __init__(self,filename=None):
+        self.__labels = {}
         if isinstance(filename, str):
             list.__init__(self)
             self.readFilename(filename)
@@ -268,9 +580,14 @@ class parseS(list):
             return
         if not isinstance(inputfile, fileS):
             inputfile = fileS(inputfile)
+        labels = {}
         for i in range(len(inputfile.solutions)):
             solution = AUTOSolution(inputfile,i,inputfile.name)
+            header = inputfile.solutions[i]['header']
+            if header[3] not in labels:
+                labels[header[3]] = len(self), solution
             self.append(solution)
+        self.__labels = labels
         if len(self) > 0:
             mbr, mlab = 0, 0
             for d in self:
@@ -299,6 +616,7 @@ class parseS(list):
     def writeFilename(self,filename,append=False,mlab=False):
         # read all solutions because we may overwrite
         self.read()
+        removecache(filename)
         if append:
             output = open(filename,"ab")
         else:
@@ -323,6 +641,7 @@ class parseS(list):
         indices.reverse()
         for i in indices:
             del self[i]
+        self.__labels = {}
         if len(self) > 0:
             maxlab = max(self.getLabels())
             for d in self:
@@ -347,6 +666,7 @@ class parseS(list):
             for d in self:
                 if d["Label"] == old_label[j]:
                     d["Label"] = new_label[j]
+        self.__labels = {}
         if len(self) > 0:
             maxlab = max(self.getLabels())
             for d in self:
@@ -354,6 +674,7 @@ class parseS(list):
 
     # Make all labels in the file unique and sequential
     def uniquelyLabel(self):
+        self.__labels = {}
         i = 1
         for d in self:
             d["Label"] = i
@@ -365,6 +686,11 @@ class parseS(list):
         if label is None:
             return self
         if isinstance(label, int):
+            # first try the labels recorded while reading the file
+            i, d = self.__labels.get(label, (None, None))
+            if (d is not None and i < len(self) and self[i] is d and
+                d["Label"] == label):
+                return d
             for d in self:
                 if d["Label"] == label:
                     return d
@@ -935,13 +1261,17 @@ class AUTOSolution(UserDict,Points.Pointset):
         n = self.__numEntriesPerBlock
         nrows = self.__numSValues
         total = n * nrows + self.__numFreeParameters
-        nlinessmall = (((n-1)/7+1) * nrows + (self.__numFreeParameters+6)/7)
+        nlinessmall = ((n-1)//7+1) * nrows + (self.__numFreeParameters+6)//7
         if self["NTST"] != 0 and self.__numLinesPerEntry > nlinessmall:
             total += 2 * self.__numChangingParameters + (n-1) * nrows
         fdata = self.__input.readfloats(self.__index, total)
+        if fromstring:
+            # the numbers are shared by all solution objects for this
+            # solution: every object gets its own writable copy
+            fdata = N.array(fdata)
         ups = N.reshape(fdata[:n * nrows],(nrows,n))
-        self.indepvararray = ups[:,0]
-        self.coordarray = N.transpose(ups[:,1:])
+        indepvararray = self.indepvararray = ups[:,0]
+        coordarray = self.coordarray = N.transpose(ups[:,1:])
         j = n * nrows
 
         # Check if direction info is given
@@ -952,25 +1282,39 @@ class AUTOSolution(UserDict,Points.Pointset):
             self["rldot"] = fdata[j:j+nfpr]
             j = j + nfpr
             n = n - 1
-            self["udotps"] = N.transpose(
+            udotarray = N.transpose(
                 N.reshape(fdata[j:j+n * self.__numSValues],(-1,n)))
             udotnames = ["UDOT(%d)"%(i+1) for i in
                          range(self.__numEntriesPerBlock-1)]
-            self["udotps"] = Points.Pointset({
-                "coordarray": self["udotps"],
+            udotps = Points.Pointset({
+                "coordarray": udotarray,
                 "coordnames": udotnames,
                 "name": self.name})
-            self["udotps"]._dims = None
+            udotps._dims = None
+            if fromstring:
+                udotps.coordarray = udotarray
+            self["udotps"] = udotps
             j = j + n * nrows
 
-        self.PAR = fdata[j:j+self.__numFreeParameters]
+        par = self.PAR = fdata[j:j+self.__numFreeParameters]
         Points.Pointset.__init__(self,{
-                "indepvararray": self.indepvararray,
+                "indepvararray": indepvararray,
                 "indepvarname": self.indepvarname,
-                "coordarray": self.coordarray,
+                "coordarray": coordarray,
                 "coordnames": self.coordnames,
                 "name": self.name})
         self.update()
+        if fromstring:
+            # Pointset and AUTOParameters copy their input arrays again:
+            # replace those copies by views into the copy of fdata.
+            # Pointset reverses a mesh that is not increasing: then its
+            # copies stay.
+            if (len(indepvararray) < 2 or
+                Points.isincreasing(indepvararray)):
+                self.indepvararray = indepvararray
+                self.coordarray = coordarray
+            if len(self.PAR.coordarray) == len(par):
+                self.PAR.coordarray = par
 
     def __readarray(self,coordarray,indepvararray=None):
         #init from array
@@ -1019,9 +1363,74 @@ class AUTOSolution(UserDict,Points.Pointset):
             return getattr(self,attr)
         raise AttributeError(attr)
 
-    def write(self,output,mlab=False):
+    def __header(self):
+        # the header of the solution as written to a solution file
+        if self.__fullyParsed:
+            ndim = len(self.coordarray)
+            npar = len(self["Parameters"])
+            ntpl = len(self)
+            nrowpr = (ndim//7+1) * ntpl + (npar+6)//7
+            nfpr = self.__numChangingParameters
+            if "Active ICP" in self.data:
+                nfpr = len(self.get("Active ICP",[0]))
+                nrowpr += (nfpr+19)//20 + (nfpr+6)//7 + (ndim+6)//7 * ntpl
+        else:
+            ndim = self.__numEntriesPerBlock-1
+            npar = self.__numFreeParameters
+            ntpl = self.__numSValues
+            nfpr = self.__numChangingParameters
+            nrowpr = self.__numLinesPerEntry
+        header = [self["BR"], self["PT"], self["TY number"], self["LAB"],
+                  nfpr, self["ISW"], ntpl, ndim+1, nrowpr, self["NTST"],
+                  self["NCOL"], npar]
+        if self["IPS"] is not None:
+            header.extend([self["NPARI"], self["NDIM"], self["IPS"],
+                           self["IPRIV"]])
+        return header
+
+    def _binarydata(self):
+        # the header and the numbers of the solution, in the order of a
+        # solution file, for binary storage
+        if self.__nodata():
+            return None
+        self.__readAll()
+        header = self.__header()
+        N = Points.N
+        ndim = len(self.coordarray)
+        ntpl = len(self.indepvararray)
+        ups = N.zeros((ntpl, ndim+1), N.float64)
+        ups[:,0] = self.indepvararray
+        ups[:,1:] = N.transpose(self.coordarray)
+        fdata = [ups.ravel()]
+        if "Active ICP" in self.data:
+            fdata.append(N.array(self["Active ICP"], N.float64))
+            fdata.append(N.array(self["rldot"], N.float64))
+            c = self["udotps"].coordarray
+            udot = N.zeros((ntpl, ndim), N.float64)
+            udot[:,:len(c)] = N.transpose(c)
+            fdata.append(udot.ravel())
+        fdata.append(N.array(self.PAR.coordarray, N.float64))
+        return header, N.concatenate(fdata)
+
+    def _numfloats(self):
+        # the number of floating point numbers in the solution, from its
+        # header, without parsing it
+        if self.__nodata():
+            return 0
+        return numfloats(self.__header())
+
+    def write(self,output,mlab=False,binary=None):
         if self.__nodata():
             return
+        if binary is not None:
+            if not Points.numpyimported:
+                Points.importnumpy()
+            if Points.fromstring is None:
+                # without numpy write text
+                binary = None
+        if not self.__fullyParsed and not self.__input.hastext(self.__index):
+            # only the numbers are known (e.g. from a binary diagram file)
+            self.__readAll()
         try:
             "".encode("ascii") + ""
             #write encoded
@@ -1041,42 +1450,26 @@ class AUTOSolution(UserDict,Points.Pointset):
                 def write_enc(s):
                     output.write(s.encode("ascii"))
 
-        if self.__fullyParsed:
-            ndim = len(self.coordarray)
-            npar = len(self["Parameters"])
-            ntpl = len(self)
-            nrowpr = (ndim//7+1) * ntpl + (npar+6)//7
-            nfpr = self.__numChangingParameters
-            if "Active ICP" in self.data:
-                nfpr = len(self.get("Active ICP",[0]))
-                nrowpr += (nfpr+19)//20 + (nfpr+6)//7 + (ndim+6)//7 * ntpl
+        if binary is not None:
+            header, numbers = self._binarydata()
+            binaryfile = open(binary, "wb")
+            binaryfile.write(BINARY_SOLUTION_MAGIC)
+            numbers.tofile(binaryfile)
+            binaryfile.close()
+            write_enc("%s %s%s"%(BINARY_SOLUTION, os.path.basename(binary),
+                                 os.linesep))
         else:
-            ndim = self.__numEntriesPerBlock-1
-            npar = self.__numFreeParameters
-            ntpl = self.__numSValues
-            nfpr = self.__numChangingParameters
-            nrowpr = self.__numLinesPerEntry
-
-        line = "%6d%6d%6d%6d%6d%6d%8d%6d%8d%5d%5d%5d" % (self["BR"],
-                                                         self["PT"],
-                                                         self["TY number"],
-                                                         self["LAB"],
-                                                         nfpr,
-                                                         self["ISW"],
-                                                         ntpl,
-                                                         ndim+1,
-                                                         nrowpr,
-                                                         self["NTST"],
-                                                         self["NCOL"],
-                                                         npar
-                                                         )
-        if self["IPS"] is not None:
-            line += "%5d%5d%5d%5d" % (self["NPARI"],self["NDIM"],self["IPS"],
-                                      self["IPRIV"])
+            header = self.__header()
+        line = "%6d%6d%6d%6d%6d%6d%8d%6d%8d%5d%5d%5d" % tuple(header[:12])
+        if len(header) > 12:
+            line += "%5d%5d%5d%5d" % tuple(header[12:])
         write_enc(line+os.linesep)
+        if binary is not None:
+            # the numbers are already in the binary file
+            pass
         # If the file isn't already parsed, we can just copy from the input
         # file into the output file
-        if not self.__fullyParsed:
+        elif not self.__fullyParsed:
             inputsolution = self.__input.readstr(self.__index)
             if hasattr(output, "encoding") and hasattr(inputsolution, "decode"):
                 inputsolution = inputsolution.decode("ascii")
@@ -1084,15 +1477,15 @@ class AUTOSolution(UserDict,Points.Pointset):
         # Otherwise we do a normal write.  NOTE: if the solution isn't already
         # parsed it will get parsed here.
         else:
-            slist = []
-            for i in range(len(self.indepvararray)):
-                slist.append("    "+format19_10E3(self.indepvararray[i]))
-                for j in range(1,len(self.coordarray)+1):
-                    if j%7==0:
-                        slist.append(os.linesep+"    ")
-                    slist.append(format19_10E3(self.coordarray[j-1,i]))
-                slist.append(os.linesep)
-            write_enc("".join(slist))
+            N = Points.N
+            ndim = len(self.coordarray)
+            values = []
+            rows = N.transpose(self.coordarray).tolist()
+            for t, row in zip(list(self.indepvararray), rows):
+                values.append(t)
+                values.extend(row)
+            write_enc(AUTOutil.format19_10E3list(
+                _valuetemplate(ndim+1)*len(rows), values))
             if "Active ICP" in self.data:
                 # Solution contains derivative information.
                 j = 0
@@ -1104,43 +1497,28 @@ class AUTOSolution(UserDict,Points.Pointset):
                 if j%20!=0:
                     write_enc(os.linesep)
 
-                line = "    "
-                i = 0
-                for vi in self["rldot"]:
-                    num = format19_10E3(vi)
-                    if i != 0 and i%7==0:
-                        line = line + os.linesep + "    "
-                    line = line + num
-                    i = i + 1
-                write_enc(line+os.linesep)
+                rldot = list(self["rldot"])
+                write_enc(AUTOutil.format19_10E3list(
+                    _valuetemplate(len(rldot)), rldot))
 
                 # write UDOTPS
-                slist = []
                 c = self["udotps"].coordarray
                 l = len(c)
-                for i in range(len(self.indepvararray)):
-                    slist.append("    ")
-                    for j in range(len(self.coordarray)):
-                        if j!=0 and j%7==0:
-                            slist.append(os.linesep+"    ")
-                        if j<l:
-                            slist.append(format19_10E3(c[j,i]))
-                        else:
-                            slist.append(format19_10E3(0))
-                    slist.append(os.linesep)
-                write_enc("".join(slist))
-
-            line = "    "
-            j = 0
-            for parameter in self.PAR.toarray():
-                num = format19_10E3(parameter)
-                line = line + num 
-                j = j + 1
-                if j%7==0:
-                    write_enc(line+os.linesep)
-                    line = "    "
-            if j%7!=0:
-                write_enc(line+os.linesep)
+                values = []
+                if l > 0:
+                    zeros = max(ndim-l, 0)*[0.0]
+                    for row in N.transpose(c).tolist():
+                        values.extend(row[:ndim])
+                        values.extend(zeros)
+                else:
+                    values = ndim*len(rows)*[0.0]
+                write_enc(AUTOutil.format19_10E3list(
+                    _valuetemplate(ndim)*len(rows), values))
+
+            par = list(self.PAR.coordarray)
+            if len(par) > 0:
+                write_enc(AUTOutil.format19_10E3list(
+                    _valuetemplate(len(par)), par))
         if mlab and (self._mbr > 0 or self._mlab > 0) and not (
             self._mbr == self["BR"] and self._mlab == self["LAB"]):
             # header for empty solution so that AUTO can pickup the maximal
@@ -1185,8 +1563,189 @@ def test():
         raise AUTOExceptions.AUTORegressionError("File length incorrect")
     pointtest(foo.getIndex(0),foo.getIndex(3))
 
-    
-    
+    print("Testing reading through the index file")
+    import tempfile, shutil
+    from io import BytesIO
+    global solution_cache, solution_index
+    tmpdir = tempfile.mkdtemp()
+    filename = os.path.join(tmpdir, "s.test")
+    shutil.copy("test_data/fort.8", filename)
+    index = solution_index
+    solution_index = True
+    try:
+        for i in range(2):
+            bar = parseS(filename)
+            if (Points.fromstring is not None and
+                not os.path.exists(indexfilename(filename))):
+                raise AUTOExceptions.AUTORegressionError("No index file")
+            if len(bar) != 5:
+                raise AUTOExceptions.AUTORegressionError("File length incorrect")
+            for a in foo:
+                if bar(a["LAB"])["PT"] != a["PT"]:
+                    raise AUTOExceptions.AUTORegressionError(
+                        "Label lookup incorrect")
+        bar.writeFilename(filename, append=True)
+        bar = parseS(filename)
+        if len(bar) != 10:
+            raise AUTOExceptions.AUTORegressionError("Index not invalidated")
+        bar.relabel(foo[1]["LAB"], 1000)
+        if bar(1000) is not bar[1]:
+            raise AUTOExceptions.AUTORegressionError("Relabel lookup incorrect")
+        # an index that cannot be written is left out
+        removecache(filename)
+        os.mkdir(indexfilename(filename))
+        bar = parseS(filename)
+        if len(bar) != 10 or bar[7]["LAB"] != foo[2]["LAB"]:
+            raise AUTOExceptions.AUTORegressionError("Reading without index")
+    finally:
+        solution_index = index
+        shutil.rmtree(tmpdir)
+
+    print("Testing reading through the binary cache")
+    tmpdir = tempfile.mkdtemp()
+    filename = os.path.join(tmpdir, "s.test")
+    shutil.copy("test_data/fort.8", filename)
+    cache = solution_cache
+    solution_cache = True
+    try:
+        for i in range(2):
+            bar = parseS(filename)
+            if (Points.fromstring is not None and
+                not os.path.exists(cachefilename(filename))):
+                raise AUTOExceptions.AUTORegressionError("No cache file")
+            if len(bar) != 5:
+                raise AUTOExceptions.AUTORegressionError("File length incorrect")
+            pointtest(bar.getIndex(0),bar.getIndex(3))
+            for a, b in zip(foo, bar):
+                outa, outb = BytesIO(), BytesIO()
+                a.write(outa)
+                b.write(outb)
+                if outa.getvalue() != outb.getvalue():
+                    raise AUTOExceptions.AUTORegressionError(
+                        "Cached data differs")
+        print("Testing changing solutions that share their data")
+        for solution_cache in [False, True]:
+            bar = parseS(filename)
+            a = bar[3]
+            b = AUTOSolution(a)
+            c = parseS(filename)[3]
+            u, v, par = b.coordarray[1][2], b.coordarray[0][2], b.PAR(1)
+            w, x, t = b.coordarray[1][3], b.coordarray[1][4], b["t"][3]
+            par2 = b.PAR(2)
+            # straight into the arrays, and through the solution
+            a.PAR[1] = par2 + 1.0
+            a.coordarray[1][3] = w + 1.0
+            a["U(2)"][4] = x + 1.0
+            a.indepvararray[3] = t + 0.5
+            a[2]["u"][1] = u + 1.0
+            a["PAR"] = {1: par + 1.0}
+            a[a.coordnames[0]] = len(a)*[v + 1.0]
+            if (a.coordarray[1][2] != u + 1.0 or a.PAR(1) != par + 1.0 or
+                a.coordarray[0][2] != v + 1.0 or a.PAR(2) != par2 + 1.0 or
+                a.coordarray[1][3] != w + 1.0 or
+                a.coordarray[1][4] != x + 1.0 or a["t"][3] != t + 0.5):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Solution not changed")
+            for d in [b, c]:
+                if (d.coordarray[1][2] != u or d.PAR(1) != par or
+                    d.coordarray[0][2] != v or d.PAR(2) != par2 or
+                    d.coordarray[1][3] != w or d.coordarray[1][4] != x or
+                    d["t"][3] != t):
+                    raise AUTOExceptions.AUTORegressionError(
+                        "Change shows up in another solution")
+    finally:
+        solution_cache = cache
+        shutil.rmtree(tmpdir)
+
+    print("Testing writing binary start solutions")
+    tmpdir = tempfile.mkdtemp()
+    filename = os.path.join(tmpdir, "fort.3.bin")
+    try:
+        for a in foo:
+            text, out = BytesIO(), BytesIO()
+            a.write(text)
+            a.write(out, binary=filename)
+            lines = out.getvalue().decode("ascii").splitlines()
+            if Points.fromstring is None:
+                if out.getvalue() != text.getvalue():
+                    raise AUTOExceptions.AUTORegressionError(
+                        "Text fallback incorrect")
+                continue
+            N = Points.N
+            if (lines[0] != BINARY_SOLUTION + " fort.3.bin" or
+                lines[1] != text.getvalue().decode("ascii").splitlines()[0]
+                or len(lines) != 2):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Binary solution header incorrect")
+            data = open(filename, "rb").read()
+            numbers = N.frombuffer(data[len(BINARY_SOLUTION_MAGIC):],
+                                   N.float64)
+            if (data[:len(BINARY_SOLUTION_MAGIC)] != BINARY_SOLUTION_MAGIC or
+                list(numbers) != list(a._binarydata()[1])):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Binary solution incorrect")
+            # the numbers are those of the text, in the same order
+            values = " ".join(text.getvalue().decode("ascii").splitlines()[1:])
+            values = [float(v) for v in values.split()]
+            if list(numbers) != values:
+                raise AUTOExceptions.AUTORegressionError(
+                    "Binary solution incorrect")
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print("Testing solutions with a decreasing mesh")
+    tmpdir = tempfile.mkdtemp()
+    filename = os.path.join(tmpdir, "s.test")
+    text = ("%6d%6d%6d%6d%6d%6d%8d%6d%8d%5d%5d%5d"%
+            (1, 1, 9, 1, 1, 1, 2, 2, 3, 1, 1, 1) + os.linesep +
+            "    1.0 2.0" + os.linesep + "    0.0 1.0" + os.linesep +
+            "    5.0" + os.linesep).encode("ascii")
+    f = open(filename, "wb")
+    f.write(text)
+    f.close()
+    try:
+        a = parseS(filename)[0]
+        # Pointset reverses the mesh and its copies are kept
+        if Points.fromstring is not None and (
+            list(a.indepvararray) != [0.0, 1.0] or
+            list(a.coordarray[0]) != [1.0, 2.0] or a.PAR(1) != 5.0):
+            raise AUTOExceptions.AUTORegressionError(
+                "Decreasing mesh incorrect")
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print("Testing writing start solutions with one parameter")
+    tmpdir = tempfile.mkdtemp()
+    filename = os.path.join(tmpdir, "s.test")
+    text = ("%6d%6d%6d%6d%6d%6d%8d%6d%8d%5d%5d%5d"%
+            (1, 1, 9, 1, 1, 1, 2, 2, 3, 1, 1, 1) + os.linesep +
+            "    0.0 1.0" + os.linesep + "    1.0 2.0" + os.linesep +
+            "    5.0" + os.linesep).encode("ascii")
+    f = open(filename, "wb")
+    f.write(text)
+    f.close()
+    try:
+        a = parseS(filename)[0]
+        b = AUTOSolution(a)
+        out = BytesIO()
+        if a._numfloats() != 5:
+            raise AUTOExceptions.AUTORegressionError("Solution size incorrect")
+        # the size is known without parsing, so the text is copied
+        a.write(out)
+        if out.getvalue() != text:
+            raise AUTOExceptions.AUTORegressionError("Text not copied")
+        for s in [a, b]:
+            # a is parsed now, and b shares its parsed numbers
+            out = BytesIO()
+            s.write(out)
+            values = out.getvalue().decode("ascii").splitlines()[1:]
+            values = [float(v) for v in " ".join(values).split()]
+            if values != [0.0, 1.0, 1.0, 2.0, 5.0] or s["PAR(1)"] != 5.0:
+                raise AUTOExceptions.AUTORegressionError(
+                    "Solution with one parameter written incorrectly")
+    finally:
+        shutil.rmtree(tmpdir)
+
     print("parseS passed all tests")
 
 if __name__ == '__main__' :
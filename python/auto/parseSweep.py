@@ -0,0 +1,204 @@
+#! /usr/bin/env python
+# This is a class for the results of a parameter sweep, that is, AUTO runs
+# from the same starting point for all points of a grid of fixed parameter
+# values (see the sweep command). The results are stored by column, with a
+# row for every parameter point, and can be looked up by parameter values.
+# Rows are appended to a file as soon as they are known, one line per row,
+# so that an interrupted sweep can be resumed from that file. Rows whose
+# run failed are recorded with their error, but are not done: resuming
+# the sweep runs them again.
+
+import os
+import json
+from auto import AUTOExceptions
+from auto import bifDiag
+
+# columns with a summary of the result of every parameter point: number of
+# branches and points, special points as [type name, label] pairs, error
+# message of failed runs, and the files of the bifurcation diagram
+summary_columns = ["branches", "points", "special", "error", "files"]
+
+def parametername(key):
+    """Return the column name for a parameter given as an index or name"""
+    if isinstance(key, int):
+        return "PAR(%d)"%key
+    return key
+
+class parseSweep(object):
+    def __init__(self,names=None,points=None,filename=None):
+        """names are the names of the swept parameters and points the
+        list of tuples of their values. If filename is given, rows are
+        read from and appended to that file."""
+        if names is None:
+            names = []
+        if points is None:
+            points = []
+        self.names = [parametername(name) for name in names]
+        self.points = [tuple(point) for point in points]
+        self.columns = {}
+        for j, name in enumerate(self.names):
+            self.columns[name] = [point[j] for point in self.points]
+        for name in summary_columns:
+            self.columns[name] = len(self.points)*[None]
+        self.__index = {}
+        for i, point in enumerate(self.points):
+            self.__index[point] = i
+        self.__diagrams = len(self.points)*[None]
+        self.filename = filename
+        if filename is not None and os.path.exists(filename):
+            self.readFilename(filename)
+
+    def __len__(self):
+        return len(self.points)
+
+    def __getitem__(self,index):
+        return self.getIndex(index)
+
+    def __call__(self,point):
+        return self.getIndex(self.index(point))
+
+    def __str__(self):
+        return self.summary()
+
+    def index(self,point):
+        """Return the row number of the parameter values point: a
+        sequence in the order of names, or a dictionary of parameters"""
+        if isinstance(point, dict):
+            values = {}
+            for key, value in point.items():
+                values[parametername(key)] = value
+            point = [values[name] for name in self.names]
+        try:
+            return self.__index[tuple(point)]
+        except KeyError:
+            raise AUTOExceptions.AUTORuntimeError(
+                "Parameter point %s not found."%(tuple(point),))
+
+    def getIndex(self,index):
+        """Return the bifurcation diagram of row index, or None if it
+        was not computed (yet) or its run failed"""
+        diagram = self.__diagrams[index]
+        if diagram is None and self.columns["files"][index] is not None:
+            b, s, d = self.columns["files"][index]
+            diagram = bifDiag.bifDiag(b, s, d)
+            self.__diagrams[index] = diagram
+        return diagram
+
+    def done(self,index):
+        """Return True if the run of row index succeeded"""
+        return self.columns["branches"][index] is not None
+
+    def todo(self):
+        """Return the row numbers that are not done yet, which includes
+        the rows whose run failed"""
+        return [i for i in range(len(self)) if not self.done(i)]
+
+    def setRow(self,index,result,files=None):
+        """Set row index from the bifurcation diagram or exception result
+        of its run; files are the files the diagram was saved to"""
+        row = {}
+        if isinstance(result, Exception):
+            row["error"] = str(result)
+        else:
+            special = []
+            for branch in result:
+                for ind in branch.labels.getIndices():
+                    x = branch._gettypelabel(ind)
+                    if x[0] != "No Label":
+                        special.append([x[0], int(x[1].get("LAB", 0))])
+            row["branches"] = len(result)
+            row["points"] = sum([len(branch) for branch in result])
+            row["special"] = special
+            if files is not None:
+                row["files"] = list(files)
+            else:
+                self.__diagrams[index] = result
+        self.__setrow(index, row)
+        if self.filename is not None:
+            row["point"] = list(self.points[index])
+            output = open(self.filename, "a")
+            output.write(json.dumps(row)+"\n")
+            output.close()
+
+    def __setrow(self,index,row):
+        for name in summary_columns:
+            self.columns[name][index] = row.get(name)
+
+    def read(self,input):
+        """Read the rows of the points of this sweep from a stream"""
+        for line in input:
+            try:
+                row = json.loads(line)
+                index = self.__index[tuple(row["point"])]
+            except (ValueError, KeyError, TypeError):
+                # ignore an incomplete last line, or a row from a
+                # different grid
+                continue
+            self.__setrow(index, row)
+            self.__diagrams[index] = None
+
+    def readFilename(self,filename):
+        input = open(filename, "r")
+        self.read(input)
+        input.close()
+
+    def summary(self):
+        """Return a table with a line per row"""
+        lines = [" ".join(["%14s"%name for name in self.names] +
+                          ["  branches  points  special points"])]
+        for i, point in enumerate(self.points):
+            line = " ".join(["%14.6E"%value for value in point])
+            if self.columns["error"][i] is not None:
+                line = line + "  " + self.columns["error"][i]
+            elif self.columns["branches"][i] is None:
+                line = line + "  not done"
+            else:
+                line = line + "%10d%8d  %s"%(
+                    self.columns["branches"][i], self.columns["points"][i],
+                    " ".join(["%s%d"%(ty, lab)
+                              for ty, lab in self.columns["special"][i]
+                              if ty != "RG"]))
+            lines.append(line)
+        return "\n".join(lines) + "\n"
+
+def test():
+    import tempfile, shutil
+    print("Testing parameter sweep results")
+    diagram = bifDiag.bifDiag("test_data/fort.7", "test_data/fort.8")
+    tmpdir = tempfile.mkdtemp()
+    filename = os.path.join(tmpdir, "sw.test")
+    try:
+        points = [(1.0, 2.0), (1.0, 3.0), (2.0, 2.0)]
+        sweep = parseSweep([3, "T"], points, filename)
+        if sweep.todo() != [0, 1, 2]:
+            raise AUTOExceptions.AUTORegressionError("Rows incorrect")
+        sweep.setRow(1, diagram)
+        sweep.setRow(2, AUTOExceptions.AUTORuntimeError("Error running AUTO"))
+        if (sweep.todo() != [0, 2] or sweep[1] is not diagram or
+            sweep({3: 2.0, "T": 2.0}) is not None or
+            sweep.columns["PAR(3)"] != [1.0, 1.0, 2.0] or
+            sweep.columns["branches"][1] != len(diagram) or
+            sweep.columns["points"][1] != 150 or
+            len(sweep.columns["special"][1]) != len(diagram.getLabels())):
+            raise AUTOExceptions.AUTORegressionError("Rows incorrect")
+
+        # resume from the file: the failed row is run again
+        resumed = parseSweep([3, "T"], points, filename)
+        if (resumed.todo() != [0, 2] or
+            resumed.columns["special"] != sweep.columns["special"] or
+            resumed.columns["error"][2] != "Error running AUTO"):
+            raise AUTOExceptions.AUTORegressionError("Resuming incorrect")
+        resumed.setRow(2, diagram)
+        resumed = parseSweep([3, "T"], points, filename)
+        if (resumed.todo() != [0] or resumed.columns["error"][2] is not None
+            or resumed.columns["branches"][2] != len(diagram)):
+            raise AUTOExceptions.AUTORegressionError("Resuming incorrect")
+        other = parseSweep([3, "T"], [(5.0, 5.0)], filename)
+        if other.todo() != [0]:
+            raise AUTOExceptions.AUTORegressionError("Resuming incorrect")
+    finally:
+        shutil.rmtree(tmpdir)
+    print("parseSweep passed all tests")
+
+if __name__ == '__main__' :
+    test()
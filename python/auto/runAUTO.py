@@ -14,6 +14,60 @@ try:
 except ImportError:
     import popen2
 import shlex
+import shutil
+import tempfile
+import hashlib
+import threading
+import time
+try:
+    import queue
+except ImportError: # Python 2
+    import Queue as queue
+
+# Build cache: if the environment variable AUTO_BUILD_CACHE is set to a
+# directory (or to 1 for ~/.cache/auto-07p), or build_cache is set to one,
+# equation executables built by runAUTO are stored there under a hash of
+# the equation source and the files it includes, the compilers and their
+# flags and the AUTO library objects. Running the same equations in
+# another directory, or after cleaning up, then links or copies the cached
+# executable instead of compiling and linking it again. Only the
+# build_cache_size most recently used executables are kept.
+build_cache = os.environ.get("AUTO_BUILD_CACHE")
+if build_cache in [None, "", "0"]:
+    build_cache = None
+elif build_cache == "1":
+    build_cache = os.path.join(os.path.expanduser("~"), ".cache", "auto-07p")
+build_cache_size = 50
+# hashes of library objects by file name, size and modification time
+_objecthashes = {}
+# include lines of Fortran and C equation files
+_includeline = re.compile(
+    br'\s*#?\s*include\s*[\'"<]([^\'">]+)[\'">]', re.IGNORECASE)
+# equation executables are built by one thread at a time, so that
+# concurrent runs (e.g. of arun) do not rewrite an executable that
+# another run is starting
+_buildlock = threading.Lock()
+
+# Persistent worker processes: if the environment variable AUTO_WORKER is
+# set to 1 (or persistent_worker = True), run() starts an equation
+# executable only once, with the --worker option, and sends it all
+# following runs in the same directory through its standard input, so
+# that a script with many short runs does not pay for starting a process
+# every time. The input and output of every run end with worker_endjob.
+persistent_worker = os.environ.get("AUTO_WORKER","0") not in ["","0"]
+worker_endjob = "#AUTO end of job"
+
+# Binary start solutions: start solutions with at least binary_solution_size
+# numbers are passed to AUTO as float64 values in the file fort.3.bin
+# instead of as text (see parseS.BINARY_SOLUTION), which saves converting
+# them to text and back. Set the environment variable AUTO_BINARY_SOLUTIONS
+# to 0 or binary_solutions = False to always pass text.
+binary_solutions = os.environ.get("AUTO_BINARY_SOLUTIONS","1") not in ["","0"]
+binary_solution_size = 10000
+binary_solution_file = "fort.3.bin"
+
+# seconds between looks at the new points of a run with stop predicates
+stop_interval = 0.2
 
 # A few global variables for the signal handler
 alarm_demo=""
@@ -76,6 +130,8 @@ class runAUTO:
         self.options["solution"] = parseS.AUTOSolution()
         self.options["homcont"] = None
         self.options["selected_solution"] = None
+        # worker processes by executable: (process, executable mtime)
+        self.__workers = {}
 
         kw = self.config(**kw)
 
@@ -127,11 +183,11 @@ class runAUTO:
         self.fort8_path = os.path.join(self.options["dir"],files[1])
         self.fort9_path = os.path.join(self.options["dir"],files[2])
 
-    def __popen(self,args,stdin=None,stderr=None):
+    def __popen(self,args,stdin=None,stderr=None,cwd=None):
         # subprocess.Popen wrapper:
         return subprocess.Popen(args, stdin=stdin, stdout=subprocess.PIPE, 
                                 stderr=stderr, bufsize=1,
-                                universal_newlines=True)
+                                universal_newlines=True, cwd=cwd)
 
     def __handler(self, signum, frame):
         global demo_killed,alarm_demo,demo_max_time
@@ -281,20 +337,164 @@ class runAUTO:
         f.close()
         return var
 
-    def __make(self,equation,fcon=False):
+    def __includes(self,src,seen):
+        # the files included by src (and by those files) that exist, looked
+        # up next to src and in $AUTO_DIR/include
+        dirs = [os.path.dirname(src),
+                os.path.join(self.options["auto_dir"],"include")]
+        f = open(src,"rb")
+        for line in f:
+            match = _includeline.match(line)
+            if match is None:
+                continue
+            for d in dirs:
+                name = os.path.join(d, match.group(1).decode("ascii",
+                                                              "replace"))
+                if os.path.isfile(name):
+                    if name not in seen:
+                        seen.append(name)
+                        self.__includes(name,seen)
+                    break
+        f.close()
+        return seen
+
+    def __buildkey(self,src,var,objects):
+        # hash of everything that goes into an equation executable: the
+        # source src and the files it includes, the compilers and their
+        # flags and the AUTO library objects
+        h = hashlib.sha1()
+        for name in [src] + self.__includes(src,[]):
+            f = open(name,"rb")
+            h.update(f.read())
+            f.close()
+        h.update(repr((os.path.splitext(src)[1], sorted(var.items()),
+                       self.options["auto_dir"])).encode("ascii", "replace"))
+        for obj in sorted(objects):
+            st = os.stat(obj)
+            key = (obj, st.st_size, st.st_mtime)
+            if key not in _objecthashes:
+                f = open(obj,"rb")
+                _objecthashes[key] = hashlib.sha1(f.read()).hexdigest()
+                f.close()
+            h.update((os.path.basename(obj) + _objecthashes[key]).encode(
+                "ascii"))
+        return h.hexdigest()
+
+    def __replace(self,tmpfile,target):
+        # rename tmpfile to target, replacing it at once where possible
+        try:
+            os.rename(tmpfile, target)
+        except OSError:
+            # Windows does not rename onto existing files
+            if not os.path.exists(target):
+                raise
+            os.remove(target)
+            os.rename(tmpfile, target)
+
+    def __getcached(self,cached,execfile):
+        # link or copy the executable cached to execfile, through a
+        # temporary file so that execfile is never partial
+        if os.path.exists(execfile) and os.path.samefile(cached, execfile):
+            return
+        fd, tmpfile = tempfile.mkstemp(dir=os.path.dirname(execfile) or ".")
+        os.close(fd)
+        os.remove(tmpfile)
+        try:
+            try:
+                os.link(cached, tmpfile)
+            except (AttributeError, OSError):
+                shutil.copy2(cached, tmpfile)
+            # make execfile newer than its sources; for a link this also
+            # marks the cache entry as recently used
+            os.utime(tmpfile, None)
+            self.__replace(tmpfile, execfile)
+        except:
+            if os.path.exists(tmpfile):
+                os.remove(tmpfile)
+            raise
+
+    def __putcached(self,execfile,cached):
+        # store execfile in the cache; renaming a temporary file keeps other
+        # processes from seeing a partial executable
+        tmpfile = None
+        try:
+            if not os.path.isdir(build_cache):
+                os.makedirs(build_cache)
+            fd, tmpfile = tempfile.mkstemp(dir=build_cache)
+            os.close(fd)
+            shutil.copy2(execfile, tmpfile)
+            # the modification time tells how recently the entry was used
+            os.utime(tmpfile, None)
+            self.__replace(tmpfile, cached)
+            tmpfile = None
+            self.__prunecache()
+        except (IOError, OSError):
+            sys.stderr.write("Cannot store %s in the build cache %s: %s\n"%
+                             (execfile, build_cache, sys.exc_info()[1]))
+            if tmpfile is not None and os.path.exists(tmpfile):
+                os.remove(tmpfile)
+
+    def __prunecache(self):
+        # remove all but the build_cache_size most recently used executables
+        entries = []
+        for cached in glob.glob(os.path.join(build_cache, "*.exe")):
+            try:
+                entries.append((os.stat(cached).st_mtime, cached))
+            except OSError:
+                # removed by another process
+                pass
+        entries.sort()
+        for mtime, cached in entries[:max(len(entries)-build_cache_size,0)]:
+            try:
+                os.remove(cached)
+            except OSError:
+                pass
+
+    def __make(self,equation,fcon=False,dir=""):
+        # build the executable of equation in the directory dir (by default
+        # the current directory), without changing the current directory
+        _buildlock.acquire()
+        try:
+            return self.__build(equation,fcon,dir)
+        finally:
+            _buildlock.release()
+
+    def __build(self,equation,fcon,dir):
         var = self.__getmakevars()
+        cwd = dir or None
+        def path(name):
+            return os.path.join(dir,name)
         # figure out equation file name
         src = ""
         for ext in [".f90",".f",".c"]:
-            if os.path.exists(equation+ext):
+            if os.path.exists(path(equation+ext)):
                 src = equation+ext
         if src == "":
             raise AUTOExceptions.AUTORuntimeError(
                 "Neither the equation file %s.f90, nor %s.f, nor %s.c exists."%(
                 equation,equation,equation))
+        auto_dir = self.options["auto_dir"]
+        libdir = os.path.join(auto_dir,"lib")
+        cached = None
+        if build_cache is not None and not fcon:
+            # look for the executable in the cache before compiling
+            objects = glob.glob(os.path.join(libdir,"*.o"))
+            cached = os.path.join(build_cache, self.__buildkey(
+                path(src),var,objects)+".exe")
+            execfile = path(equation+".exe")
+            if (os.path.exists(execfile) and
+                not self.__newer([path(src)]+objects,execfile)):
+                return True
+            if os.path.exists(cached):
+                try:
+                    self.__getcached(cached, execfile)
+                    return True
+                except (IOError, OSError):
+                    # removed from the cache in the meantime: build it
+                    pass
         # compile
-        if not os.path.exists(equation+'.o') or self.__newer([src],
-                                                             equation+'.o'):
+        if not os.path.exists(path(equation+'.o')) or self.__newer(
+            [path(src)], path(equation+'.o')):
             if src[-1] == 'c':
                 cmd = "%s %s %s -c %s -o %s.o"%(var["CC"],var["CFLAGS"],
                                                 var["OPT"],src,equation)
@@ -302,10 +502,8 @@ class runAUTO:
                 cmd = "%s %s %s -c %s -o %s.o"%(var["FC"],var["FFLAGS"],
                                                 var["OPT"],src,equation)
             sys.stdout.write(cmd+"\n")
-            self.runCommand(cmd)
+            self.runCommand(cmd,cwd=cwd)
         # link
-        auto_dir = self.options["auto_dir"]
-        libdir = os.path.join(auto_dir,"lib")
         if fcon:
             srcdir = os.path.join(auto_dir,"src")
             incdir = os.path.join(auto_dir,"include")
@@ -315,9 +513,10 @@ class runAUTO:
             execfile = "fcon"
         else:
             libs = os.path.join(libdir,"*.o")
-            deps = glob.glob(libs) + [equation+'.o']
+            deps = glob.glob(libs) + [path(equation+'.o')]
             execfile = equation + ".exe"
-        if not os.path.exists(execfile) or self.__newer(deps,execfile):
+        if not os.path.exists(path(execfile)) or self.__newer(deps,
+                                                              path(execfile)):
             if src[-1] == 'c':
                 cmd = '%s -L%s %s %s %s.o -o %s %s -lauto_c'%(var["FC"],libdir.replace(" ","\\ "),
                                    var["FFLAGS"],var["OPT"],equation,execfile,libs)
@@ -326,8 +525,15 @@ class runAUTO:
                                                     equation,execfile,libs)
             sys.stdout.write(cmd+"\n")
             cmd = cmd.replace(libs, " ".join([x.replace(" ","\\ ") for x in deps[:-1]]))
-            self.runCommand(cmd)
-        return os.path.exists(equation+'.exe') and not self.__newer(deps,equation+'.exe')
+            if (os.path.exists(path(execfile)) and
+                os.stat(path(execfile)).st_nlink > 1):
+                # do not overwrite a linked cached executable
+                os.remove(path(execfile))
+            self.runCommand(cmd,cwd=cwd)
+            if cached is not None:
+                self.__putcached(path(execfile), cached)
+        return (os.path.exists(path(equation+'.exe')) and
+                not self.__newer(deps,path(equation+'.exe')))
 
     def load(self,**kw):
         """Load solution with the given AUTO constants.
@@ -339,12 +545,19 @@ class runAUTO:
         self.options["selected_solution"] = ret
         return ret
 
-    def run(self):
+    def run(self,stopif=None):
         """Run AUTO.
 
         Run AUTO from the solution with the given AUTO constants.
         Returns a bifurcation diagram of the result.
+
+        stopif is a predicate, or a list of predicates, that are called
+        with every new point of the bifurcation diagram (a
+        stream.BranchPoint) while AUTO runs; AUTO is stopped as soon as
+        one of them returns True.
         """
+        if stopif is not None and not isinstance(stopif, (list, tuple)):
+            stopif = [stopif]
         self.__setup()
         solution = self.options["selected_solution"]
         constants = solution.c
@@ -373,12 +586,18 @@ class runAUTO:
                     if os.path.exists(filename):
                         os.remove(filename)
                 command = os.path.join(".",equation + ".exe")
-                prefix = os.environ.get("AUTO_COMMAND_PREFIX")
-                if prefix is not None:
-                    command = " ".join((prefix, command))
-                self.runCommand(command, solution)
-                if os.path.exists("fort.3"):
-                    os.remove("fort.3")
+                if stopif:
+                    self.__runStopIf(command, solution, stopif)
+                elif persistent_worker and "subprocess" in sys.modules:
+                    self.__runWorker(command, solution)
+                else:
+                    prefix = os.environ.get("AUTO_COMMAND_PREFIX")
+                    if prefix is not None:
+                        command = " ".join((prefix, command))
+                    self.runCommand(command, solution)
+                for filename in ["fort.3", binary_solution_file]:
+                    if os.path.exists(filename):
+                        os.remove(filename)
                 line = "%s ... done\n"%equation
                 sys.stdout.write(line)
             os.chdir(curdir)
@@ -389,6 +608,344 @@ class runAUTO:
         return bifDiag.bifDiag(self.fort7_path,self.fort8_path,
                                self.fort9_path,constants)
 
+    def runMany(self,solutions,processes=None,callback=None):
+        """Run AUTO from several starting points at the same time.
+
+        solutions is a list of solutions with their AUTO constants, as
+        returned by load(). Each run starts in its own scratch directory
+        within the run directory, and at most processes runs (by default
+        the number of CPUs) are active at any time.
+        Returns a bifurcation diagram with the branches of all runs, in
+        the order of solutions.
+
+        If callback is given, then callback(i, result) is called as soon
+        as the run from solutions[i] is done, where result is its
+        bifurcation diagram, or an AUTORuntimeError if it failed, and
+        nothing is returned.
+        """
+        if processes is None:
+            try:
+                import multiprocessing
+                processes = multiprocessing.cpu_count()
+            except (ImportError, NotImplementedError):
+                processes = 1
+        jobs = self.prepareJobs(solutions)
+
+        todo = queue.Queue()
+        done = queue.Queue()
+        running = []
+        for i in range(len(jobs)):
+            todo.put(i)
+        def worker():
+            while True:
+                try:
+                    i = todo.get(False)
+                except queue.Empty:
+                    return
+                try:
+                    done.put((i,) + self.__runJob(jobs[i][0], jobs[i][1],
+                                                  jobs[i][2], running))
+                except:
+                    done.put((i, sys.exc_info()[1], ""))
+        threads = []
+        for i in range(max(1, min(processes, len(jobs)))):
+            thread = threading.Thread(target=worker)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        results = len(jobs)*[None]
+        error = None
+        try:
+            for n in range(len(jobs)):
+                i, status, output = done.get()
+                sys.stdout.write(output)
+                sys.stdout.flush()
+                if status == 0:
+                    result = self.jobResult(jobs[i])
+                    if result is None:
+                        status = 1
+                if status != 0:
+                    result = self.__runManyError(i, status)
+                    if callback is None:
+                        if error is None:
+                            error = result
+                        continue
+                if callback is None:
+                    results[i] = result
+                else:
+                    callback(i, result)
+        except:
+            # e.g. KeyboardInterrupt: stop all runs
+            while not todo.empty():
+                try:
+                    todo.get(False)
+                except queue.Empty:
+                    break
+            for obj in running:
+                if obj.poll() is None:
+                    obj.kill()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+            for job in jobs:
+                shutil.rmtree(job[1], True)
+        if error is not None:
+            raise error
+        if callback is not None:
+            return
+        from auto import bifDiag
+        bd = bifDiag.bifDiag()
+        for result in results:
+            bd.extend(result)
+        return bd
+
+    def prepareJobs(self,solutions,dir=None):
+        """Prepare runs of AUTO from solutions, a list of solutions with
+        their AUTO constants as returned by load(), each in its own
+        scratch directory within the run directory dir (by default the
+        directory of this runner).
+        Returns a list with, for every run, the command line, the
+        (absolute) scratch directory, the input for AUTO, and the AUTO
+        constants. The caller removes the scratch directories.
+        The current directory is not changed, so that jobs can be
+        prepared in other threads."""
+        if self.options["auto_dir"] is None:
+            if "AUTO_DIR" not in os.environ:
+                raise AUTOExceptions.AUTORuntimeError(
+                    "AUTO_DIR not set as option or as environment variable")
+            self.options["auto_dir"]=os.environ["AUTO_DIR"]
+        args = []
+        prefix = os.environ.get("AUTO_COMMAND_PREFIX")
+        if prefix is not None:
+            args = shlex.split(os.path.expandvars(prefix))
+        jobs = []
+        if dir is None:
+            dir = self.options["dir"]
+        rundir = os.path.abspath(dir)
+        try:
+            # compile each equation once; prepare the input of all runs
+            # here as solutions may share their input file
+            executables = {}
+            for solution in solutions:
+                constants = solution.c
+                if (constants["IRS"] and solution.coordnames == []):
+                    raise AUTOExceptions.AUTORuntimeError(
+                        "Restart label IRS=%s not found."%constants["IRS"])
+                if "e" not in constants:
+                    raise AUTOExceptions.AUTORuntimeError(
+                        "The equation file argument is missing.")
+                equation = constants["e"]
+                if equation not in executables:
+                    if not self.__make(equation,dir=rundir):
+                        raise AUTOExceptions.AUTORuntimeError(
+                            "Error compiling %s"%equation)
+                    executables[equation] = os.path.join(rundir,
+                                                         equation+".exe")
+                if constants.get("sv") is not None:
+                    # the scratch directories do not keep any files
+                    solution = solution.load(sv=None)
+                dir = tempfile.mkdtemp(prefix="auto", dir=rundir)
+                if constants["homcont"] is not None:
+                    constants["homcont"].writeFilename(
+                        os.path.join(dir,"fort.12"))
+                f = StringIO()
+                self.__write_constants_solution(f, solution, dir)
+                jobs.append((args + [executables[equation]],
+                             dir, f.getvalue(), solution.c))
+        except:
+            for job in jobs:
+                shutil.rmtree(job[1], True)
+            raise
+        return jobs
+
+    def jobResult(self,job):
+        """Return the bifurcation diagram of the finished run job (see
+        prepareJobs()), read completely so that its scratch directory can
+        be removed, or None if AUTO did not write its output files"""
+        from auto import bifDiag
+        executable, dir, input, constants = job
+        fort7, fort8, fort9 = [os.path.join(dir,"fort.%d"%j)
+                               for j in [7, 8, 9]]
+        if (not os.path.isfile(fort7) or os.path.getsize(fort7) == 0 or
+            not os.path.isfile(fort8) or not os.path.isfile(fort9)):
+            return None
+        result = bifDiag.bifDiag(fort7, fort8, fort9, constants)
+        for branch in result:
+            branch.coordarray
+        for solution in result():
+            solution.coordarray
+        return result
+
+    def __runManyError(self,i,status):
+        # the exception for the failed run i of runMany()
+        if not isinstance(status, int):
+            return AUTOExceptions.AUTORuntimeError(
+                "Error running AUTO from solution %d: %s"%(i+1,status))
+        if status < 0:
+            for s in signals:
+                if hasattr(signal,s) and -status == getattr(signal,s):
+                    return AUTOExceptions.AUTORuntimeError(
+                        "%s (solution %d)"%(signals[s],i+1))
+        return AUTOExceptions.AUTORuntimeError(
+            "Error running AUTO from solution %d"%(i+1))
+
+    def __runJob(self,args,dir,input,running):
+        # run one AUTO process of runMany() in the scratch directory dir;
+        # returns its exit status and output
+        obj = subprocess.Popen(args, cwd=dir, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT,
+                               universal_newlines=True)
+        running.append(obj)
+        output = obj.communicate(input)[0]
+        return obj.returncode, output
+
+    def __runStopIf(self,executable,solution,stopif):
+        # run AUTO, and stop it as soon as one of the predicates stopif is
+        # true for a new point
+        from auto import stream
+        args = [executable]
+        prefix = os.environ.get("AUTO_COMMAND_PREFIX")
+        if prefix is not None:
+            args = shlex.split(os.path.expandvars(prefix)) + args
+        points = stream.PointTail(self.fort7_path)
+        solutions = stream.SolutionTail(self.fort8_path)
+        gc.collect()
+        # the output goes to the log of the runner (see config), as for
+        # the other ways of running AUTO; the thread that copies it keeps
+        # the log that was set when the run started
+        log = sys.stdout
+        log.flush()
+        obj = subprocess.Popen(args, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE,
+                               universal_newlines=True)
+        tmp_out = []
+        def output():
+            for line in iter(obj.stdout.readline, ""):
+                log.write(line)
+                log.flush()
+                tmp_out.append(line)
+        thread = threading.Thread(target=output)
+        thread.daemon = True
+        thread.start()
+        stopped = None
+        # the number of labeled points up to the stopping point, which
+        # is the number of solutions to keep
+        labels = 0
+        try:
+            try:
+                self.__write_constants_solution(obj.stdin, solution, ".")
+                obj.stdin.close()
+            except IOError:
+                pass
+            running = True
+            while stopped is None and running:
+                time.sleep(stop_interval)
+                # read the last points after AUTO finished too
+                running = obj.poll() is None
+                for point in points.read():
+                    if point.LAB != 0:
+                        labels = labels + 1
+                    if [f for f in stopif if f(point)]:
+                        stopped = point
+                        if running:
+                            obj.terminate()
+                        break
+            status = obj.wait()
+        except KeyboardInterrupt:
+            obj.kill()
+            obj.wait()
+            if hasattr(signal, 'SIGINT'):
+                status = -signal.SIGINT
+            else:
+                status = 1
+        except:
+            # e.g. an error in a predicate
+            obj.kill()
+            obj.wait()
+            thread.join()
+            raise
+        thread.join()
+        self.__analyseLog("".join(tmp_out))
+        if stopped is not None:
+            # remove what AUTO wrote after the stopping point
+            points.truncate(stopped)
+            solutions.truncate(labels)
+            log.write("Stopped at branch %d, point %d\n"%
+                      (abs(stopped.BR), abs(stopped.PT)))
+        elif status != 0:
+            self.__commandError(status, solution)
+
+    def __runWorker(self,executable,solution):
+        # run AUTO in the worker process of executable, which runs in the
+        # current directory; (re)start it if needed
+        executable = os.path.abspath(executable)
+        mtime = os.path.getmtime(executable)
+        worker = self.__workers.get(executable)
+        if worker is not None and (worker[1] != mtime or
+                                   worker[0].poll() is not None):
+            # the executable was rebuilt, or the worker stopped
+            self.__closeWorker(executable)
+            worker = None
+        if worker is None:
+            args = [executable, "--worker"]
+            prefix = os.environ.get("AUTO_COMMAND_PREFIX")
+            if prefix is not None:
+                args = shlex.split(os.path.expandvars(prefix)) + args
+            obj = subprocess.Popen(args, stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE,
+                                   universal_newlines=True)
+            worker = obj, mtime
+            self.__workers[executable] = worker
+        obj = worker[0]
+        gc.collect()
+        sys.stdout.flush()
+        tmp_out = []
+        status = 0
+        try:
+            try:
+                self.__write_constants_solution(obj.stdin, solution, ".")
+                obj.stdin.write(worker_endjob+"\n")
+                obj.stdin.flush()
+            except IOError:
+                # the worker stopped while reading; its status follows
+                pass
+            while True:
+                line = obj.stdout.readline()
+                if line == "":
+                    # the worker stopped, e.g. because of an error
+                    status = obj.wait()
+                    del self.__workers[executable]
+                    break
+                if line.rstrip() == worker_endjob:
+                    break
+                sys.stdout.write(line)
+                sys.stdout.flush()
+                tmp_out.append(line)
+        except KeyboardInterrupt:
+            obj.kill()
+            obj.wait()
+            del self.__workers[executable]
+            if hasattr(signal, 'SIGINT'):
+                status = -signal.SIGINT
+            else:
+                status = 1
+        self.__analyseLog("".join(tmp_out))
+        if status != 0:
+            self.__commandError(status, solution)
+
+    def __closeWorker(self,executable):
+        obj = self.__workers.pop(executable)[0]
+        # at the end of its input the worker exits
+        obj.communicate()
+
+    def closeWorkers(self):
+        """Stop the worker processes that were started by run()"""
+        for executable in list(self.__workers):
+            self.__closeWorker(executable)
+
     def runMakefileWithSetup(self,equation=None):
         self.__setup()
         self.runMakefile(equation)
@@ -457,9 +1014,9 @@ class runAUTO:
         self.__setup()
         self.runCommand(command,self.options["selected_solution"])
         self.__outputCommand()
-    def runCommand(self,command=None,solution=None):
+    def runCommand(self,command=None,solution=None,cwd=None):
         """     This is the most generic interface.  It just takes a string as a command
-        and tries to run it. """
+        and tries to run it (in the directory cwd if given). """
         global demo_killed,alarm_demo,demo_max_time
         gc.collect()
         if command is None:
@@ -477,7 +1034,7 @@ class runAUTO:
         command = os.path.expandvars(command)
         if self.options["makefile"] is None and sys.stdout is sys.__stdout__:
             try:
-                status = self.__runCommand_noredir(command, solution)
+                status = self.__runCommand_noredir(command, solution, cwd)
             except KeyboardInterrupt:
                 if hasattr(signal, 'SIGINT'):
                     status = -signal.SIGINT
@@ -489,7 +1046,7 @@ class runAUTO:
                 else:
                     status = 1
         else:
-            status = self.__runCommand_redir(command, solution)
+            status = self.__runCommand_redir(command, solution, cwd)
         if hasattr(signal,"alarm"):
             signal.alarm(0)
         if hasattr(os,"times"):
@@ -497,51 +1054,62 @@ class runAUTO:
         else:
             user_time = 1.0
         if status != 0:
-            # in case of error, write constants to fort.2 to enable
-            # easier debugging.
-            if solution is not None:
-                f = open('fort.2', 'w')
-                self.__write_constants_solution(f, solution)
-                f.close()
-            if status < 0:
-                status = abs(status)
-                for s in signals:
-                    if hasattr(signal,s) and status == getattr(signal,s):
-                        raise AUTOExceptions.AUTORuntimeError(signals[s])
-                raise AUTOExceptions.AUTORuntimeError("Signal %d\n"%status)
-            raise AUTOExceptions.AUTORuntimeError("Error running AUTO")
+            self.__commandError(status, solution)
 
-    def __write_constants_solution(self, f, solution):
+    def __commandError(self,status,solution):
+        # in case of error, write constants to fort.2 to enable
+        # easier debugging.
+        if solution is not None:
+            f = open('fort.2', 'w')
+            self.__write_constants_solution(f, solution)
+            f.close()
+        if status < 0:
+            status = abs(status)
+            for s in signals:
+                if hasattr(signal,s) and status == getattr(signal,s):
+                    raise AUTOExceptions.AUTORuntimeError(signals[s])
+            raise AUTOExceptions.AUTORuntimeError("Signal %d\n"%status)
+        raise AUTOExceptions.AUTORuntimeError("Error running AUTO")
+
+    def __write_constants_solution(self, f, solution, dir=None):
+        # with dir, the directory where AUTO runs, large solutions are
+        # written to a binary file there
         solution.c.write(f,new=True)
         f.write("s='/'\n")
         if hasattr(f, 'buffer'):
             f = f.buffer
-        solution.write(f,mlab=True)
+        binary = None
+        if dir is not None and binary_solutions:
+            # from the header: parsing the solution would mean that
+            # its text cannot just be copied
+            if solution._numfloats() >= binary_solution_size:
+                binary = os.path.join(dir, binary_solution_file)
+        solution.write(f,mlab=True,binary=binary)
 
-    def __runCommand_noredir(self,command,solution=None):
+    def __runCommand_noredir(self,command,solution=None,cwd=None):
         sys.stdout.flush()
         args = shlex.split(os.path.expandvars(command))
         if solution is None:
             if "subprocess" in sys.modules:
-                return subprocess.call(args)
+                return subprocess.call(args, cwd=cwd)
             elif hasattr(os,"spawnlp"):
                 return os.spawnlp(os.P_WAIT, args[0], *args)
             else:
                 return os.system(command)
         if "subprocess" in sys.modules:
             obj = subprocess.Popen(args, stdin=subprocess.PIPE,
-                                   universal_newlines=True)
+                                   universal_newlines=True, cwd=cwd)
             stdin = obj.stdin
         else:
             stdin = os.popen(command, "w")
             status = 0
-        self.__write_constants_solution(stdin, solution)
+        self.__write_constants_solution(stdin, solution, cwd or ".")
         stdin.close()
         if "subprocess" in sys.modules:
             status = obj.wait()
         return status
 
-    def __runCommand_redir(self,command,solution=None):
+    def __runCommand_redir(self,command,solution=None,cwd=None):
         global demo_killed
         tmp_out = []
         if "subprocess" in sys.modules or hasattr(popen2,"Popen3"):
@@ -551,7 +1119,7 @@ class runAUTO:
             if "subprocess" in sys.modules:
                 args = shlex.split(os.path.expandvars(command))
                 demo_object = self.__popen(args, subprocess.PIPE,
-                                           subprocess.PIPE)
+                                           subprocess.PIPE, cwd)
                 stdin, stdout, stderr = (demo_object.stdin, demo_object.stdout,
                                          demo_object.stderr)
                 teststatus = None
@@ -561,7 +1129,7 @@ class runAUTO:
                              demo_object.fromchild, demo_object.childerr)
                 teststatus = -1
             if solution is not None:
-                self.__write_constants_solution(stdin, solution)
+                self.__write_constants_solution(stdin, solution, cwd or ".")
             stdin.close()
             status = demo_object.poll()
             while status == teststatus:
@@ -0,0 +1,210 @@
+#! /usr/bin/env python
+# Asynchronous AUTO runs with asyncio (Python 3.5 and later), as started by
+# the arun command or by run(..., async_=True). An AsyncRun starts AUTO in
+# its own scratch directory. Iterating over it with "async for" gives the
+# points of the bifurcation diagram (as stream.BranchPoint records) and the
+# solutions at labeled points (as AUTOSolution objects) while AUTO computes
+# them, by following fort.7 and fort.8, and awaiting it gives the
+# bifurcation diagram that run() would return. Several runs can be
+# awaited at the same time from one event loop, e.g.
+#
+#   async def main():
+#       r1 = arun(s1, ICP=[1])
+#       r2 = arun(s2, ICP=[1], DS='-')
+#       async for x in r1:
+#           if isinstance(x, stream.BranchPoint):
+#               print(x.BR, x.PT, x.data[0])
+#       return await asyncio.gather(r1, r2)
+
+import asyncio
+import os
+import shutil
+import signal
+import sys
+from auto import AUTOExceptions
+from auto import runAUTO
+from auto import stream
+
+# marks the end of the points and solutions of a run
+_END = object()
+
+class AsyncRun(object):
+    def __init__(self,runner,solution,done=None,interval=0.2,stopif=None):
+        """Run AUTO with runner (a runAUTO object) from solution, with its
+        AUTO constants, as returned by load(). done(result) is called
+        with the bifurcation diagram once the run is finished. The output
+        files are checked for new points every interval seconds. AUTO is
+        stopped at the first new point for which the predicate stopif (or
+        one of the list of predicates stopif) returns True."""
+        if stopif is not None and not isinstance(stopif, (list, tuple)):
+            stopif = [stopif]
+        self.runner = runner
+        self.solution = solution
+        # the run directory, fixed here since the jobs are prepared in
+        # another thread
+        self.dir = os.path.abspath(runner.options["dir"])
+        self.interval = interval
+        self.stopif = stopif or []
+        self.stopped = None
+        # the numbers of labeled points and of solutions read so far
+        self.__labels = 0
+        self.__solutions = 0
+        self.__done = done
+        # made by start(), since before Python 3.10 a queue belongs to the
+        # event loop that is current when it is made
+        self.__events = None
+        self.__task = None
+
+    def start(self):
+        """Start the run (in the running event loop) if it was not
+        started yet; iterating over or awaiting the run starts it too."""
+        if self.__task is None:
+            self.__events = asyncio.Queue()
+            self.__task = asyncio.ensure_future(self.__run())
+        return self.__task
+
+    def __await__(self):
+        return self.start().__await__()
+
+    def __aiter__(self):
+        self.start()
+        return self
+
+    async def __anext__(self):
+        event = await self.__events.get()
+        if event is _END:
+            # raises the error of a failed run
+            self.__task.result()
+            raise StopAsyncIteration
+        return event
+
+    def __read(self,points,solutions,process):
+        events = []
+        for point in points.read():
+            events.append(point)
+            if point.LAB != 0:
+                self.__labels = self.__labels + 1
+            if [f for f in self.stopif if f(point)]:
+                self.stopped = point
+                if process.returncode is None:
+                    process.terminate()
+                break
+        new = solutions.read()
+        if self.stopped is not None:
+            # leave out the solutions after the stopping point
+            new = new[:max(self.__labels - self.__solutions, 0)]
+        self.__solutions = self.__solutions + len(new)
+        for event in events + new:
+            self.__events.put_nowait(event)
+
+    async def __output(self,stdout):
+        # echo the output of AUTO
+        while True:
+            line = await stdout.readline()
+            if not line:
+                break
+            sys.stdout.write(line.decode("ascii", "replace"))
+            sys.stdout.flush()
+
+    async def __run(self):
+        loop = asyncio.get_event_loop()
+        process = None
+        jobs = []
+        try:
+            # compiling takes a while: do it outside the event loop
+            jobs = await loop.run_in_executor(None, self.runner.prepareJobs,
+                                              [self.solution], self.dir)
+            args, dir, input, constants = jobs[0]
+            points = stream.PointTail(os.path.join(dir, "fort.7"))
+            solutions = stream.SolutionTail(os.path.join(dir, "fort.8"))
+            process = await asyncio.create_subprocess_exec(*args, cwd=dir,
+                stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT)
+            output = asyncio.ensure_future(self.__output(process.stdout))
+            process.stdin.write(input.encode("ascii"))
+            await process.stdin.drain()
+            process.stdin.close()
+            finished = asyncio.ensure_future(process.wait())
+            running = True
+            while self.stopped is None and running:
+                await asyncio.wait([finished], timeout=self.interval)
+                # read the last points after AUTO finished too
+                running = not finished.done()
+                self.__read(points, solutions, process)
+            await finished
+            await output
+            status = finished.result()
+            result = None
+            if self.stopped is not None:
+                # remove what AUTO wrote after the stopping point
+                points.truncate(self.stopped)
+                solutions.truncate(self.__labels)
+                sys.stdout.write("Stopped at branch %d, point %d\n"%
+                                 (abs(self.stopped.BR), abs(self.stopped.PT)))
+                status = 0
+            if status == 0:
+                result = self.runner.jobResult(jobs[0])
+            if result is None:
+                for s in runAUTO.signals:
+                    if hasattr(signal,s) and -status == getattr(signal,s):
+                        raise AUTOExceptions.AUTORuntimeError(
+                            runAUTO.signals[s])
+                raise AUTOExceptions.AUTORuntimeError("Error running AUTO")
+            if self.__done is not None:
+                self.__done(result)
+            return result
+        finally:
+            # also if the run was cancelled
+            if process is not None and process.returncode is None:
+                process.kill()
+                await process.wait()
+            for job in jobs:
+                shutil.rmtree(job[1], True)
+            self.__events.put_nowait(_END)
+
+def test():
+    import tempfile
+    from auto import AUTOCommands
+    from auto import bifDiag
+    print("Testing arun")
+    tmpdir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        for name in ["ab.f90", "c.ab.1"]:
+            shutil.copy(os.path.join(os.environ["AUTO_DIR"],"demos","ab",name),
+                        tmpdir)
+        os.chdir(tmpdir)
+        runner = runAUTO.runAUTO()
+        # both runs are made before their event loop runs
+        r1 = AUTOCommands.arun(e='ab', c='ab.1', NMX=20, runner=runner)
+        r2 = AUTOCommands.run(e='ab', c='ab.1', NMX=20, DS='-',
+                              runner=runner, async_=True)
+        async def main():
+            events = []
+            async for x in r1:
+                events.append(x)
+            return events, await r1, await r2
+        if hasattr(asyncio, "run"):
+            events, bd1, bd2 = asyncio.run(main())
+        else:
+            loop = asyncio.get_event_loop()
+            events, bd1, bd2 = loop.run_until_complete(main())
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmpdir)
+    points = [x for x in events if isinstance(x, stream.BranchPoint)]
+    solutions = [x for x in events if not isinstance(x, stream.BranchPoint)]
+    branch = bd1[0]
+    if (not isinstance(bd1, bifDiag.bifDiag) or
+        not isinstance(bd2, bifDiag.bifDiag) or
+        len(points) != len(branch) or len(points) != 20 or
+        [x.PT for x in points] != [branch[i]["PT"]
+                                   for i in range(len(branch))] or
+        list(points[-1].data) != branch[-1]["data"]):
+        raise AUTOExceptions.AUTORegressionError("arun points incorrect")
+    if ([x.LAB for x in points if x.LAB != 0] != bd1.getLabels() or
+        [s["LAB"] for s in solutions] != bd1.getLabels()):
+        raise AUTOExceptions.AUTORegressionError("arun solutions incorrect")
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,490 @@
+#! /usr/bin/env python
+#    Visualization for Bifurcation Manifolds
+#    Copyright (C) 1997 Randy Paffenroth and John Maddocks
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU  General Public
+#    License as published by the Free Software Foundation; either
+#    version 2 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Library General Public License for more details.
+#
+#    You should have received a copy of the GNU Library General Public
+#    License along with this library; if not, write to the Free
+#    Software Foundation, Inc., 59 Temple Place - Suite 330, Boston,
+#    MA 02111-1307, USA
+
+# Streaming access to bifurcation diagram (b.xxx, fort.7) and solution
+# (s.xxx, fort.8) files. Unlike parseB and parseS, which build a list of
+# all branches or solutions, the generators in this module go through a
+# file once and only keep the current point or solution in memory, so
+# that arbitrarily large files can be post-processed, e.g.
+#
+#   for point in iter_points("b.xxx"):
+#       if point.TY == "LP":
+#           print(point.BR, point.PT, point.data)
+#
+# PointTail and SolutionTail follow files that AUTO is still writing, and
+# return the points and solutions that were added since they last looked.
+# DiagramTail does the same for a whole bifurcation diagram, which it
+# extends in place, e.g. to follow a long run from another session:
+#
+#   tail = DiagramTail("fort.7", "fort.8")
+#   bd = tail.read()
+#   ...
+#   tail.read() # bd now also has the points computed in the meantime
+
+import os
+from collections import namedtuple
+from io import BytesIO
+try:
+    from cStringIO import StringIO
+except ImportError: # Python 3
+    from io import StringIO
+from auto import AUTOExceptions
+from auto import AUTOutil
+from auto import Points
+from auto import parseB
+from auto import parseC
+from auto import parseS
+from auto import bifDiag
+
+# A point of a bifurcation diagram: branch number, point number, type name,
+# label, the numbers in the point's line as an array, and an AUTOBranch
+# without points that holds the column names (branch.coordnames) and
+# constants (branch.c) from the header of the branch the point is on.
+# The numbers can also be looked up by column name, e.g. point["U(1)"].
+class BranchPoint(namedtuple("BranchPoint", "BR PT TY LAB data branch")):
+    __slots__ = ()
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return self.data[self.branch.coordnames.index(key)]
+            except ValueError:
+                raise KeyError(key)
+        return tuple.__getitem__(self, key)
+
+class _PointReader(object):
+    # turns the lines of a bifurcation diagram file into BranchPoint records
+    def __init__(self):
+        if not Points.numpyimported:
+            Points.importnumpy()
+        self.branch = None
+        self.headerlist = []
+
+    def point(self, line):
+        # the BranchPoint of line, or None for header and empty lines
+        columns = line.split(None, 4)
+        if columns == []:
+            return None
+        if columns[0] == '0':
+            self.headerlist.append(line)
+            return None
+        if self.branch is None or self.headerlist != []:
+            # start of a branch: decode its header once
+            self.branch = parseB.AUTOBranch()
+            self.branch.c = self.branch.parseHeader(self.headerlist, line)
+            self.headerlist = []
+        N = Points.N
+        values = columns[4].split()
+        try:
+            data = N.array(list(map(float, values)), 'd')
+        except ValueError:
+            data = N.array(list(map(parseB.AUTOatof, values)), 'd')
+        return BranchPoint(int(columns[0]), int(columns[1]),
+            parseB.type_translation(int(columns[2]))["short name"],
+            int(columns[3]), data, self.branch)
+
+def iter_points(filename):
+    """Iterate over the points in the bifurcation diagram file filename
+    (a file name or an open file), generating BranchPoint records."""
+    if isinstance(filename, str):
+        inputfile = AUTOutil.openFilename(filename, "r")
+    else:
+        inputfile = filename
+    try:
+        reader = _PointReader()
+        for line in inputfile:
+            point = reader.point(line)
+            if point is not None:
+                yield point
+    finally:
+        if inputfile is not filename:
+            inputfile.close()
+
+def iter_solutions(filename):
+    """Iterate over the solutions in the solution file filename (a file
+    name or an open file), generating AUTOSolution objects. The data of a
+    solution is only read from the file if it is used, so as for parseS
+    the file stays open as long as the solutions refer to it."""
+    if isinstance(filename, str):
+        inputfile = AUTOutil.openFilename(filename, "rb")
+    else:
+        inputfile = filename
+    input = parseS.fileS(inputfile, scan=False)
+    for solution in input.entries():
+        yield parseS.AUTOSolution(input.view(solution), 0, input.name)
+
+def _str(line):
+    # a line read in binary mode as str (it already is one in Python 2)
+    if isinstance(line, str):
+        return line
+    return line.decode("ascii")
+
+class _Tail(object):
+    # the complete lines that were appended to a file since the last call
+    # of lines(); the file need not exist yet
+    def __init__(self, filename):
+        self.filename = filename
+        self.offset = 0
+
+    def lines(self):
+        try:
+            inputfile = open(self.filename, "rb")
+        except IOError:
+            return []
+        try:
+            inputfile.seek(self.offset)
+            data = inputfile.read()
+        finally:
+            inputfile.close()
+        end = data.rfind("\n".encode("ascii")) + 1
+        self.offset = self.offset + end
+        return data[:end].splitlines(True)
+
+    def truncate(self, offset):
+        # cut the file off at offset
+        if os.path.exists(self.filename):
+            output = open(self.filename, "r+b")
+            output.truncate(offset)
+            output.close()
+
+class PointTail(object):
+    """Follow the bifurcation diagram file filename while AUTO writes it
+    (usually fort.7): read() returns BranchPoint records for the points
+    that were written since the last call of read()."""
+    def __init__(self, filename):
+        self.__tail = _Tail(filename)
+        self.__reader = _PointReader()
+        # the points of the last call of read(), with the file offsets
+        # of the ends of their lines
+        self.__ends = []
+
+    def read(self):
+        points = []
+        self.__ends = []
+        end = self.__tail.offset
+        for line in self.__tail.lines():
+            end = end + len(line)
+            point = self.__reader.point(_str(line))
+            if point is not None:
+                points.append(point)
+                self.__ends.append((point, end))
+        return points
+
+    def truncate(self, point=None):
+        """Cut the file off after point, which must be one of the points
+        of the last call of read(); without point read the rest of the
+        file and cut off an incomplete last line, e.g. after AUTO was
+        stopped while writing it"""
+        if point is None:
+            self.read()
+            self.__tail.truncate(self.__tail.offset)
+            return
+        for p, end in self.__ends:
+            if p is point:
+                self.__tail.truncate(end)
+                return
+        raise AUTOExceptions.AUTORuntimeError("Point not found.")
+
+class SolutionTail(object):
+    """Follow the solution file filename while AUTO writes it (usually
+    fort.8): read() returns AUTOSolution objects for the solutions that
+    were written completely since the last call of read()."""
+    def __init__(self, filename):
+        self.filename = filename
+        self.__tail = _Tail(filename)
+        self.__lines = []
+        # file offset of self.__lines and of the ends of all solutions
+        self.__offset = 0
+        self.__ends = []
+
+    def read(self):
+        lines = self.__lines
+        lines.extend(self.__tail.lines())
+        solutions = []
+        while lines != []:
+            header = lines[0].split()
+            if header == []:
+                self.__offset = self.__offset + len(lines[0])
+                del lines[0]
+                continue
+            # the header line is followed by NROWPR lines
+            end = int(header[8]) + 1
+            if len(lines) < end:
+                break
+            data = "".encode("ascii").join(lines[:end])
+            inputfile = BytesIO(data)
+            inputfile.name = self.filename
+            del lines[:end]
+            self.__offset = self.__offset + len(data)
+            self.__ends.append(self.__offset)
+            input = parseS.fileS(inputfile, scan=False)
+            input.inmemory = True
+            for solution in input.entries():
+                solutions.append(parseS.AUTOSolution(input.view(solution),
+                                                     0, input.name))
+        return solutions
+
+    def truncate(self, count=None):
+        """Read the rest of the file and cut off an incomplete last
+        solution, e.g. after AUTO was stopped while writing it, or keep
+        only the first count solutions"""
+        self.read()
+        if count is None or count >= len(self.__ends):
+            self.__tail.truncate(self.__offset)
+        elif count == 0:
+            self.__tail.truncate(0)
+        else:
+            self.__tail.truncate(self.__ends[count-1])
+
+class DiagramTail(object):
+    """Follow the bifurcation diagram and solution files fort7_filename
+    and fort8_filename while AUTO writes them: read() returns a
+    bifurcation diagram, and extends it in place with the branches,
+    points and solutions that were written since the last call of
+    read(), so that every call only reads the new parts of the files."""
+    def __init__(self, fort7_filename="fort.7", fort8_filename="fort.8",
+                 constants=None):
+        self.diagram = bifDiag.bifDiag()
+        self.constants = constants
+        self.__tail = _Tail(fort7_filename)
+        self.__solutions = SolutionTail(fort8_filename)
+        # header lines of a branch whose first point is not written yet
+        self.__headerlist = []
+        # labels (branch, index, information) and solutions that were
+        # not matched yet
+        self.__labels = []
+        self.__pending = []
+
+    def __branches(self, lines):
+        # extend the last branch and add new branches from lines
+        diagram = self.diagram
+        branches = parseB.parseBR()
+        branches.read(StringIO("".join(lines)))
+        new = []
+        for branch in branches:
+            branch = bifDiag.bifDiagBranch(branch)
+            if branch.c is None and len(diagram) > 0:
+                if new == [] and branch.BR == diagram[-1].BR:
+                    # the points continue the last branch
+                    last = diagram[-1]
+                    n = len(last)
+                    last._extend(branch)
+                    new.append((last, n))
+                    continue
+                branch.c = diagram[-1].c
+                branch.TY = diagram[-1].TY
+            diagram.append(branch)
+            new.append((branch, 0))
+        for branch, n in new:
+            for idx in branch.labels.getIndices():
+                if idx < n:
+                    continue
+                x = branch._gettypelabel(idx)[1]
+                if x.get("LAB",0) != 0:
+                    self.__labels.append((branch, idx, x))
+
+    def read(self):
+        lines = self.__headerlist + [_str(line)
+                                     for line in self.__tail.lines()]
+        # header lines at the end wait for the first point of their branch
+        end = len(lines)
+        while end > 0 and lines[end-1].split(None, 1)[:1] in (["0"], []):
+            end = end - 1
+        self.__headerlist = lines[end:]
+        if end > 0:
+            self.__branches(lines[:end])
+        self.__pending.extend(self.__solutions.read())
+        while self.__labels != [] and self.__pending != []:
+            branch, idx, x = self.__labels.pop(0)
+            constants = self.constants
+            if constants is None:
+                constants = branch.c
+            constants = parseC.parseC(constants)
+            for k in constants:
+                if k in bifDiag.bifDiag.nonekeys:
+                    constants[k] = None
+            s = x["solution"] = parseS.AUTOSolution(self.__pending.pop(0),
+                                                    constants=constants)
+            branch.labelchanges = branch.labelchanges + 1
+            if branch.coordnames != []:
+                s.b = branch[idx]
+        return self.diagram
+
+def test():
+    print("Testing iter_points")
+    branches = parseB.parseBR("test_data/fort.7")
+    points = list(iter_points("test_data/fort.7"))
+    if len(points) != sum([len(branch) for branch in branches]):
+        raise AUTOExceptions.AUTORegressionError("Number of points incorrect")
+    i = 0
+    for branch in branches:
+        for j in range(len(branch)):
+            point = points[i]
+            p = branch[j]
+            if (point.BR != branch.BR or point.TY != p["TY name"] or
+                point.LAB != p["LAB"] or list(point.data) != p["data"] or
+                point.branch.coordnames != branch.coordnames):
+                raise AUTOExceptions.AUTORegressionError("Point incorrect")
+            i = i + 1
+    labels = [point.LAB for point in points if point.LAB != 0]
+    if labels != branches.getLabels():
+        raise AUTOExceptions.AUTORegressionError("Labels incorrect")
+
+    print("Testing iter_solutions")
+    solutions = parseS.parseS("test_data/fort.8")
+    i = 0
+    for solution in iter_solutions("test_data/fort.8"):
+        other = solutions[i]
+        for key in ["BR", "PT", "TY", "LAB", "NTST"]:
+            if solution[key] != other[key]:
+                raise AUTOExceptions.AUTORegressionError("Header incorrect")
+        if (list(solution.indepvararray) != list(other.indepvararray) or
+            list(solution.coordarray[0]) != list(other.coordarray[0]) or
+            list(solution.PAR) != list(other.PAR)):
+            raise AUTOExceptions.AUTORegressionError("Solution incorrect")
+        i = i + 1
+    if i != len(solutions):
+        raise AUTOExceptions.AUTORegressionError("Number of solutions incorrect")
+    # solutions that are not used while iterating can still be read later,
+    # also from a file that is not read into memory
+    import shutil, tempfile
+    tmpdir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmpdir, "s.test")
+        shutil.copy("test_data/fort.8", filename)
+        for name in ["test_data/fort.8", filename]:
+            unread = list(iter_solutions(name))
+            if (list(unread[3].coordarray[1]) !=
+                list(solutions[3].coordarray[1])):
+                raise AUTOExceptions.AUTORegressionError("Solution incorrect")
+            del unread
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print("Testing PointTail and SolutionTail")
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for name, Tail in [("fort.7", PointTail), ("fort.8", SolutionTail)]:
+            data = open(os.path.join("test_data", name), "rb").read()
+            filename = os.path.join(tmpdir, name)
+            tail = Tail(filename)
+            if tail.read() != []:
+                raise AUTOExceptions.AUTORegressionError("Tail incorrect")
+            items = []
+            output = open(filename, "wb")
+            # write the file in pieces that end in the middle of lines
+            for start in range(0, len(data), 997):
+                output.write(data[start:start+997])
+                output.flush()
+                items.extend(tail.read())
+            output.close()
+            if name == "fort.7":
+                if ([(p.BR, p.PT, p.LAB, list(p.data)) for p in items] !=
+                    [(p.BR, p.PT, p.LAB, list(p.data)) for p in points]):
+                    raise AUTOExceptions.AUTORegressionError(
+                        "PointTail incorrect")
+            elif ([(s["LAB"], list(s.coordarray[0]), list(s.PAR))
+                   for s in items] !=
+                  [(s["LAB"], list(s.coordarray[0]), list(s.PAR))
+                   for s in solutions]):
+                raise AUTOExceptions.AUTORegressionError(
+                    "SolutionTail incorrect")
+
+        # stopping: cut off the files after a point or solution
+        filename = os.path.join(tmpdir, "fort.7")
+        tail = PointTail(filename)
+        items = tail.read()
+        tail.truncate(items[20])
+        cut = list(iter_points(filename))
+        if ([(p.BR, p.PT, list(p.data)) for p in cut] !=
+            [(p.BR, p.PT, list(p.data)) for p in points[:21]] or
+            cut[20][cut[20].branch.coordnames[0]] != cut[20].data[0] or
+            cut[20][0] != cut[20].BR):
+            raise AUTOExceptions.AUTORegressionError("PointTail incorrect")
+        filename = os.path.join(tmpdir, "fort.8")
+        data = open(filename, "rb").read()
+        tail = SolutionTail(filename)
+        tail.truncate(3)
+        if [s["LAB"] for s in iter_solutions(filename)] != [6, 7, 8]:
+            raise AUTOExceptions.AUTORegressionError(
+                "SolutionTail incorrect")
+        output = open(filename, "wb")
+        output.write(data[:len(data)//2])
+        output.close()
+        tail = SolutionTail(filename)
+        tail.truncate()
+        cut = list(iter_solutions(filename))
+        if (len(cut) == 0 or len(cut) >= len(solutions) or
+            list(cut[-1].coordarray[0]) !=
+            list(solutions[len(cut)-1].coordarray[0])):
+            raise AUTOExceptions.AUTORegressionError(
+                "SolutionTail incorrect")
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print("Testing DiagramTail")
+    diagram = bifDiag.bifDiag("test_data/fort.7", "test_data/fort.8")
+    tmpdir = tempfile.mkdtemp()
+    try:
+        data7 = open(os.path.join("test_data", "fort.7"), "rb").read()
+        data8 = open(os.path.join("test_data", "fort.8"), "rb").read()
+        fort7 = os.path.join(tmpdir, "fort.7")
+        fort8 = os.path.join(tmpdir, "fort.8")
+        for parse in [False, True]:
+            output7, output8 = open(fort7, "wb"), open(fort8, "wb")
+            tail = DiagramTail(fort7, fort8)
+            bd = tail.read()
+            step7, step8 = len(data7)//7 + 1, len(data8)//7 + 1
+            for i in range(7):
+                output7.write(data7[i*step7:(i+1)*step7])
+                output8.write(data8[i*step8:(i+1)*step8])
+                output7.flush()
+                output8.flush()
+                if tail.read() is not bd:
+                    raise AUTOExceptions.AUTORegressionError(
+                        "DiagramTail not extended in place")
+                if parse:
+                    # extend parsed branches
+                    for branch in bd:
+                        branch.coordarray
+            output7.close()
+            output8.close()
+            if (len(bd) != len(diagram) or
+                bd.getLabels() != diagram.getLabels() or
+                bd.getLabels() != [s["LAB"] for s in bd()]):
+                raise AUTOExceptions.AUTORegressionError(
+                    "DiagramTail incorrect")
+            for branch, other in zip(bd, diagram):
+                if (len(branch) != len(other) or
+                    branch.toArray() != other.toArray() or
+                    branch.stability() != other.stability() or
+                    branch.c != other.c):
+                    raise AUTOExceptions.AUTORegressionError(
+                        "DiagramTail incorrect")
+            for s, other in zip(bd(), diagram()):
+                if (s["PT"] != other["PT"] or
+                    list(s.coordarray[0]) != list(other.coordarray[0]) or
+                    s.b["LAB"] != other.b["LAB"]):
+                    raise AUTOExceptions.AUTORegressionError(
+                        "DiagramTail solutions incorrect")
+    finally:
+        shutil.rmtree(tmpdir)
+    print("stream passed all tests")
+
+if __name__ == '__main__' :
+    test()
@@ -0,0 +1,461 @@
+#! /usr/bin/env python
+# This is a class for equations given symbolically, as Python expressions
+# for the right hand sides in terms of named state variables and
+# parameters, such as "sigma*(y-x)". It writes an equation file with FUNC
+# and STPNT, where FUNC also gives the Jacobian DFDU and the parameter
+# derivatives DFDP, so that AUTO can be run with JAC=1 instead of
+# approximating the Jacobian by differencing, which costs 2*NDIM
+# evaluations of the right hand side every time.
+#
+# The derivatives are computed in forward mode: every operation of an
+# expression becomes an assignment to a temporary T(k), followed by the
+# assignments for the derivatives of that temporary with respect to the
+# variables and parameters it depends on. Derivatives that are always zero
+# are left out, so the work is proportional to the number of operations
+# times the number of variables that each one depends on.
+
+import ast
+import math
+import os
+import sys
+from auto import AUTOExceptions
+
+# functions of one argument, with their derivatives in terms of the
+# argument x and the value y
+functions = {
+    "sin": "COS(%(x)s)",
+    "cos": "-SIN(%(x)s)",
+    "tan": "1d0+%(y)s**2",
+    "exp": "%(y)s",
+    "log": "1d0/%(x)s",
+    "sqrt": "0.5d0/%(y)s",
+    "sinh": "COSH(%(x)s)",
+    "cosh": "SINH(%(x)s)",
+    "tanh": "1d0-%(y)s**2",
+    "asin": "1d0/SQRT(1d0-%(x)s**2)",
+    "acos": "-1d0/SQRT(1d0-%(x)s**2)",
+    "atan": "1d0/(1d0+%(x)s**2)",
+    "abs": "SIGN(1d0,%(x)s)",
+}
+
+constants = {"pi": math.pi}
+
+def fortran_number(x):
+    """Return the double precision Fortran literal for the number x"""
+    s = repr(float(x))
+    if "e" in s:
+        return s.replace("e", "d")
+    return s + "d0"
+
+def names(names):
+    """Return a dictionary that maps indices to names for a list of names
+    (with indices 1, 2, ...) or such a dictionary"""
+    if names is None:
+        return {}
+    if isinstance(names, dict):
+        return dict(names)
+    return dict([(i+1, name) for i, name in enumerate(names)])
+
+class Model(object):
+    def __init__(self,rhs,unames,parnames=None,U=None,PAR=None):
+        """rhs holds the right hand sides as Python expressions: a list
+        in the order of the state variables, or a dictionary that maps
+        the names of the state variables to expressions. unames and
+        parnames are the names of the state variables and parameters:
+        lists, or dictionaries that map indices to names as the AUTO
+        constants unames and parnames. U and PAR are dictionaries that
+        map names or indices to starting values, which are 0 otherwise."""
+        self.unames = names(unames)
+        self.parnames = names(parnames)
+        self.NDIM = len(self.unames)
+        if sorted(self.unames) != list(range(1, self.NDIM+1)):
+            raise AUTOExceptions.AUTORuntimeError(
+                "The state variables must have indices 1 to %d."%self.NDIM)
+        if isinstance(rhs, dict):
+            try:
+                rhs = [rhs[self.unames[i]] for i in range(1, self.NDIM+1)]
+            except KeyError:
+                raise AUTOExceptions.AUTORuntimeError(
+                    "No right hand side for %s."%sys.exc_info()[1])
+        if len(rhs) != self.NDIM:
+            raise AUTOExceptions.AUTORuntimeError(
+                "%d right hand sides for %d state variables."%(
+                    len(rhs), self.NDIM))
+        self.rhs = list(rhs)
+        self.U = self.__values(U, self.unames)
+        self.PAR = self.__values(PAR, self.parnames)
+
+    def __values(self,values,names):
+        index = dict([(name, i) for i, name in names.items()])
+        d = {}
+        for key, value in (values or {}).items():
+            if key in index:
+                key = index[key]
+            elif not isinstance(key, int):
+                raise AUTOExceptions.AUTORuntimeError(
+                    "Unknown name %s."%key)
+            d[key] = value
+        return d
+
+    def __str__(self):
+        return self.code()
+
+    def code(self):
+        """Return the Fortran code of the equation file"""
+        differentiator = _Differentiator(self.unames, self.parnames)
+        rhs = [differentiator.differentiate(expr) for expr in self.rhs]
+        lines = [
+            "!" + 70*"-",
+            "!" + 70*"-",
+            "!   Equations written by the AUTO model command",
+            "!" + 70*"-",
+            "!" + 70*"-",
+            "",
+            "      SUBROUTINE FUNC(NDIM,U,ICP,PAR,IJAC,F,DFDU,DFDP)",
+            "!     ---------- ----",
+            "",
+            "      IMPLICIT NONE",
+            "      INTEGER, INTENT(IN) :: NDIM, ICP(*), IJAC",
+            "      DOUBLE PRECISION, INTENT(IN) :: U(NDIM), PAR(*)",
+            "      DOUBLE PRECISION, INTENT(OUT) :: F(NDIM)",
+            "      DOUBLE PRECISION, INTENT(INOUT) :: "
+            "DFDU(NDIM,NDIM), DFDP(NDIM,*)",
+            "      DOUBLE PRECISION T(%d)"%max(differentiator.count, 1),
+            ""]
+        for i in sorted(self.unames):
+            lines.append("! U(%d): %s"%(i, self.unames[i]))
+        for i in sorted(self.parnames):
+            lines.append("! PAR(%d): %s"%(i, self.parnames[i]))
+        lines.append("")
+        lines.extend(differentiator.statements["value"])
+        for i, (value, derivs) in enumerate(rhs):
+            lines.append("       F(%d)=%s"%(i+1, value))
+        lines.extend(["", "       IF(IJAC.EQ.0)RETURN", ""])
+        lines.extend(differentiator.statements["factor"])
+        lines.extend(differentiator.statements["U"])
+        lines.append("       DFDU(:,:)=0d0")
+        for i, (value, derivs) in enumerate(rhs):
+            for kind, j in sorted(derivs):
+                if kind == "U":
+                    lines.append("       DFDU(%d,%d)=%s"%(
+                        i+1, j, derivs[kind, j]))
+        lines.extend(["", "      IF(IJAC.EQ.1)RETURN", ""])
+        lines.extend(differentiator.statements["PAR"])
+        for j in sorted(self.parnames):
+            lines.append("       DFDP(:,%d)=0d0"%j)
+        for i, (value, derivs) in enumerate(rhs):
+            for kind, j in sorted(derivs):
+                if kind == "PAR":
+                    lines.append("       DFDP(%d,%d)=%s"%(
+                        i+1, j, derivs[kind, j]))
+        lines.extend([
+            "",
+            "      END SUBROUTINE FUNC",
+            "",
+            "      SUBROUTINE STPNT(NDIM,U,PAR,T)",
+            "!     ---------- -----",
+            "",
+            "      IMPLICIT NONE",
+            "      INTEGER, INTENT(IN) :: NDIM",
+            "      DOUBLE PRECISION, INTENT(INOUT) :: U(NDIM),PAR(*)",
+            "      DOUBLE PRECISION, INTENT(IN) :: T",
+            ""])
+        for i in sorted(set(self.parnames) | set(self.PAR)):
+            lines.append("       PAR(%d)=%s"%(
+                i, fortran_number(self.PAR.get(i, 0))))
+        lines.append("")
+        for i in sorted(self.unames):
+            lines.append("       U(%d)=%s"%(
+                i, fortran_number(self.U.get(i, 0))))
+        lines.extend([
+            "",
+            "      END SUBROUTINE STPNT",
+            "",
+            "      SUBROUTINE BCND",
+            "      END SUBROUTINE BCND",
+            "",
+            "      SUBROUTINE ICND",
+            "      END SUBROUTINE ICND",
+            "",
+            "      SUBROUTINE FOPT",
+            "      END SUBROUTINE FOPT",
+            "",
+            "      SUBROUTINE PVLS",
+            "      END SUBROUTINE PVLS",
+            ""])
+        return "\n".join(lines)
+
+    def write(self,output):
+        output.write(self.code())
+
+    def writeFilename(self,filename):
+        # an unchanged file is not written again, so that it is not
+        # compiled again either
+        code = self.code()
+        if os.path.exists(filename):
+            input = open(filename, "r")
+            old = input.read()
+            input.close()
+            if old == code:
+                return
+        output = open(filename, "w")
+        output.write(code)
+        output.close()
+
+    def constants(self):
+        """Return the AUTO constants for these equations"""
+        return {"NDIM": self.NDIM, "JAC": 1, "unames": self.unames,
+                "parnames": self.parnames}
+
+class _Differentiator(object):
+    # Turns expressions into Fortran statements for their values and
+    # derivatives. Values and derivatives are atoms: numbers, U(i),
+    # PAR(i), or temporaries T(k). Derivatives are stored in dictionaries
+    # that map ("U", i) or ("PAR", i) to atoms, without zero entries.
+    def __init__(self,unames,parnames):
+        self.names = {}
+        for i, name in parnames.items():
+            self.names[name] = ("PAR", i)
+        for i, name in unames.items():
+            self.names[name] = ("U", i)
+        self.count = 0
+        # statements for the values, for factors that are only needed for
+        # derivatives, and for derivatives with respect to U and PAR
+        self.statements = {"value": [], "factor": [], "U": [], "PAR": []}
+
+    def differentiate(self,expr):
+        """Return the value and derivatives of the expression expr"""
+        try:
+            node = ast.parse(expr.strip(), mode="eval").body
+        except SyntaxError:
+            raise AUTOExceptions.AUTORuntimeError(
+                "Invalid expression %s: %s"%(expr, sys.exc_info()[1]))
+        return self.visit(node)
+
+    def atom(self,code,kind):
+        if (code.replace(".", "").isalnum() or
+            (code[0].isalpha() and code[-1] == ")" and
+             code[code.index("(")+1:-1].isdigit())):
+            return code
+        self.count = self.count + 1
+        t = "T(%d)"%self.count
+        self.statements[kind].append("       %s=%s"%(t, code))
+        return t
+
+    def times(self,a,b,key):
+        if a == "1d0":
+            return b
+        if b == "1d0":
+            return a
+        return self.atom("%s*%s"%(a, b), key[0])
+
+    def combine(self,da,db,sign,key):
+        # da + sign*db, either of which may be missing
+        if db is None:
+            return da
+        if da is None:
+            if sign > 0:
+                return db
+            return self.atom("-%s"%db, key[0])
+        return self.atom("%s%s%s"%(da, "+-"[sign < 0], db), key[0])
+
+    def visit(self,node):
+        if isinstance(node, ast.BinOp):
+            return self.binop(node)
+        if isinstance(node, ast.UnaryOp):
+            value, derivs = self.visit(node.operand)
+            if isinstance(node.op, ast.UAdd):
+                return value, derivs
+            if isinstance(node.op, ast.USub):
+                for key in sorted(derivs):
+                    derivs[key] = self.atom("-%s"%derivs[key], key[0])
+                return self.atom("-%s"%value, "value"), derivs
+        if isinstance(node, ast.Call):
+            return self.call(node)
+        if isinstance(node, ast.Name):
+            if node.id in self.names:
+                key = self.names[node.id]
+                return "%s(%d)"%key, {key: "1d0"}
+            if node.id in constants:
+                return fortran_number(constants[node.id]), {}
+            raise AUTOExceptions.AUTORuntimeError(
+                "Unknown name %s."%node.id)
+        value = self.constant(node)
+        if value is not None:
+            return fortran_number(value), {}
+        raise AUTOExceptions.AUTORuntimeError(
+            "Unsupported expression %s."%ast.dump(node))
+
+    def constant(self,node):
+        # the value of a number, or None
+        if hasattr(ast, "Constant") and isinstance(node, ast.Constant):
+            value = node.value
+        elif isinstance(node, getattr(ast, "Num", ())):
+            value = node.n
+        else:
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        return value
+
+    def binop(self,node):
+        a, da = self.visit(node.left)
+        if isinstance(node.op, ast.Pow):
+            n = self.constant(node.right)
+            if n is None and isinstance(node.right, ast.UnaryOp):
+                n = self.constant(node.right.operand)
+                if n is not None and isinstance(node.right.op, ast.USub):
+                    n = -n
+            if n is not None and n == int(n):
+                # integer powers also work for negative numbers
+                n = int(n)
+                if n < 0:
+                    value = self.atom("%s**(%d)"%(a, n), "value")
+                else:
+                    value = self.atom("%s**%d"%(a, n), "value")
+                derivs = {}
+                # x**0 is constant: its derivative 0*x**(-1) would be NaN
+                # at x=0
+                if da and n != 0:
+                    if n == 1:
+                        factor = "1d0"
+                    elif n == 2:
+                        factor = self.atom("2d0*%s"%a, "factor")
+                    else:
+                        factor = self.atom("%s*%s**(%d)"%(
+                            fortran_number(n), a, n-1), "factor")
+                    for key in sorted(da):
+                        derivs[key] = self.times(factor, da[key], key)
+                return value, derivs
+        b, db = self.visit(node.right)
+        derivs = {}
+        keys = sorted(set(da) | set(db))
+        if isinstance(node.op, (ast.Add, ast.Sub)):
+            op = "+"
+            sign = 1
+            if isinstance(node.op, ast.Sub):
+                op = "-"
+                sign = -1
+            value = self.atom("%s%s%s"%(a, op, b), "value")
+            for key in keys:
+                derivs[key] = self.combine(da.get(key), db.get(key),
+                                           sign, key)
+        elif isinstance(node.op, ast.Mult):
+            value = self.atom("%s*%s"%(a, b), "value")
+            for key in keys:
+                dab = dba = None
+                if key in da:
+                    dab = self.times(da[key], b, key)
+                if key in db:
+                    dba = self.times(a, db[key], key)
+                derivs[key] = self.combine(dab, dba, 1, key)
+        elif isinstance(node.op, ast.Div):
+            value = self.atom("%s/%s"%(a, b), "value")
+            for key in keys:
+                # (da - value*db)/b
+                dvb = None
+                if key in db:
+                    dvb = self.times(value, db[key], key)
+                d = self.combine(da.get(key), dvb, -1, key)
+                derivs[key] = self.atom("%s/%s"%(d, b), key[0])
+        elif isinstance(node.op, ast.Pow):
+            value = self.atom("%s**%s"%(a, b), "value")
+            if da:
+                factor = self.atom("%s*%s**(%s-1d0)"%(b, a, b), "factor")
+            if db:
+                logfactor = self.atom("LOG(%s)*%s"%(a, value), "factor")
+            for key in keys:
+                d1 = d2 = None
+                if key in da:
+                    d1 = self.times(factor, da[key], key)
+                if key in db:
+                    d2 = self.times(logfactor, db[key], key)
+                derivs[key] = self.combine(d1, d2, 1, key)
+        else:
+            raise AUTOExceptions.AUTORuntimeError(
+                "Unsupported operator %s."%node.op.__class__.__name__)
+        return value, derivs
+
+    def call(self,node):
+        name = getattr(node.func, "id", None)
+        if name not in functions or len(node.args) != 1:
+            raise AUTOExceptions.AUTORuntimeError(
+                "Unsupported function %s."%name)
+        x, dx = self.visit(node.args[0])
+        value = self.atom("%s(%s)"%(name.upper(), x), "value")
+        derivs = {}
+        if dx:
+            factor = self.atom(functions[name]%{"x": x, "y": value},
+                               "factor")
+            for key in sorted(dx):
+                derivs[key] = self.times(factor, dx[key], key)
+        return value, derivs
+
+def test():
+    print("Testing symbolic models")
+    model = Model(["sigma*(y-x)", "rho*x - y - x*z", "x*y - beta*z"],
+                  ["x", "y", "z"], ["rho", "beta", "sigma"],
+                  PAR={"beta": 8/3.0, "sigma": 10})
+    code = model.code()
+    for line in ["       F(1)=T(3)", "       DFDU(1,1)=T(4)",
+                 "       DFDU(1,2)=PAR(3)", "       DFDU(3,3)=T(16)",
+                 "       DFDP(2,1)=U(1)", "       PAR(3)=10.0d0"]:
+        if line not in code.split("\n"):
+            raise AUTOExceptions.AUTORegressionError(
+                "Model code incorrect: %s"%line)
+    if "DFDU(1,3)" in code or model.constants()["JAC"] != 1:
+        raise AUTOExceptions.AUTORegressionError("Model code incorrect")
+
+    # evaluate the generated statements in Python and compare the
+    # derivatives with differences
+    import re
+    def python(code):
+        code = re.sub(r"\b(T|U|PAR)\((\d+)\)", r"\1[\2]", code)
+        return code.replace("d0", "")
+    rhs = ["exp(-x)*sin(a*y)/(1+x**2) - sqrt(y)**3",
+           "a**x + x**-2 - abs(log(y))*tanh(x/a) + pi"]
+    model = Model(rhs, ["x", "y"], ["a"])
+    d = _Differentiator(model.unames, model.parnames)
+    values = [d.differentiate(expr) for expr in rhs]
+    point = {"x": 0.7, "y": 1.3, "a": 0.4}
+    env = {"U": {1: point["x"], 2: point["y"]}, "PAR": {1: point["a"]},
+           "T": {}}
+    for name in functions:
+        env[name.upper()] = getattr(math, name, abs)
+    env["SIGN"] = math.copysign
+    for kind in ["value", "factor", "U", "PAR"]:
+        for statement in d.statements[kind]:
+            target, expr = statement.strip().split("=", 1)
+            exec("%s = %s"%(python(target), python(expr)), env)
+    def f(i, **kw):
+        p = point.copy()
+        p.update(kw)
+        p.update(math.__dict__)
+        p["abs"] = abs
+        return eval(rhs[i], p)
+    for i, (value, derivs) in enumerate(values):
+        if abs(eval(python(value), env) - f(i)) > 1e-12:
+            raise AUTOExceptions.AUTORegressionError("Model value incorrect")
+        for name, key in [("x", ("U", 1)), ("y", ("U", 2)),
+                          ("a", ("PAR", 1))]:
+            h = 1e-6
+            diff = (f(i, **{name: point[name]+h}) -
+                    f(i, **{name: point[name]-h}))/(2*h)
+            deriv = eval(python(derivs[key]), env)
+            if abs(deriv - diff) > 1e-6*(1+abs(diff)):
+                raise AUTOExceptions.AUTORegressionError(
+                    "Model derivative incorrect")
+    d = _Differentiator({1: "x"}, {})
+    if d.differentiate("x**0")[1] or d.differentiate("(2*x)**0")[1]:
+        raise AUTOExceptions.AUTORegressionError(
+            "Model derivative of x**0 incorrect")
+    try:
+        Model(["foo(x)"], ["x"]).code()
+    except AUTOExceptions.AUTORuntimeError:
+        pass
+    else:
+        raise AUTOExceptions.AUTORegressionError("Model error missing")
+    print("symbolic passed all tests")
+
+if __name__ == '__main__' :
+    test()
@@ -1,9 +1,13 @@
 #! /usr/bin/env python
+import sys
 from auto import AUTOExceptions
 
 modules = ["parseB", "parseS", "parseBandS", "parseC", "parseH",
            "AUTOclui", "interactiveBindings", "AUTOCommands",
-           "parseD", "bifDiag", "runDemo", "runAUTO"]
+           "parseD", "bifDiag", "stream", "parseSweep", "symbolic",
+           "runDemo", "runAUTO"]
+if sys.version_info >= (3, 5):
+    modules.append("runAsync")
 
 regressions = []
 for module in modules:
@@ -13,7 +13,7 @@ MODULE AUTO_CONSTANTS
   INTEGER NMX
   DOUBLE PRECISION RL0,RL1,A0,A1
   INTEGER NPR,MXBF,IIS,IID,ITMX,ITNW,NWTN,JAC
-  DOUBLE PRECISION EPSL,EPSU,EPSS
+  DOUBLE PRECISION EPSL,EPSU,EPSS,CHORD
   DOUBLE PRECISION DS,DSMIN,DSMAX
   INTEGER IADS,NPAR,IBR,LAB
   TYPE INDEXVAR
@@ -56,12 +56,12 @@ MODULE AUTO_CONSTANTS
   !   (NIAP should be even;  make the structure length a multiple of its
   !    largest element)
   INTEGER, PARAMETER :: NIAP = 36
-  INTEGER, PARAMETER :: NRAP = 16
+  INTEGER, PARAMETER :: NRAP = 17
   TYPE AUTOPARAMETERS
      SEQUENCE
 
      DOUBLE PRECISION DS, DSMIN, DSMAX, RDS, RL0, RL1, A0, A1
-     DOUBLE PRECISION EPSL, EPSU, EPSS
+     DOUBLE PRECISION EPSL, EPSU, EPSS, CHORD
 
      DOUBLE PRECISION DET, FLDF, HBFF, BIFF, SPBF
 
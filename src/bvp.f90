@@ -580,8 +580,9 @@ CONTAINS
     INTEGER IAM, KWT, NA, NTSTNA, STATE
     INTEGER, PARAMETER :: NEWTON_CYCLE=0, NEWTON_EXIT=1
     INTEGER, PARAMETER :: NEWTON_CONVERGED=2, NEWTON_CONVERGED_FLDF=3
+    INTEGER, PARAMETER :: NEWTON_REFACTOR=4
     INTEGER, ALLOCATABLE :: NP(:)
-    DOUBLE PRECISION EPSL,EPSU,DELREF,DELMAX,ADRL,ADU,AU,DET,SS
+    DOUBLE PRECISION EPSL,EPSU,CHORD,DELREF,DELMAX,DELOLD,ADRL,ADU,AU,DET,SS
     DOUBLE PRECISION DUMX,RDRL,RDUMX,UMX,RDSZ,UMXDUMX(2)
     DOUBLE PRECISION, ALLOCATABLE :: DUPS(:,:),DRL(:),P0T(:),P1T(:)
     LOGICAL DONE
@@ -598,6 +599,7 @@ CONTAINS
 
     EPSL=AP%EPSL
     EPSU=AP%EPSU
+    CHORD=AP%CHORD
 
     IAM=MPIIAM()
     KWT=MPIKWT()
@@ -630,13 +632,19 @@ CONTAINS
     CONVERGED=.FALSE.
     STATE=NEWTON_CYCLE
     DELREF=0
+    DELOLD=0
     DO NIT1=1,ITNW
 
        NITPS=NIT1
        NLLV=0
 
+! After NWTN iterations the factorization of the Jacobian is reused
+! (chord method), unless the last correction was not at least CHORD
+! times smaller than the one before.
+
        IFST=0
-       IF(NITPS.LE.NWTN)IFST=1
+       IF(NITPS.LE.NWTN.OR.STATE==NEWTON_REFACTOR)IFST=1
+       STATE=NEWTON_CYCLE
 
        CALL SOLVBV(IFST,AP,DET,PAR,ICP,FUNI,BCNI,ICNI,RDS,NLLV, &
             RLCUR,RLOLD,RLDOT,NDIM,UPS,UOLDPS,UDOTPS,UPOLDP,DTM,DUPS,DRL, &
@@ -693,11 +701,16 @@ CONTAINS
              ENDIF
           ELSEIF(NITPS.EQ.1)THEN
              DELREF=20*DMAX1(RDRL,RDUMX)
+             DELOLD=DMAX1(RDRL,RDUMX)
           ELSE
              DELMAX=DMAX1(RDRL,RDUMX)
              IF(DELMAX.GT.DELREF)THEN
                 STATE=NEWTON_EXIT
+             ELSEIF(CHORD.GT.0.d0.AND.NITPS.GT.NWTN.AND. &
+                  DELMAX.GT.CHORD*DELOLD)THEN
+                STATE=NEWTON_REFACTOR
              ENDIF
+             DELOLD=DELMAX
           ENDIF
        ENDIF
 
@@ -13,6 +13,7 @@
       PRIVATE
 
       PUBLIC :: FUNI,BCNI,ICNI,PVLSI ! Interface subroutines
+      PUBLIC :: FUNIRESET
 
       PUBLIC :: FUNC,STPNT,BCND,ICND,PVLS ! User subroutines
 
@@ -54,6 +55,13 @@
 
       DOUBLE PRECISION, PARAMETER :: HMACH=1.0d-7
 
+! For JAC=2: the sparsity pattern of the Jacobian of FUNC, and the groups
+! (colors) of columns without common nonzero rows, which are differenced
+! together (Curtis, Powell and Reid).
+      LOGICAL, ALLOCATABLE, SAVE :: PATTERN(:,:)
+      INTEGER, ALLOCATABLE, SAVE :: COLORS(:)
+      INTEGER, SAVE :: NCOLORS=0
+
       CONTAINS
 
 !     ---------- ----
@@ -79,7 +87,21 @@
 ! if the user specified the Jacobian but not the
 ! parameter derivatives we do not generate the Jacobian here
 
-       IF(JAC.EQ.0.AND.IJAC.NE.0)THEN
+       IF(JAC.EQ.2.AND.IJAC.NE.0)THEN
+
+! Generate the Jacobian by differencing groups of columns.
+
+!$OMP CRITICAL(FUNI_PATTERN)
+         IF(.NOT.ALLOCATED(COLORS))THEN
+           CALL FUNIPATTERN(AP,NDIM,U,ICP,PAR,F,DFDU,DFDP)
+         ELSEIF(SIZE(COLORS)/=NDIM)THEN
+           CALL FUNIPATTERN(AP,NDIM,U,ICP,PAR,F,DFDU,DFDP)
+         ENDIF
+!$OMP END CRITICAL(FUNI_PATTERN)
+         CALL FUNIGROUPS(NDIM,U,ICP,PAR,F,DFDU,DFDP)
+         JAC=0
+
+       ELSEIF(JAC.EQ.0.AND.IJAC.NE.0)THEN
 
 ! Generate the Jacobian by differencing.
 
@@ -137,6 +159,130 @@
 
       END SUBROUTINE FUNI
 
+!     ---------- ---------
+      SUBROUTINE FUNIRESET()
+
+! Forget the sparsity pattern of JAC=2, so that the next job, which may
+! start at another point, finds it again.
+
+       IF(ALLOCATED(PATTERN))DEALLOCATE(PATTERN,COLORS)
+       NCOLORS=0
+
+      END SUBROUTINE FUNIRESET
+
+!     ---------- -----------
+      SUBROUTINE FUNIPATTERN(AP,NDIM,U,ICP,PAR,F,DFDU,DFDP)
+
+! Find the sparsity pattern of the Jacobian of FUNC, and color its columns.
+! The pattern is found at a point near (U,PAR), with all state variables
+! and parameters perturbed, so that terms such as PAR(k)*U(i) are not
+! missed if PAR(k) or U(i) happens to be zero; a change that is not a
+! number also counts as a nonzero.
+
+      TYPE(AUTOPARAMETERS), INTENT(IN) :: AP
+      INTEGER, INTENT(IN) :: ICP(*),NDIM
+      DOUBLE PRECISION, INTENT(IN) :: U(NDIM),PAR(*)
+      DOUBLE PRECISION, INTENT(OUT) :: F(NDIM)
+      DOUBLE PRECISION, INTENT(INOUT) :: DFDU(NDIM,NDIM),DFDP(NDIM,*)
+
+      INTEGER I,J,SEED
+      LOGICAL USED(NDIM)
+      DOUBLE PRECISION V(NDIM),PP(AP%NPAR),FV(NDIM),VV
+
+       IF(ALLOCATED(PATTERN))DEALLOCATE(PATTERN,COLORS)
+       ALLOCATE(PATTERN(NDIM,NDIM),COLORS(NDIM))
+
+! Perturb by 1 to 2 percent, in a fixed pseudo-random way.
+
+       SEED=12345
+       DO I=1,NDIM
+         SEED=MOD(SEED*1103+12345,65536)
+         V(I)=U(I)+(1+ABS(U(I)))*(1+SEED/65536d0)*1d-2
+       ENDDO
+       DO I=1,AP%NPAR
+         SEED=MOD(SEED*1103+12345,65536)
+         PP(I)=PAR(I)+(1+ABS(PAR(I)))*(1+SEED/65536d0)*1d-2
+       ENDDO
+
+       CALL FUNC(NDIM,V,ICP,PP,0,FV,DFDU,DFDP)
+       DO I=1,NDIM
+         VV=V(I)
+         V(I)=VV+(1+ABS(VV))*1d-1
+         CALL FUNC(NDIM,V,ICP,PP,0,F,DFDU,DFDP)
+         V(I)=VV
+         DO J=1,NDIM
+           PATTERN(J,I)=.NOT.(F(J)==FV(J))
+         ENDDO
+       ENDDO
+
+! Greedy coloring: give every column the first color that none of the
+! columns sharing a row with it has.
+
+       COLORS(:)=0
+       NCOLORS=0
+       DO WHILE(ANY(COLORS(:)==0))
+         NCOLORS=NCOLORS+1
+         USED(:)=.FALSE.
+         DO I=1,NDIM
+           IF(COLORS(I)==0)THEN
+             IF(.NOT.ANY(PATTERN(:,I).AND.USED(:)))THEN
+               COLORS(I)=NCOLORS
+               USED(:)=USED(:).OR.PATTERN(:,I)
+             ENDIF
+           ENDIF
+         ENDDO
+       ENDDO
+
+      END SUBROUTINE FUNIPATTERN
+
+!     ---------- ----------
+      SUBROUTINE FUNIGROUPS(NDIM,U,ICP,PAR,F,DFDU,DFDP)
+
+! Generate the Jacobian by central differences, perturbing all columns of
+! a color at the same time; this needs 2*NCOLORS instead of 2*NDIM calls
+! of FUNC.
+
+      INTEGER, INTENT(IN) :: ICP(*),NDIM
+      DOUBLE PRECISION, INTENT(INOUT) :: U(NDIM),PAR(*)
+      DOUBLE PRECISION, INTENT(OUT) :: F(NDIM)
+      DOUBLE PRECISION, INTENT(INOUT) :: DFDU(NDIM,NDIM),DFDP(NDIM,*)
+
+      INTEGER I,J,K
+      DOUBLE PRECISION UMX,EP,UU(NDIM),FP(NDIM)
+
+       UMX=0.d0
+       DO I=1,NDIM
+         IF(DABS(U(I)).GT.UMX)UMX=DABS(U(I))
+       ENDDO
+
+       EP=HMACH*(1+UMX)
+
+       UU(:)=U(:)
+       DO K=1,NCOLORS
+         DO I=1,NDIM
+           IF(COLORS(I)==K)U(I)=UU(I)-EP
+         ENDDO
+         CALL FUNC(NDIM,U,ICP,PAR,0,F,DFDU,DFDP)
+         DO I=1,NDIM
+           IF(COLORS(I)==K)U(I)=UU(I)+EP
+         ENDDO
+         CALL FUNC(NDIM,U,ICP,PAR,0,FP,DFDU,DFDP)
+         U(:)=UU(:)
+         DO I=1,NDIM
+           IF(COLORS(I)==K)THEN
+             DO J=1,NDIM
+               IF(PATTERN(J,I))THEN
+                 DFDU(J,I)=(FP(J)-F(J))/(2*EP)
+               ELSE
+                 DFDU(J,I)=0.d0
+               ENDIF
+             ENDDO
+           ENDIF
+         ENDDO
+       ENDDO
+
+      END SUBROUTINE FUNIGROUPS
+
 !     ---------- ----
       SUBROUTINE BCNI(AP,NDIM,PAR,ICP,NBC,U0,U1,F,IJAC,DBC)
 
@@ -152,6 +298,8 @@
       INTEGER IJC,I,J,JAC,NFPR
 
        JAC=AP%JAC
+! JAC=2 only changes the differencing of FUNC
+       IF(JAC==2)JAC=0
 
 ! Generate the function.
 
@@ -248,6 +396,8 @@
       DOUBLE PRECISION UMX,EP,UU,P
 
        JAC=AP%JAC
+! JAC=2 only changes the differencing of FUNC
+       IF(JAC==2)JAC=0
 
 ! Generate the integrand.
 
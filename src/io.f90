@@ -11,7 +11,8 @@ MODULE IO
   IMPLICIT NONE
   PRIVATE
   PUBLIC :: READC, FINDLB, READLB, READBV, WRLINE, WRBAR, STHD, NEWLAB, &
-       GETNDIM3, GETNTST3, GETNCOL3, GETNFPR3, GETIPS3
+       GETNDIM3, GETNTST3, GETNCOL3, GETNFPR3, GETIPS3, NEWJOB, SKIPJOB, &
+       ENDJOB
 
   TYPE SOLUTION
      INTEGER :: IBR, NTOT, ITP, LAB, NFPR, ISW, NTPL, NAR, NROWPR, NTST, NCOL,&
@@ -24,6 +25,13 @@ MODULE IO
   END TYPE SOLUTION
   TYPE(SOLUTION), POINTER :: ROOTSOL, CURSOL
   INTEGER, SAVE :: MBR=0, MLAB=0
+  ! end of the input of a job, and of its output, of a worker process
+  CHARACTER(*), PARAMETER :: ENDJOB = '#AUTO end of job'
+  ! line before a solution header if its numbers are in a binary file:
+  ! BINSOL followed by the file name. The file contains BINMAGIC and then
+  ! the numbers in the order of a solution file, as float64 values.
+  CHARACTER(*), PARAMETER :: BINSOL = '#AUTO binary solution'
+  CHARACTER(*), PARAMETER :: BINMAGIC = 'AUTOSOL1'
 CONTAINS
 
 ! ------------- -------- -------
@@ -72,9 +80,9 @@ CONTAINS
          "NDIM", "IPS ", "ILP ", "NTST", "NCOL", "IAD ", "IADS", "ISP ",  &
          "ISW ", "IPLT", "NBC ", "NINT", "NMX ", "NPR ", "MXBF", "IID ",  &
          "ITMX", "ITNW", "NWTN", "JAC ", "NPAR", "IBR ", "LAB ", "IIS " /)
-    CHARACTER(LEN=*), PARAMETER :: RCONSTANTS(10) = (/                    &
+    CHARACTER(LEN=*), PARAMETER :: RCONSTANTS(11) = (/                    &
          "DS   ", "DSMIN", "DSMAX", "RL0  ", "RL1  ", "A0   ", "A1   ",   &
-         "EPSL ", "EPSU ", "EPSS " /)
+         "EPSL ", "EPSU ", "EPSS ", "CHORD" /)
 
     EOF=.FALSE.
     POS=0
@@ -195,6 +203,8 @@ CONTAINS
              EPSU=RC
           CASE(10)
              EPSS=RC
+          CASE(11)
+             CHORD=RC
           END SELECT
           RETURN
        ENDIF
@@ -637,11 +647,14 @@ CONTAINS
     WRITE(7,I5)' NMX=',NMXA, 'NPR=', NPR, 'MXBF=',MXBF,'IID =',IID, 'IADS=',IADS
     WRITE(7,I6)'ITMX=',ITMX,'ITNW=',ITNW,'NWTN=',NWTN,'JAC =',JAC,'  NUZR=',NUZR
 
-    IF(IBR>0.OR.LAB>0.OR.LEN_TRIM(TY)>0.OR.IIS<3)THEN
+    IF(IBR>0.OR.LAB>0.OR.LEN_TRIM(TY)>0.OR.IIS<3.OR.AP%CHORD>0)THEN
        WRITE(7,"('   0')",ADVANCE="NO")
        IF(IIS<3)THEN
           WRITE(7,"(A8,I4)",ADVANCE="NO")"IIS =",IIS
        ENDIF
+       IF(AP%CHORD>0)THEN
+          WRITE(7,"(A8,ES11.4)",ADVANCE="NO")"CHORD=",AP%CHORD
+       ENDIF
        IF(IBR>0)THEN
           WRITE(7,"(A8,I4)",ADVANCE="NO")"IBR =",IBR
        ENDIF
@@ -1225,7 +1238,7 @@ CONTAINS
     INTEGER NPARI,NDM,IPS,IPRIV
     INTEGER ISW,ITPST,I,J,ios,number,UNIT
     CHARACTER(3) :: ATYPE
-    CHARACTER(100) :: HEADER
+    CHARACTER(256) :: HEADER, BINFILE
 
 ! Locates restart point with label IRS and determines type.
 ! If the label can not be located on unit 3 then FOUND will be .FALSE.
@@ -1252,6 +1265,7 @@ CONTAINS
        CALL AUTOSTOP()
     ENDIF
     I=0
+    BINFILE=''
     J=SCAN(SIRS,"-0123456789")
     number=0
     IF(J>2)THEN
@@ -1264,6 +1278,15 @@ CONTAINS
     DO
        I=I+1
        READ(UNIT,'(A)',END=2)HEADER
+       IF(HEADER==ENDJOB)THEN
+          ! worker process: keep reading jobs from this unit
+          RETURN
+       ENDIF
+       IF(HEADER(1:LEN(BINSOL))==BINSOL)THEN
+          BINFILE=ADJUSTL(HEADER(LEN(BINSOL)+1:))
+          I=I-1
+          CYCLE
+       ENDIF
        IF(LEN_TRIM(HEADER) <= 73)THEN
           READ(HEADER,*)IBR,NTOT,ITP,LAB,NFPRR,ISWR,NTPL,NAR,NROWPR,NTST, &
                NCOL,NPARR
@@ -1299,15 +1322,21 @@ CONTAINS
              ITPST=0
           ENDIF
           AP%ITPST=ITPST
-          CALL READSOL(UNIT,IBR,NTOT,ITP,LAB,NFPR,ISWR,NTPL,NAR,NROWPR,NTST,&
-               NCOL,NPAR,NPARI,NDM,IPS,IPRIV)
+          IF(LEN_TRIM(BINFILE)>0)THEN
+             CALL READSOLBIN(BINFILE,IBR,NTOT,ITP,LAB,NFPR,ISWR,NTPL,NAR,&
+                  NROWPR,NTST,NCOL,NPAR,NPARI,NDM,IPS,IPRIV)
+          ELSE
+             CALL READSOL(UNIT,IBR,NTOT,ITP,LAB,NFPR,ISWR,NTPL,NAR,NROWPR,&
+                  NTST,NCOL,NPAR,NPARI,NDM,IPS,IPRIV)
+          ENDIF
           ! strip internal parameters from returned NPAR so they can
           ! be thrown away when possible
           NPAR=NPAR-NPARI
-       ELSE
+       ELSEIF(LEN_TRIM(BINFILE)==0)THEN
           CALL SKIPS(UNIT,NROWPR,EOF3)
           IF(EOF3)GOTO 2
        ENDIF
+       BINFILE=''
     ENDDO
 
 2   CONTINUE
@@ -1351,6 +1380,65 @@ CONTAINS
 
   END SUBROUTINE READSOL
 
+! ---------- ----------
+  SUBROUTINE READSOLBIN(FILE,IBR,NTOT,ITP,LAB,NFPR,ISW,NTPL,NAR,NROWPR,NTST,&
+       NCOL,NPAR,NPARI,NDM,IPS,IPRIV)
+
+! Reads the numbers of a solution from a binary file (see BINSOL)
+
+    USE SUPPORT, ONLY: AUTOSTOP
+
+    CHARACTER(*), INTENT(IN) :: FILE
+    INTEGER, INTENT(IN) :: IBR,NTOT,ITP,LAB,NFPR
+    INTEGER, INTENT(IN) :: ISW,NTPL,NAR,NROWPR,NTST,NCOL,NPAR
+    INTEGER, INTENT(IN) :: NPARI,NDM,IPS,IPRIV
+
+! Local
+    INTEGER J, NTNC, NROWPRSMALL, ios
+    CHARACTER(LEN(BINMAGIC)) MAGIC
+    DOUBLE PRECISION, ALLOCATABLE :: ICP(:)
+
+    NULLIFY(ROOTSOL)
+    NTNC=NTPL-1
+
+    OPEN(13,FILE=TRIM(FILE),STATUS='old',ACCESS='stream', &
+         FORM='unformatted',IOSTAT=ios)
+    IF(ios==0)THEN
+       READ(13,IOSTAT=ios)MAGIC
+       IF(ios==0.AND.MAGIC/=BINMAGIC)ios=1
+    ENDIF
+    IF(ios/=0)THEN
+       WRITE(6,'(A,A,A)')'The binary solution file ',TRIM(FILE), &
+            ' could not be read.'
+       CALL AUTOSTOP()
+    ENDIF
+
+    CALL NEWSOL(IBR,NTOT,ITP,LAB,NFPR,ISW,NTPL,NAR,NROWPR,NTST,NCOL,NPAR,&
+         NPARI,NDM,IPS,IPRIV)
+    DO J=0,NTNC
+       READ(13,IOSTAT=ios)CURSOL%TM(J),CURSOL%UPS(:,J)
+       IF(ios/=0)GOTO 2
+    ENDDO
+
+    NROWPRSMALL=((NAR-1)/7+1)*NTPL + (NPAR+6)/7
+    IF(NTST>0.AND.NROWPR>NROWPRSMALL)THEN
+       ALLOCATE(ICP(NFPR))
+       READ(13,IOSTAT=ios)ICP(:),CURSOL%RLDOT(:),CURSOL%UDOTPS(:,:)
+       CURSOL%ICP(:)=NINT(ICP(:))
+       DEALLOCATE(ICP)
+       IF(ios/=0)GOTO 2
+    ENDIF
+
+    READ(13,IOSTAT=ios)CURSOL%PAR(:)
+2   CLOSE(13)
+    IF(ios/=0)THEN
+       WRITE(6,'(A,A,A)')'The binary solution file ',TRIM(FILE), &
+            ' ends prematurely.'
+       CALL AUTOSTOP()
+    ENDIF
+
+  END SUBROUTINE READSOLBIN
+
 ! ---------- ------
   SUBROUTINE NEWSOL(IBR,NTOT,ITP,LAB,NFPR,ISW,NTPL,NAR,NROWPR,NTST,NCOL,NPAR,&
        NPARI,NDM,IPS,IPRIV)
@@ -1583,4 +1671,31 @@ CONTAINS
 
   END SUBROUTINE SKIPS
 
+! ---------- ------
+  SUBROUTINE NEWJOB()
+
+! Forgets the maximal branch number and label of the previous job of a
+! worker process
+
+    MBR=0
+    MLAB=0
+
+  END SUBROUTINE NEWJOB
+
+! ---------- -------
+  SUBROUTINE SKIPJOB(UNIT)
+
+! Skips the rest of the input of a job of a worker process
+
+    INTEGER, INTENT(IN) :: UNIT
+    CHARACTER(100) LINE
+
+    DO
+       READ(UNIT,'(A)',END=2)LINE
+       IF(LINE==ENDJOB)RETURN
+    ENDDO
+2   RETURN
+
+  END SUBROUTINE SKIPJOB
+
 END MODULE IO
@@ -5,6 +5,7 @@
       USE IO
       USE SUPPORT, ONLY:AP=>AV, NAMEIDX, AUTOSTOP
       USE AUTO_CONSTANTS,ONLY: ICU,parnames,AUTOPARAMETERS
+      USE INTERFACES, ONLY: FUNIRESET
 !$    USE OMP_LIB
       USE COMPAT
 
@@ -15,7 +16,8 @@
       DOUBLE PRECISION TIME0,TIME1,TOTTIM
       INTEGER I,LINE,ios,UNITC
       INTEGER,ALLOCATABLE :: IICU(:)
-      LOGICAL FIRST
+      LOGICAL FIRST,WORKER
+      CHARACTER(LEN=256) ARG
 
 ! Initialization :
 
@@ -25,11 +27,26 @@
          ! never returns
        ENDIF
 
+! Worker process (--worker): run jobs read from standard input until it
+! ends. Every job consists of constants, s='/', the restart solution and
+! the line ENDJOB. After each job the output files are closed and ENDJOB
+! is written to standard output.
+       WORKER=.FALSE.
+       DO I=1,AUTARGC()
+          CALL AUTGETARG(I,ARG)
+          IF(TRIM(ARG)=='--worker')WORKER=.TRUE.
+       ENDDO
+
        FIRST=.TRUE.
        UNITC=2
-       OPEN(UNITC,FILE='fort.2',STATUS='old',ACCESS='sequential',IOSTAT=ios)
-       IF(ios/=0)THEN
+       IF(WORKER)THEN
           UNITC=5
+       ELSE
+          OPEN(UNITC,FILE='fort.2',STATUS='old',ACCESS='sequential', &
+               IOSTAT=ios)
+          IF(ios/=0)THEN
+             UNITC=5
+          ENDIF
        ENDIF
 
        KEYS=.FALSE.
@@ -41,9 +58,15 @@
              TIME0=AUTIM()
 !$           TIME0=omp_get_wtime()
           ENDIF
+          IF(WORKER)THEN
+             KEYS=.FALSE.
+             CALL NEWJOB()
+          ENDIF
+          CALL FUNIRESET()
           CALL INIT(AP,UNITC,EOF,KEYS,LINE)
           IF(EOF)EXIT
           CALL FINDLB_OR_STOP(AP,UNITC)
+          IF(WORKER.AND.AP%IRS==0)CALL SKIPJOB(UNITC)
           CALL MPIIAP(AP)
           ALLOCATE(IICU(SIZE(ICU)))
           DO I=1,SIZE(ICU)
@@ -66,7 +89,15 @@
           ENDIF
           WRITE(6,301)TOTTIM
           CALL CLEANUP()
-          IF(KEYS)EXIT
+          IF(WORKER)THEN
+             CLOSE(7)
+             CLOSE(8)
+             CLOSE(9)
+             WRITE(6,"(A)")ENDJOB
+             CALL AUTOFLUSH(6)
+          ELSEIF(KEYS)THEN
+             EXIT
+          ENDIF
        ENDDO
        CALL AUTOSTOP()
 
@@ -262,6 +293,7 @@
       EPSL  = 1d-7
       EPSU  = 1d-7
       EPSS  = 1d-5
+      CHORD = 0.d0
 
       TY='' 
       EFILE=''
@@ -355,6 +387,7 @@
       AP%EPSL=EPSL
       AP%EPSU=EPSU
       AP%EPSS=EPSS
+      AP%CHORD=CHORD
       AP%DET=0.d0
       AP%FLDF=0.d0
       AP%HBFF=0.d0
@@ -688,7 +688,7 @@ CONTAINS
 
     ! Generate the objective function.
 
-    IF(JAC.EQ.0)THEN
+    IF(JAC.EQ.0.OR.JAC.EQ.2)THEN
        IJC=0
     ELSE
        IJC=IJAC
@@ -112,12 +112,11 @@
       ENDIF
 
       ALLOCATE(FC(NFC))
+!     Use at most one thread per mesh interval, for the parallel region
+!     below only: OMP_SET_NUM_THREADS would also limit the threads of
+!     later regions and runs, with more mesh intervals.
       MNT = 1
-!$    MNT = OMP_GET_MAX_THREADS()
-      IF(MNT.GT.NA)THEN
-         MNT=NA
-!$       CALL OMP_SET_NUM_THREADS(NA)
-      ENDIF
+!$    MNT = MIN(OMP_GET_MAX_THREADS(),NA)
       IF(IFST.EQ.1)THEN
          IF(ALLOCATED(A))THEN
 !            !a sufficient check to see if array dimensions have changed:
@@ -161,7 +160,7 @@
 
       ALLOCATE(FCFC(NRC,NA2),FAA(NDIM,NA2),SOL(NDIM,NA2+1))
 
-!$OMP PARALLEL DEFAULT(SHARED) PRIVATE(I,IT,NT)
+!$OMP PARALLEL DEFAULT(SHARED) PRIVATE(I,IT,NT) NUM_THREADS(MNT)
 
       IT = 0
 !$    IT = OMP_GET_THREAD_NUM()
@@ -1043,11 +1042,8 @@
       DOUBLE PRECISION, INTENT(INOUT) :: DD(NCB,NRC,*),FAA(NOV,*),FCFC(NRC,*)
 
 ! Local 
-      INTEGER IAMAX,PLO,PHI,NA,MPLO,MPHI
-      LOGICAL DOMPI
-      ALLOCATABLE IAMAX(:)
-
-      ALLOCATE(IAMAX(2*NOV))
+      INTEGER PLO,PHI,NA,MPLO,MPHI
+      LOGICAL DOMPI,TASKS
 
       MPLO = (IAM*NTST+KWT-1)/KWT+1
       MPHI = ((IAM+1)*NTST+KWT-1)/KWT
@@ -1055,6 +1051,7 @@
       PLO = MPLO+(IT*NA+NT-1)/NT
       PHI = MPLO+((IT+1)*NA+NT-1)/NT-1
       DOMPI = KWT>1.AND.NT==1
+      TASKS = .FALSE.
 !     Reduce non-overlapping pieces
       CALL REDUCER(1,NTST,1)
 
@@ -1062,16 +1059,18 @@
 !$OMP MASTER
 
 !     Reduce overlapping pieces
+!     Independent subtrees are reduced in OpenMP tasks, which the other
+!     threads pick up while they wait at the barrier in BCKSUB; with MPI
+!     the order of the communication in MPIREDUCE must be kept.
       IF(NT>1)THEN
          DOMPI = KWT>1
+         TASKS = .NOT.DOMPI
          PLO = MPLO
          PHI = MPHI
          CALL REDUCER(1,NTST,1)
       ENDIF
 !$OMP END MASTER
 
-      DEALLOCATE(IAMAX)
-
       CONTAINS
 
 !      --------- ---------- -------
@@ -1082,6 +1081,7 @@
 
 ! Local 
        INTEGER IR,IC,I0,I1,I2,MID
+       INTEGER IAMAX(2*NOV)
 
        IF(HI<PLO.OR.LO>PHI)RETURN
 ! This is a check for the master reduction so it will stop as soon
@@ -1095,12 +1095,19 @@
 
        MID=(LO+HI)/2
 
-       IF(LO<MID) &
-            CALL REDUCER(LO,MID,LEVEL+1)
+       IF(LO<MID)THEN
+!$OMP TASK IF(TASKS)
+          CALL REDUCER(LO,MID,LEVEL+1)
+!$OMP END TASK
+       ENDIF
 
        IF(MID+1<HI) &
             CALL REDUCER(MID+1,HI,LEVEL)
 
+       IF(TASKS)THEN
+!$OMP TASKWAIT
+       ENDIF
+
        IF(DOMPI)THEN
           CALL MPIREDUCE(A1,A2,BB,CC,C2,DD,FAA,FCFC,NTST,NOV,NCB,NRC,IFST,&
                NLLV,LO,HI,LEVEL)
@@ -1521,7 +1528,7 @@
 
 ! Local
       INTEGER I,PLO,PHI,NA,MPLO,MPHI,NTSTNA
-      LOGICAL DOMPI
+      LOGICAL DOMPI,TASKS
 
       MPLO = (IAM*NTST+KWT-1)/KWT+1
       MPHI = ((IAM+1)*NTST+KWT-1)/KWT
@@ -1538,10 +1545,13 @@
             SOL(I,NTSTNA+1) = FC(I)
          ENDDO
       ENDIF
+!     The two halves below a block are independent, so without MPI
+!     they are done in OpenMP tasks, which are finished at the barrier.
       IF(NT>1)THEN
          PLO = MPLO
          PHI = MPHI
          DOMPI = KWT>1
+         TASKS = .NOT.DOMPI
          CALL BCKSUBR(1,NTST,1)
       ENDIF
 !$OMP END MASTER
@@ -1549,6 +1559,7 @@
       PLO = MPLO+(IT*NA+NT-1)/NT
       PHI = MPLO+((IT+1)*NA+NT-1)/NT-1
       DOMPI = KWT>1.AND.NT==1
+      TASKS = .FALSE.
       CALL BCKSUBR(1,NTST,1)
 
       CONTAINS
@@ -1600,7 +1611,9 @@
        !    exist.
        !    The (LO,MID) recursion is local so does not need ghost
        !    elements.
+!$OMP TASK IF(TASKS)
        CALL BCKSUBR(MID+1,HI,LEVEL)
+!$OMP END TASK
        CALL BCKSUBR(LO,MID,LEVEL+1)
 
        END SUBROUTINE BCKSUBR
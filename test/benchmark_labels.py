@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# Times slicing of long branches with many labeled points, as done when
+# plotting or analysing parts of a branch. For every size it prints the
+# time taken by the sorted index lookups of PointInfo, and by the lookup
+# that goes through all indices (as PointInfo did before), to show how
+# both scale with the number of labels.
+#
+# Usage: python benchmark_labels.py [points ...]
+
+import sys
+import time
+from auto import Points
+
+def branch(n, step=3):
+    # a Pointset of n points with a label at every step-th point
+    Points.importnumpy()
+    N = Points.N
+    labels = {}
+    for i in range(0, n, step):
+        labels[i] = {"LP": {"LAB": i//step + 1, "TY number": 2}}
+    coordarray = N.array([N.arange(n)*0.5, N.arange(n)*2.0], 'd')
+    return Points.Pointset({"coordarray": coordarray,
+                            "coordnames": ["PAR(1)", "L2-NORM"],
+                            "labels": labels})
+
+def slices(n, width=100):
+    return [slice(start, start + width) for start in range(0, n, width//4)]
+
+def timeit(f, repeat=3):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        f()
+        t = time.time() - start
+        if best is None or t < best:
+            best = t
+    return best
+
+def scan(labels, key):
+    # the lookup of a slice of labels that goes through all indices
+    ixs = Points.sortedDictKeys(labels.by_index)
+    s1, s2, s3 = key.indices(max(ixs)+1)
+    return Points.intersect(range(s1, s2, s3), ixs)
+
+def main(sizes):
+    print("%8s %8s %12s %12s %12s" %
+          ("points", "labels", "slices [s]", "sorted [s]", "scan [s]"))
+    for n in sizes:
+        ps = branch(n)
+        keys = slices(n)
+        t_slices = timeit(lambda: [ps[key] for key in keys])
+        t_sorted = timeit(lambda: [ps.labels[key] for key in keys])
+        t_scan = timeit(lambda: [scan(ps.labels, key) for key in keys])
+        print("%8d %8d %12.4f %12.4f %12.4f" %
+              (n, len(ps.labels), t_slices, t_sorted, t_scan))
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 2000, 4000, 8000]
+    main(sizes)
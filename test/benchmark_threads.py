@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# Times the continuation of a periodic orbit with many mesh intervals for
+# several numbers of OpenMP threads, to show how the solution of the
+# linear systems (condensation of parameters, the nested dissection of
+# the reduction, and the back substitution) scales with the threads.
+# The periodic orbits of the lrz demo are continued from its first Hopf
+# bifurcation; the results must be the same for all numbers of threads.
+# The speedup cannot be larger than the number of CPUs.
+#
+# Usage: python benchmark_threads.py [threads ...] [NTST=ntst]
+# (with the python directory of AUTO in PYTHONPATH and AUTO_DIR set)
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import auto
+
+def main(threads, ntst=1000, nmx=20):
+    cwd = os.getcwd()
+    dir = tempfile.mkdtemp()
+    try:
+        os.chdir(dir)
+        auto.copydemo("lrz")
+        hb = auto.run("lrz", c="lrz.1")("HB1")
+        # compile before timing
+        auto.run(hb, c="lrz.2", NTST=ntst, NMX=2)
+        times = []
+        first = None
+        for n in threads:
+            os.environ["OMP_NUM_THREADS"] = str(n)
+            start = time.time()
+            po = auto.run(hb, c="lrz.2", NTST=ntst, NMX=nmx)
+            times.append(time.time() - start)
+            result = list(po[0]["PERIOD"])
+            if first is None:
+                first = result
+            elif result != first:
+                sys.stdout.write("Different results with %d threads\n" % n)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(dir, True)
+    print("%8s %8s %12s %8s" % ("threads", "NTST", "time [s]", "speedup"))
+    for n, t in zip(threads, times):
+        print("%8d %8d %12.3f %8.2f" % (n, ntst, t, times[0]/t))
+
+if __name__ == "__main__":
+    ntst = 1000
+    threads = []
+    for arg in sys.argv[1:]:
+        if arg.startswith("NTST="):
+            ntst = int(arg[5:])
+        else:
+            threads.append(int(arg))
+    main(threads or [1, 2, 4, 8], ntst)
@@ -25,9 +25,9 @@ DIR3=DIR1+DIR2+["ab","abc","brc","brf","bru","chu","enz","ext","ezp","frc",
 DIR3.sort()
 
 # Plus new demos
-DIR4=DIR3+["abcb","apbp","c2c","cusp","ffn","fhh","fhn","fnb","fnc","hen",
-           "kdv","lcbp","log","man","nep","p2c","pcl","ph1","pla","python",
-           "python/n-body","r3b","sib",
+DIR4=DIR3+["abcb","apbp","bch","c2c","cusp","ffn","fhh","fhn","fnb","fnc",
+           "hen","kdv","lcbp","log","man","nep","p2c","pcl","ph1","pla",
+           "python","python/n-body","r3b","sib",
            "snh","sspg","tfc","um2","um3","vhb"]
 DIR4.sort()
 